@@ -1,39 +1,195 @@
 # ai-engine/app.py - Depression Detection AI using Trained Models
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify, stream_with_context
 from flask_cors import CORS
 import os
+import copy
 import json
 import re
 import torch
 import joblib
-import google.generativeai as genai
 from transformers import (
-    RobertaTokenizer, RobertaForSequenceClassification,
-    T5Tokenizer, T5ForConditionalGeneration
+    RobertaTokenizerFast, RobertaForSequenceClassification,
+    T5Tokenizer, T5ForConditionalGeneration,
+    StoppingCriteria, StoppingCriteriaList, TextIteratorStreamer
 )
 from dotenv import load_dotenv
 import numpy as np
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from datetime import datetime
+from modules.batching import MicroBatcher
+from modules.circuit_breaker import CircuitBreaker, CircuitOpenError, LatencyBudgetExceeded
+from modules.domain_table import DomainTable
+from modules.encoder_cache import EncoderCache
+from modules.gemini_client import GeminiClient, GeminiTimeout
+from modules.fingerprint import model_fingerprint
+from modules.metrics import MetricsRegistry
+from modules.onnx_backend import ONNX_FILENAME, OnnxDomainClassifier
+from modules.predictor import DepressionPredictor
+from modules.request_profiler import RequestProfiler
+from modules.result_cache import CacheGeneration, ResultCache, canonical_key
+from modules.scheduler import InferenceScheduler, SchedulerOverloaded
+from modules.screening_engine import (
+    SessionDeltaError, SessionNotFound, SessionStore, handle_screening_session, validate_answers
+)
+from modules.single_flight import SingleFlight
+from modules.speculation import Speculator
+from modules.suggestion_catalog import CatalogManager, build_catalog_entries
 
 load_dotenv()
 
+# transformers builds models on the meta device through process-wide patches of
+# torch.nn.Module, so from_pretrained calls must not overlap across threads
+_model_load_lock = threading.Lock()
+
+MODEL_WEIGHT_FILES = ("model.safetensors", "pytorch_model.bin", "model.onnx")
+
+# Named T5 decoding profiles, selectable per request ("decoding_profile") or
+# server-wide (DECODING_PROFILE). Measure with scripts/benchmark_decoding_profiles.py.
+#   fast     - no beam search, top-k sampling: lowest latency
+#   balanced - small beam with sampling, fewer candidates than quality
+#   quality  - the original wide beam search with sampling: slowest, most candidates
+QUESTION_DECODING_PROFILES = {
+    "fast": {"num_beams": 1, "do_sample": True, "top_k": 50, "temperature": 0.9, "num_return_sequences": 4},
+    "balanced": {"num_beams": 4, "do_sample": True, "temperature": 0.9, "num_return_sequences": 4},
+    "quality": {"num_beams": 8, "do_sample": True, "temperature": 0.9, "num_return_sequences": 8},
+}
+SUGGESTION_DECODING_PROFILES = {
+    "fast": {"num_beams": 1, "do_sample": True, "top_k": 50, "temperature": 0.8, "num_return_sequences": 3},
+    "balanced": {"num_beams": 3, "do_sample": True, "temperature": 0.8, "num_return_sequences": 3},
+    "quality": {"num_beams": 6, "do_sample": True, "temperature": 0.8, "num_return_sequences": 5},
+}
+DECODING_PROFILES = tuple(QUESTION_DECODING_PROFILES)
+
+DEPRESSION_LEVELS = ("No Depression", "Mild", "Moderate", "Severe")
+
+# Generated question text is split on line breaks and after question marks
+QUESTION_SPLIT_PATTERN = re.compile(r"[\n\r]+|(?<=\?)\s+")
+QUESTION_MAX_LENGTH = 128
+QUESTION_GENERATION_MODES = ("full", "incremental")
+
+
+def finished_question_parts(tokenizer, row):
+    """
+    Split one decoded candidate into question parts, dropping the trailing
+    fragment of a candidate that has no EOS yet (stopped early or cut off
+    at max_length): only text followed by a split point is complete
+    """
+    parts = QUESTION_SPLIT_PATTERN.split(tokenizer.decode(row, skip_special_tokens=True))
+    return parts if bool((row == tokenizer.eos_token_id).any()) else parts[:-1]
+
+
+class _StopOnEvent(StoppingCriteria):
+    """Stops generate() once `event` is set: the streaming consumer has enough questions, or a speculative run lost"""
+    
+    def __init__(self, event):
+        self.event = event
+    
+    def __call__(self, input_ids, scores, **kwargs):
+        return torch.full((input_ids.shape[0],), self.event.is_set(), dtype=torch.bool, device=input_ids.device)
+
+
+class _QuestionCollector(StoppingCriteria):
+    """
+    Stops generate() once the questions already finished in the partial
+    candidates, plus those collected in earlier rounds, reach the target.
+    Only text followed by a split point (or the end of a finished candidate)
+    counts, using the same cleaning and dedupe rules as the final output.
+    """
+    
+    def __init__(self, ai_model, target, collected):
+        self.ai_model = ai_model
+        self.target = target
+        self.collected = collected
+        self.stopped = False
+    
+    def __call__(self, input_ids, scores, **kwargs):
+        found = list(self.collected)
+        for row in input_ids:
+            for part in finished_question_parts(self.ai_model.question_tokenizer, row):
+                self.ai_model.extract_questions(part, found)
+        done = len(found) >= self.target
+        self.stopped = self.stopped or done
+        return torch.full((input_ids.shape[0],), done, dtype=torch.bool, device=input_ids.device)
+
 app = Flask(__name__)
 CORS(app)
 
-# Configure Gemini API (only for depression level prediction)
-genai.configure(api_key=os.getenv('GEMINI_API_KEY'))
-# Use a current, supported Gemini model
-gemini_model = genai.GenerativeModel('gemini-1.5-flash')
+# Latency histograms and fallback counters for this process, scraped at /metrics.
+# Stages: classification tokenize/forward/decode, questions and suggestions
+# tokenize/generate/decode/postprocess, gemini round_trip/parse, per-class
+# queue_wait on the inference scheduler and the suggestion fallback tiers.
+metrics = MetricsRegistry()
+REQUEST_SECONDS = metrics.histogram(
+    "ai_engine_request_seconds", "HTTP request latency by route and status", ("endpoint", "method", "status")
+)
+STAGE_SECONDS = metrics.histogram(
+    "ai_engine_stage_seconds", "Time spent in one stage of request handling", ("component", "stage")
+)
+SUGGESTION_TIER_TOTAL = metrics.counter(
+    "ai_engine_suggestion_tier_total", "Suggestion requests by the fallback tier that served them", ("tier",)
+)
+DEPRESSION_SOURCE_TOTAL = metrics.counter(
+    "ai_engine_depression_assessment_total", "Depression level assessments by source", ("source",)
+)
+GEMINI_CALLS_TOTAL = metrics.counter(
+    "ai_engine_gemini_calls_total", "Gemini lookups by outcome", ("outcome",)
+)
+QUESTION_TOKENS_TOTAL = metrics.counter(
+    "ai_engine_question_tokens_total",
+    "Incremental question generation: decoder tokens generated, and the ceiling of every candidate at full length",
+    ("kind",)
+)
+DEPRESSION_ESCALATIONS_TOTAL = metrics.counter(
+    "ai_engine_depression_escalations_total", "Local depression assessments escalated to Gemini by reason", ("reason",)
+)
+SPECULATION_TOTAL = metrics.counter(
+    "ai_engine_speculation_total",
+    "Speculative suggestion runs by outcome: hit, miss, error, and discarded (a miss whose run had started and was stopped)",
+    ("outcome",)
+)
+SPECULATION_SECONDS_TOTAL = metrics.counter(
+    "ai_engine_speculation_seconds_total",
+    "Speculative suggestion time saved on hits and wasted on discarded runs",
+    ("kind",)
+)
+
+# On-demand profiling of single requests; disabled unless PROFILING_TOKEN is set
+request_profiler = RequestProfiler(
+    token=os.getenv('PROFILING_TOKEN'),
+    trace_dir=os.getenv('PROFILING_TRACE_DIR', './profiles'),
+    with_stack=os.getenv('PROFILING_WITH_STACK', 'false').lower() in ('1', 'true', 'yes')
+)
+
+# Configure Gemini API (depression level prediction and suggestion fallback).
+# Calls run in a bounded worker pool with per-call timeouts and reused connections;
+# GEMINI_API_ENDPOINT can point at scripts/fake_gemini_server.py for local testing.
+gemini_client = GeminiClient(
+    api_key=os.getenv('GEMINI_API_KEY'),
+    model_name=os.getenv('GEMINI_MODEL', 'gemini-1.5-flash'),
+    endpoint=os.getenv('GEMINI_API_ENDPOINT'),
+    timeout=float(os.getenv('GEMINI_TIMEOUT_SECONDS', '15')),
+    max_concurrency=int(os.getenv('GEMINI_MAX_CONCURRENCY', '8')),
+    max_queue=int(os.getenv('GEMINI_MAX_QUEUE', '32'))
+)
 
 # Load trained models
 class MentalHealthAI:
     def __init__(self):
-        self.models_path = "./models"
+        # AI_ENGINE_MODELS_PATH points at another model tree, e.g. the tiny
+        # random models from scripts/build_tiny_models.py used for benchmarks
+        self.models_path = os.getenv('AI_ENGINE_MODELS_PATH', "./models")
         
         # Domain assignment model (RoBERTa)
         self.domain_tokenizer = None
         self.domain_model = None
+        self.domain_onnx = None
         self.label_encoder = None
+        self.domain_table = None
+        
+        # Domain classifier backend: 'torch' (eager PyTorch) or 'onnx' (ONNX Runtime)
+        self.domain_backend = os.getenv('DOMAIN_BACKEND', 'torch').lower()
         
         # Question generation model (T5)
         self.question_tokenizer = None
@@ -43,6 +199,20 @@ class MentalHealthAI:
         self.suggestion_tokenizer = None
         self.suggestion_model = None
         
+        # Server-wide default decoding profile for the T5 generators
+        self.decoding_profile = os.getenv('DECODING_PROFILE', 'quality').lower()
+        if self.decoding_profile not in DECODING_PROFILES:
+            print(f"⚠ Unknown DECODING_PROFILE '{self.decoding_profile}', using 'quality'")
+            self.decoding_profile = 'quality'
+        
+        # "incremental" samples a few candidates at a time and stops once enough
+        # distinct questions are out; "full" decodes every candidate up front
+        self.question_generation_mode = os.getenv('QUESTION_GENERATION_MODE', 'full').lower()
+        if self.question_generation_mode not in QUESTION_GENERATION_MODES:
+            print(f"⚠ Unknown QUESTION_GENERATION_MODE '{self.question_generation_mode}', using 'full'")
+            self.question_generation_mode = 'full'
+        self.question_incremental_batch = max(1, int(os.getenv('QUESTION_INCREMENTAL_BATCH', '2')))
+        
         # Domain labels (fallback mapping only; primary mapping uses label encoder)
         self.domain_labels = [
             'relationship',
@@ -53,154 +223,1066 @@ class MentalHealthAI:
             'trauma'
         ]
         
+        # Per-model load time in seconds, for tracking cold-start regressions
+        self.load_times = {}
+        
+        # Opt-in int8 dynamic quantization of Linear layers for CPU inference
+        self.quantize = os.getenv('AI_ENGINE_QUANTIZE', 'false').lower() in ('1', 'true', 'yes', 'int8')
+        
+        # Result caches keyed on canonicalised inputs. The question cache is
+        # opt-in because generate_questions samples and repeats would otherwise vary.
+        # Every cache watches the invalidation counter in CACHE_GENERATION_FILE, so
+        # /api/cache/invalidate on one serve.py worker clears them in all workers.
+        self.cache_generation = CacheGeneration(os.getenv('CACHE_GENERATION_FILE', './cache/cache_generation'))
+        cache_max_bytes = int(os.getenv('RESULT_CACHE_MAX_BYTES', str(16 * 1024 * 1024)))
+        cache_ttl = float(os.getenv('RESULT_CACHE_TTL_SECONDS', '3600'))
+        self.domain_age_bucket = max(1, int(os.getenv('DOMAIN_AGE_BUCKET', '1')))
+        self.domain_cache = ResultCache(cache_max_bytes, cache_ttl, name="domain", generation=self.cache_generation)
+        self.question_cache = None
+        if os.getenv('QUESTION_CACHE_ENABLED', 'false').lower() in ('1', 'true', 'yes'):
+            self.question_cache = ResultCache(
+                cache_max_bytes, cache_ttl, name="questions", generation=self.cache_generation
+            )
+        
+        # Screening sessions: canonical context and answers held server-side so
+        # follow-up calls send a session_id plus only the new answers. They are
+        # files in SESSION_STORE_DIR, so every serve.py worker sees every session.
+        self.sessions = SessionStore(
+            os.getenv('SESSION_STORE_DIR', './cache/sessions'),
+            max_sessions=int(os.getenv('SESSION_MAX_SESSIONS', '10000')),
+            ttl_seconds=float(os.getenv('SESSION_TTL_SECONDS', '1800')),
+            name="screening_sessions"
+        )
+        
+        # Parsed Gemini results keyed by prompt hash; identical prompts already in
+        # flight share one API call (backend retries, repeated suggestion fallbacks)
+        self.gemini_flight = SingleFlight(name="gemini")
+        self.gemini_cache = None
+        gemini_cache_bytes = int(os.getenv('GEMINI_CACHE_MAX_BYTES', str(4 * 1024 * 1024)))
+        if gemini_cache_bytes > 0:
+            self.gemini_cache = ResultCache(
+                gemini_cache_bytes, float(os.getenv('GEMINI_CACHE_TTL_SECONDS', '600')), name="gemini",
+                generation=self.cache_generation
+            )
+        
+        # Circuit breaker on the Gemini path: when it is erroring or slow, depression
+        # analysis answers from PHQ-9 banding at once instead of waiting for failures.
+        # GEMINI_LATENCY_BUDGET_MS (or a request's latency_budget_ms) caps the wait.
+        self.gemini_breaker = CircuitBreaker(
+            name="gemini",
+            window_size=int(os.getenv('GEMINI_BREAKER_WINDOW', '50')),
+            min_calls=int(os.getenv('GEMINI_BREAKER_MIN_CALLS', '10')),
+            error_rate_threshold=float(os.getenv('GEMINI_BREAKER_ERROR_RATE', '0.5')),
+            latency_threshold_ms=float(os.getenv('GEMINI_BREAKER_P95_MS', '8000')),
+            open_seconds=float(os.getenv('GEMINI_BREAKER_OPEN_SECONDS', '30')),
+            probe_successes=int(os.getenv('GEMINI_BREAKER_PROBES', '3'))
+        )
+        self.gemini_latency_budget_ms = float(os.getenv('GEMINI_LATENCY_BUDGET_MS', '0'))
+        
+        # T5 encoder output caches so repeated prompts skip the encoder pass
+        # (ENCODER_CACHE_MAX_BYTES=0 disables them)
+        self.question_encoder_cache = None
+        self.suggestion_encoder_cache = None
+        encoder_cache_bytes = int(os.getenv('ENCODER_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+        if encoder_cache_bytes > 0:
+            encoder_cache_ttl = float(os.getenv('ENCODER_CACHE_TTL_SECONDS', '1800'))
+            self.question_encoder_cache = EncoderCache(
+                encoder_cache_bytes, encoder_cache_ttl, name="question_encoder", generation=self.cache_generation
+            )
+            self.suggestion_encoder_cache = EncoderCache(
+                encoder_cache_bytes, encoder_cache_ttl, name="suggestion_encoder", generation=self.cache_generation
+            )
+        
         self.load_models()
+        
+        # Model work runs on per-class worker pools so a cheap classification
+        # forward pass never waits behind multi-second beam searches
+        self.scheduler = None
+        if os.getenv('SCHEDULER_ENABLED', 'true').lower() in ('1', 'true', 'yes'):
+            self.scheduler = InferenceScheduler({
+                work_class: {
+                    "workers": int(os.getenv(f'SCHEDULER_{work_class.upper()}_WORKERS', workers)),
+                    "threads": int(os.getenv(f'SCHEDULER_{work_class.upper()}_THREADS', threads)),
+                    "max_queue": int(os.getenv(f'SCHEDULER_{work_class.upper()}_MAX_QUEUE', max_queue))
+                }
+                for work_class, workers, threads, max_queue in (
+                    ("classification", '2', '1', '256'),
+                    ("questions", '1', '0', '32'),
+                    ("suggestions", '1', '0', '32'),
+                )
+            }, name="inference")
+        
+        # Micro-batch concurrent domain assignment requests into one forward pass
+        self.domain_batcher = None
+        batch_size = int(os.getenv('DOMAIN_BATCH_MAX_SIZE', '16'))
+        if batch_size > 1:
+            self.domain_batcher = MicroBatcher(
+                self.classify_batch,
+                max_batch_size=batch_size,
+                max_wait_ms=float(os.getenv('DOMAIN_BATCH_MAX_WAIT_MS', '5')),
+                name="domain-batcher"
+            )
+        
+        # Local-first depression assessment: the MiniLM + XGBoost classifier
+        # answers when it is confident and agrees with the PHQ-9 band; the
+        # rest escalates to Gemini
+        self.local_predictor = None
+        self.local_min_confidence = float(os.getenv('DEPRESSION_LOCAL_MIN_CONFIDENCE', '0.75'))
+        self.local_require_band_agreement = os.getenv('DEPRESSION_LOCAL_REQUIRE_BAND_AGREEMENT', 'true').lower() in ('1', 'true', 'yes')
+        if os.getenv('DEPRESSION_CASCADE_ENABLED', 'true').lower() in ('1', 'true', 'yes'):
+            self.load_local_predictor()
+        
+        # Precomputed suggestions per (depression level, domain) for requests
+        # without history (scripts/build_suggestion_catalog.py); a catalog built
+        # for other suggestion weights is rebuilt in the background
+        self.suggestion_catalog = None
+        self.suggestion_catalog_samples = max(1, int(os.getenv('SUGGESTION_CATALOG_SAMPLES', '4')))
+        if os.getenv('SUGGESTION_CATALOG_ENABLED', 'true').lower() in ('1', 'true', 'yes'):
+            self.load_suggestion_catalog()
+        
+        # /api/complete-screening starts suggestions for the PHQ-9 band level while Gemini runs
+        self.suggestion_speculator = None
+        if os.getenv('SPECULATIVE_SUGGESTIONS', 'true').lower() in ('1', 'true', 'yes'):
+            self.suggestion_speculator = Speculator(
+                max_workers=int(os.getenv('SPECULATION_MAX_WORKERS', '4')),
+                name="suggestion-speculation",
+                runs=SPECULATION_TOTAL,
+                seconds=SPECULATION_SECONDS_TOTAL
+            )
     
     def load_models(self):
+        """Load the three models concurrently and record per-model load time"""
         try:
-            print("Loading domain assignment model...")
-            # Load domain assignment model
-            domain_path = os.path.join(self.models_path, "domain_assignment")
-            self.domain_tokenizer = RobertaTokenizer.from_pretrained('roberta-base')
-            self.domain_model = RobertaForSequenceClassification.from_pretrained(domain_path)
-            
-            # Load label encoder
-            label_encoder_path = os.path.join(domain_path, "label_encoder.joblib")
-            if os.path.exists(label_encoder_path):
-                self.label_encoder = joblib.load(label_encoder_path)
-            
-            print("Loading question generation model...")
-            # Load question generation model
-            question_path = os.path.join(self.models_path, "question_generation")
-            self.question_tokenizer = T5Tokenizer.from_pretrained(question_path)
-            self.question_model = T5ForConditionalGeneration.from_pretrained(question_path)
-            
-            # Try to load suggestion generation model (T5)
-            print("Attempting to load suggestion generation model...")
-            try:
-                suggestion_path = os.path.join(self.models_path, "suggestion")
-                if os.path.exists(suggestion_path) and os.path.exists(os.path.join(suggestion_path, "config.json")):
-                    self.suggestion_tokenizer = T5Tokenizer.from_pretrained(suggestion_path)
-                    self.suggestion_model = T5ForConditionalGeneration.from_pretrained(suggestion_path)
-                    print("✓ Suggestion model loaded successfully!")
-                else:
-                    print("⚠ Suggestion model not found, will use Gemini API as primary")
-            except Exception as e:
-                print(f"⚠ Could not load suggestion model: {e}")
-                print("Will use Gemini API as primary for suggestions")
+            start = time.perf_counter()
+            
+            # Start reading all weight files into the page cache up front so the
+            # (serialised) model construction below does not wait on disk
+            for name in ("domain_assignment", "question_generation", "suggestion"):
+                self.prefetch_weights(os.path.join(self.models_path, name))
             
-            print("Models loaded successfully!")
+            # Tokenizers, label encoder and quantization run concurrently; only
+            # from_pretrained itself is serialised by _model_load_lock
+            with ThreadPoolExecutor(max_workers=3, thread_name_prefix="model-loader") as pool:
+                futures = [
+                    pool.submit(self._timed_load, "domain_assignment", self.load_domain_model),
+                    pool.submit(self._timed_load, "question_generation", self.load_question_model),
+                    pool.submit(self._timed_load, "suggestion_generation", self.load_suggestion_model)
+                ]
+                for future in futures:
+                    future.result()
+            
+            self.load_times["total"] = time.perf_counter() - start
+            
+            # Cached results belong to the previous model weights
+            self.invalidate_caches()
+            if self.quantize:
+                print("✓ Serving int8 dynamic-quantized models")
+            print("Models loaded successfully! Load times: " + ", ".join(
+                f"{name}={seconds:.2f}s" for name, seconds in self.load_times.items()
+            ))
             
         except Exception as e:
             print(f"Error loading models: {e}")
             raise e
     
+    def load_local_predictor(self):
+        """Load the local depression classifier up front (shared by pre-forked workers); Gemini-only when unavailable"""
+        model_path = os.path.join(self.models_path, "xgboost_depression_model.pkl")
+        label_encoder_path = os.path.join(self.models_path, "label_encoder.pkl")
+        if not (os.path.exists(model_path) and os.path.exists(label_encoder_path)):
+            print(f"Local depression classifier not found in {self.models_path}, using Gemini for every assessment")
+            return
+        try:
+            start = time.perf_counter()
+            predictor = DepressionPredictor(
+                model_path=model_path,
+                label_encoder_path=label_encoder_path,
+                batch_size=int(os.getenv('PREDICTOR_BATCH_SIZE', '32')),
+                store_dir=os.getenv('PREDICTOR_EMBEDDING_STORE', './cache/embeddings/all-MiniLM-L6-v2')
+            )
+            predictor.load()
+            self.load_times["depression_predictor"] = round(time.perf_counter() - start, 3)
+            self.local_predictor = predictor
+        except Exception as e:
+            print(f"Error loading local depression classifier, using Gemini for every assessment: {e}")
+    
+    def commit_session(self, session, succeeded=True):
+        """
+        Record a call's new answers on its screening session (no-op without
+        one) when `succeeded`; after a failed or fallback result the delta is
+        left unrecorded so the client can retry it at the same offset
+        """
+        if session is not None and succeeded:
+            self.sessions.commit(session)
+            session.delta = None
+    
+    def load_suggestion_catalog(self):
+        suggestion_path = os.path.join(self.models_path, "suggestion")
+        if self.suggestion_model is None:
+            return
+        self.suggestion_catalog = CatalogManager(
+            suggestion_path,
+            model_fingerprint(suggestion_path),
+            lambda: self.build_suggestion_catalog(self.suggestion_catalog_samples),
+            auto_refresh=os.getenv('SUGGESTION_CATALOG_REFRESH', 'true').lower() in ('1', 'true', 'yes'),
+            check_seconds=float(os.getenv('SUGGESTION_CATALOG_CHECK_SECONDS', '30'))
+        )
+        if self.suggestion_catalog.catalog is not None:
+            print(f"✓ Loaded suggestion catalog ({self.suggestion_catalog.stats()['pairs']} level/domain pairs)")
+        elif self.suggestion_catalog.stale:
+            print("⚠ Suggestion catalog was built for a different model, ignoring it until it is rebuilt")
+    
+    def catalog_domains(self):
+        """
+        Every domain assign_domain can return: the trained label encoder's
+        classes (the fallback labels without one) plus its error default
+        """
+        if self.label_encoder is not None:
+            domains = [str(label) for label in self.label_encoder.classes_]
+        else:
+            domains = list(self.domain_labels)
+        if 'General Depression' not in domains:
+            domains.append('General Depression')
+        return domains
+    
+    def build_suggestion_catalog(self, samples, decoding_profile='quality', progress=None):
+        """Sample the suggestion model over every (depression level, domain) pair; returns (entries, metadata)"""
+        suggestion_path = os.path.join(self.models_path, "suggestion")
+        # The fingerprint is taken first so weights replaced mid-build leave the catalog stale
+        fingerprint = model_fingerprint(suggestion_path)
+        entries = build_catalog_entries(
+            lambda level, domain, phq9_answers: self.generate_suggestions_with_model(
+                level, domain, "", phq9_answers, decoding_profile
+            ),
+            DEPRESSION_LEVELS, self.catalog_domains(), samples, progress
+        )
+        return entries, {
+            "fingerprint": fingerprint,
+            "samples": samples,
+            "decoding_profile": decoding_profile,
+            "created_at": datetime.now().isoformat(),
+        }
+    
+    def caches(self):
+        """All active result caches by name"""
+        return {
+            cache.name: cache
+            for cache in (
+                self.domain_cache,
+                self.question_cache,
+                self.question_encoder_cache,
+                self.suggestion_encoder_cache,
+                self.gemini_cache
+            )
+            if cache is not None
+        }
+    
+    def invalidate_caches(self):
+        """Clear the caches here and, through the shared generation, in every other worker"""
+        generation = self.cache_generation.bump()
+        for cache in self.caches().values():
+            cache.invalidate(generation)
+        return generation
+    
+    def generation_inputs(self, encoder_cache, model, inputs):
+        """generate() inputs, reusing cached encoder outputs when the encoder cache is enabled"""
+        if encoder_cache is None:
+            return inputs
+        return encoder_cache.generate_kwargs(model, inputs)
+    
+    def quantize_model(self, model):
+        """Return an int8 dynamically-quantized copy of the model when quantized mode is enabled"""
+        if not self.quantize:
+            return model
+        return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    
+    def prefetch_weights(self, model_dir):
+        """Ask the OS to read a model's weight files ahead of time (non-blocking)"""
+        for filename in MODEL_WEIGHT_FILES:
+            path = os.path.join(model_dir, filename)
+            if not os.path.exists(path):
+                continue
+            if hasattr(os, "posix_fadvise"):
+                fd = os.open(path, os.O_RDONLY)
+                try:
+                    os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+                finally:
+                    os.close(fd)
+            else:
+                threading.Thread(target=self._read_file, args=(path,), daemon=True).start()
+    
+    def _read_file(self, path):
+        with open(path, "rb") as f:
+            while f.read(16 * 1024 * 1024):
+                pass
+    
+    def _timed_load(self, name, loader):
+        start = time.perf_counter()
+        loader()
+        self.load_times[name] = time.perf_counter() - start
+    
+    def load_domain_model(self):
+        print("Loading domain assignment model...")
+        domain_path = os.path.join(self.models_path, "domain_assignment")
+        
+        # Prefer the tokenizer bundled next to the model so startup works offline.
+        # The fast (Rust) tokenizer produces the same ids as the Python one and
+        # is cheap enough to measure token lengths for bulk bucketing.
+        if os.path.exists(os.path.join(domain_path, "vocab.json")):
+            self.domain_tokenizer = RobertaTokenizerFast.from_pretrained(domain_path)
+        else:
+            print("⚠ No bundled tokenizer in models/domain_assignment, fetching 'roberta-base' "
+                  "(run scripts/bundle_domain_tokenizer.py once to enable offline startup)")
+            self.domain_tokenizer = RobertaTokenizerFast.from_pretrained('roberta-base')
+        
+        if self.domain_backend == 'onnx':
+            try:
+                self.domain_onnx = OnnxDomainClassifier(
+                    os.path.join(domain_path, ONNX_FILENAME),
+                    num_threads=os.getenv('ONNX_NUM_THREADS')
+                )
+                print("✓ Domain classifier served with ONNX Runtime")
+            except Exception as e:
+                print(f"⚠ Could not load ONNX domain model: {e}")
+                print("Falling back to PyTorch for domain assignment")
+                self.domain_backend = 'torch'
+        
+        if self.domain_backend != 'onnx':
+            # safetensors weights are memory-mapped and loaded straight into the
+            # model without a random-init pass or a second in-memory copy
+            with _model_load_lock:
+                domain_model = RobertaForSequenceClassification.from_pretrained(domain_path, low_cpu_mem_usage=True)
+            self.domain_model = self.quantize_model(domain_model)
+        
+        # Load label encoder
+        label_encoder_path = os.path.join(domain_path, "label_encoder.joblib")
+        if os.path.exists(label_encoder_path):
+            self.label_encoder = joblib.load(label_encoder_path)
+        
+        # Precomputed lookups for requests without history (scripts/precompute_domain_table.py)
+        self.domain_table = None
+        if os.getenv('DOMAIN_TABLE_ENABLED', 'true').lower() in ('1', 'true', 'yes'):
+            table = DomainTable.load(domain_path)
+            mismatch = table.mismatch(
+                model_fingerprint(domain_path), self.domain_backend, self.quantize
+            ) if table is not None else None
+            if mismatch is not None:
+                print(f"⚠ Ignoring the precomputed domain table: {mismatch}")
+            elif table is not None:
+                self.domain_table = table
+                print(f"✓ Loaded precomputed domain table ({table.stats()['cells']} cells)")
+    
+    def load_question_model(self):
+        print("Loading question generation model...")
+        question_path = os.path.join(self.models_path, "question_generation")
+        self.question_tokenizer = T5Tokenizer.from_pretrained(question_path)
+        with _model_load_lock:
+            question_model = T5ForConditionalGeneration.from_pretrained(question_path, low_cpu_mem_usage=True)
+        self.question_model = self.quantize_model(question_model)
+    
+    def load_suggestion_model(self):
+        # Try to load suggestion generation model (T5)
+        print("Attempting to load suggestion generation model...")
+        try:
+            suggestion_path = os.path.join(self.models_path, "suggestion")
+            if os.path.exists(suggestion_path) and os.path.exists(os.path.join(suggestion_path, "config.json")):
+                self.suggestion_tokenizer = T5Tokenizer.from_pretrained(suggestion_path)
+                with _model_load_lock:
+                    suggestion_model = T5ForConditionalGeneration.from_pretrained(suggestion_path, low_cpu_mem_usage=True)
+                self.suggestion_model = self.quantize_model(suggestion_model)
+                print("✓ Suggestion model loaded successfully!")
+            else:
+                print("⚠ Suggestion model not found, will use Gemini API as primary")
+        except Exception as e:
+            print(f"⚠ Could not load suggestion model: {e}")
+            print("Will use Gemini API as primary for suggestions")
+    
     def calculate_phq9_score(self, answers):
         """Calculate PHQ-9 total score"""
         return sum(answers)
     
-    def assign_domain(self, phq9_answers, history, occupation, age):
-        """Use trained RoBERTa model to assign domain"""
+    def phq9_depression_level(self, phq9_score):
+        """Map a PHQ-9 total score to the 4-level scale using the standard severity bands"""
+        if phq9_score <= 4:
+            return "No Depression"
+        elif phq9_score <= 9:
+            return "Mild"
+        elif phq9_score <= 14:
+            return "Moderate"
+        return "Severe"
+    
+    def canonical_domain_inputs(self, phq9_answers, history, occupation, age):
+        """Normalise domain inputs so equivalent requests share one model input and cache key"""
+        phq9_answers = [int(answer) for answer in phq9_answers]
+        history = " ".join(str(history or "").split())
+        occupation = " ".join(str(occupation or "").split())
         try:
-            # Create input text combining all factors
-            phq9_text = f"PHQ-9 responses: {phq9_answers}"
-            history_text = f"Mental health history: {history}" if history else "No mental health history"
-            occupation_text = f"Occupation: {occupation}"
-            age_text = f"Age: {age}"
-            
-            input_text = f"{phq9_text}. {history_text}. {occupation_text}. {age_text}"
-            
-            # Tokenize input
-            inputs = self.domain_tokenizer(input_text, return_tensors="pt", max_length=512, truncation=True, padding=True)
+            age = int(float(age))
+            # Snap to the start of the configured age bucket (DOMAIN_AGE_BUCKET=1 keeps exact ages)
+            age -= age % self.domain_age_bucket
+        except (TypeError, ValueError):
+            age = str(age).strip()
+        return phq9_answers, history, occupation, age
+    
+    def build_domain_input(self, phq9_answers, history, occupation, age):
+        """Build the RoBERTa input text combining all factors"""
+        phq9_text = f"PHQ-9 responses: {phq9_answers}"
+        history_text = f"Mental health history: {history}" if history else "No mental health history"
+        occupation_text = f"Occupation: {occupation}"
+        age_text = f"Age: {age}"
+        
+        return f"{phq9_text}. {history_text}. {occupation_text}. {age_text}"
+    
+    def domain_logits(self, input_texts):
+        """Return classifier logits for a batch of input texts from the active backend"""
+        # Tokenize input
+        with STAGE_SECONDS.time(component="classification", stage="tokenize"):
+            inputs = self.domain_tokenizer(input_texts, return_tensors="pt", max_length=512, truncation=True, padding=True)
+        
+        with STAGE_SECONDS.time(component="classification", stage="forward"):
+            if self.domain_onnx is not None:
+                return torch.from_numpy(self.domain_onnx.logits(inputs))
             
-            # Get prediction
             with torch.no_grad():
-                outputs = self.domain_model(**inputs)
-                predictions = torch.nn.functional.softmax(outputs.logits, dim=-1)
-                predicted_class_id = predictions.argmax().item()
+                return self.domain_model(**inputs).logits
+    
+    def assign_domains_batch(self, input_texts):
+        """Run the domain classifier over a batch of input texts in a single padded forward pass"""
+        logits = self.domain_logits(input_texts)
+        with STAGE_SECONDS.time(component="classification", stage="decode"):
+            predictions = torch.nn.functional.softmax(logits, dim=-1)
+            confidences, predicted_class_ids = predictions.max(dim=-1)
+            
+            class_ids = predicted_class_ids.tolist()
             
-            # Map prediction to domain label
+            # Map predictions to domain labels
             if self.label_encoder is not None:
-                domain = self.label_encoder.inverse_transform([predicted_class_id])[0]
+                domains = self.label_encoder.inverse_transform(class_ids)
             else:
                 # Fallback mapping if label encoder not available
-                domain = self.domain_labels[predicted_class_id % len(self.domain_labels)]
+                domains = [self.domain_labels[class_id % len(self.domain_labels)] for class_id in class_ids]
             
             # Normalize to simple label set
-            domain = str(domain).strip()
-            confidence = float(predictions.max().item())
+            return [
+                (str(domain).strip(), float(confidence))
+                for domain, confidence in zip(domains, confidences.tolist())
+            ]
+    
+    def run_model_work(self, work_class, fn, *args):
+        """
+        Run fn on the scheduler's workers for `work_class`, or inline when the
+        scheduler is disabled or the request is being profiled (the profiler
+        does not see the long-lived worker threads)
+        """
+        if self.scheduler is None or request_profiler.profiling_this_thread():
+            with torch.no_grad():
+                return fn(*args)
+        enqueued_at = time.perf_counter()
+        
+        def timed(*args):
+            STAGE_SECONDS.observe(time.perf_counter() - enqueued_at, component=work_class, stage="queue_wait")
+            return fn(*args)
+        
+        return self.scheduler.run(work_class, timed, *args)
+    
+    def classify_batch(self, input_texts):
+        """assign_domains_batch scheduled as classification work"""
+        return self.run_model_work("classification", self.assign_domains_batch, input_texts)
+    
+    def assign_domain(self, phq9_answers, history, occupation, age):
+        """Use trained RoBERTa model to assign domain"""
+        try:
+            phq9_answers, history, occupation, age = self.canonical_domain_inputs(phq9_answers, history, occupation, age)
+            
+            # Without free-text history the answer may already be in the precomputed table
+            if not history and self.domain_table is not None:
+                precomputed = self.domain_table.lookup(phq9_answers, occupation, age)
+                if precomputed is not None:
+                    return precomputed
+            
+            cache_key = canonical_key("domain", phq9_answers, history, occupation, age)
+            cached = self.domain_cache.get(cache_key)
+            if cached is not None:
+                return cached
             
-            return domain, confidence
+            input_text = self.build_domain_input(phq9_answers, history, occupation, age)
             
+            if self.domain_batcher is not None and not request_profiler.profiling_this_thread():
+                result = self.domain_batcher(input_text)
+            else:
+                result = self.classify_batch([input_text])[0]
+            
+            self.domain_cache.set(cache_key, result)
+            return result
+            
+        except SchedulerOverloaded:
+            raise
         except Exception as e:
             print(f"Error in domain assignment: {e}")
             return 'General Depression', 0.5
     
-    def generate_questions(self, phq9_answers, domain, history, previous_answers=None, is_followup=False):
-        """Use trained T5 model to generate personalized questions"""
+    def validate_latency_budget(self, latency_budget_ms):
+        """Return an error message if latency_budget_ms is not a non-negative number, else None"""
+        if latency_budget_ms is None:
+            return None
+        if isinstance(latency_budget_ms, bool) or not isinstance(latency_budget_ms, (int, float)) or latency_budget_ms < 0:
+            return "latency_budget_ms must be a non-negative number of milliseconds"
+        return None
+    
+    def validate_decoding_profile(self, decoding_profile):
+        """Return an error message if the requested decoding profile is unknown, else None"""
+        if decoding_profile is not None and decoding_profile not in DECODING_PROFILES:
+            return f"Unknown decoding_profile '{decoding_profile}', expected one of {list(DECODING_PROFILES)}"
+        return None
+    
+    def validate_question_request(self, num_questions, generation_mode):
+        """Return an error message for an invalid num_questions or generation_mode, else None"""
+        if not isinstance(num_questions, int) or isinstance(num_questions, bool) or not 1 <= num_questions <= 20:
+            return "num_questions must be an integer between 1 and 20"
+        if generation_mode is not None and generation_mode not in QUESTION_GENERATION_MODES:
+            return f"Unknown generation_mode '{generation_mode}', expected one of {list(QUESTION_GENERATION_MODES)}"
+        return None
+    
+    def validate_phq9_answers(self, phq9_answers):
+        """Return an error message if the PHQ-9 answers are malformed, else None"""
+        if not phq9_answers or not isinstance(phq9_answers, list) or len(phq9_answers) != 9:
+            return "PHQ-9 answers must contain exactly 9 responses"
+        return None
+    
+    def assign_domains_bulk(self, records, batch_size=32):
+        """Assign domains for many records at once using token-length-bucketed batches, preserving input order"""
+        results = [None] * len(records)
+        pending = []
+        
+        for index, record in enumerate(records):
+            if not isinstance(record, dict):
+                results[index] = {"index": index, "error": "Record must be an object"}
+                continue
+            phq9_answers = record.get('phq9_answers')
+            error = self.validate_phq9_answers(phq9_answers)
+            if error:
+                results[index] = {"index": index, "error": error}
+                continue
+            try:
+                phq9_score = self.calculate_phq9_score(phq9_answers)
+                input_text = self.build_domain_input(*self.canonical_domain_inputs(
+                    phq9_answers,
+                    record.get('history', ''),
+                    record.get('occupation', ''),
+                    record.get('age', 25)
+                ))
+            except Exception as e:
+                results[index] = {"index": index, "error": f"Invalid record: {e}"}
+                continue
+            pending.append((index, phq9_score, input_text))
+        
+        # Sort by token count (what padding is measured in, unlike characters)
+        # so each batch pads to a similar sequence length
+        if pending:
+            lengths = self.domain_tokenizer(
+                [text for _, _, text in pending], max_length=512, truncation=True
+            )["input_ids"]
+            order = sorted(range(len(pending)), key=lambda i: len(lengths[i]))
+            pending = [pending[i] for i in order]
+        
+        for start in range(0, len(pending), batch_size):
+            bucket = pending[start:start + batch_size]
+            try:
+                predictions = self.classify_batch([text for _, _, text in bucket])
+            except Exception as e:
+                print(f"Error in bulk domain assignment batch: {e}")
+                for index, _, _ in bucket:
+                    results[index] = {"index": index, "error": f"Domain assignment failed: {e}"}
+                continue
+            for (index, phq9_score, _), (domain, confidence) in zip(bucket, predictions):
+                results[index] = {
+                    "index": index,
+                    "phq9_score": phq9_score,
+                    "domain": domain,
+                    "confidence": confidence
+                }
+        
+        return results
+    
+    def build_question_prompt(self, phq9_answers, domain, history, previous_answers=None, is_followup=False):
+        """Build the T5 question-generation prompt"""
+        # Create context for question generation
+        if is_followup:
+            context = f"Follow-up session. PHQ-9: {phq9_answers}. Domain: {domain}. History: {history}. Previous answers: {previous_answers}"
+        else:
+            context = f"Initial screening. PHQ-9: {phq9_answers}. Domain: {domain}. History: {history}"
+        
+        # Add generation prompt
+        return f"Generate therapeutic questions based on: {context}"
+    
+    def extract_questions(self, text, seen):
+        """Split generated text into cleaned questions, appending new ones to `seen` and returning them"""
+        new_questions = []
+        # Split on question marks and line breaks
+        parts = QUESTION_SPLIT_PATTERN.split(text)
+        for p in parts:
+            q = p.strip()
+            if not q:
+                continue
+            # Ensure ends with '?'
+            if not q.endswith('?') and len(q.split()) > 3:
+                q = q.rstrip('.') + '?'
+            # Remove numbering/prefixes
+            q = re.sub(r"^\s*\d+\s*[).:-]\s*", "", q)
+            # Filter overly long or duplicate
+            if 8 <= len(q) <= 180 and q not in seen:
+                seen.append(q)
+                new_questions.append(q)
+        return new_questions
+    
+    def tokenize_question_prompt(self, input_text):
+        return self.question_tokenizer(
+            input_text,
+            return_tensors="pt",
+            max_length=512,
+            truncation=True,
+            padding=True
+        )
+    
+    def question_prompt(self, phq9_answers, domain, history, previous_answers=None, is_followup=False, session=None):
+        """
+        The question prompt. With a screening `session`, it is built once per
+        session state and reused by later calls.
+        """
+        def build_prompt():
+            return self.build_question_prompt(phq9_answers, domain, history, previous_answers, is_followup)
+        
+        return build_prompt() if session is None else session.memo(("question_prompt", is_followup), build_prompt)
+    
+    def question_inputs(self, input_text, session=None):
+        """Tokenized question prompt, memoised per session state like the prompt itself"""
+        with STAGE_SECONDS.time(component="questions", stage="tokenize"):
+            if session is None:
+                return self.tokenize_question_prompt(input_text)
+            return session.memo(("question_inputs", input_text), lambda: self.tokenize_question_prompt(input_text))
+    
+    def generate_questions(self, phq9_answers, domain, history, previous_answers=None, is_followup=False, decoding_profile=None,
+                           session=None, num_questions=5):
+        """Use trained T5 model to generate up to `num_questions` personalized questions"""
         try:
-            # Create context for question generation
-            if is_followup:
-                context = f"Follow-up session. PHQ-9: {phq9_answers}. Domain: {domain}. History: {history}. Previous answers: {previous_answers}"
-            else:
-                context = f"Initial screening. PHQ-9: {phq9_answers}. Domain: {domain}. History: {history}"
+            decoding_profile = decoding_profile or self.decoding_profile
+            input_text = self.question_prompt(phq9_answers, domain, history, previous_answers, is_followup, session)
             
-            # Add generation prompt
-            input_text = f"Generate therapeutic questions based on: {context}"
+            cache_key = None
+            if self.question_cache is not None:
+                cache_key = canonical_key("questions", decoding_profile, input_text)
+                cached = self.question_cache.get(cache_key)
+                if cached is not None:
+                    return list(cached[:num_questions])
             
             # Tokenize input
-            inputs = self.question_tokenizer(
-                input_text,
-                return_tensors="pt",
-                max_length=512,
-                truncation=True,
-                padding=True
-            )
+            inputs = self.question_inputs(input_text, session)
             
             # Generate questions
-            with torch.no_grad():
-                outputs = self.question_model.generate(
-                    **inputs,
-                    max_length=128,
-                    num_beams=8,
-                    temperature=0.9,
-                    do_sample=True,
-                    pad_token_id=self.question_tokenizer.pad_token_id,
-                    eos_token_id=self.question_tokenizer.eos_token_id,
-                    num_return_sequences=8
-                )
+            def generate():
+                with STAGE_SECONDS.time(component="questions", stage="generate"):
+                    return self.question_model.generate(
+                        **self.generation_inputs(self.question_encoder_cache, self.question_model, inputs),
+                        max_length=QUESTION_MAX_LENGTH,
+                        pad_token_id=self.question_tokenizer.pad_token_id,
+                        eos_token_id=self.question_tokenizer.eos_token_id,
+                        **QUESTION_DECODING_PROFILES[decoding_profile]
+                    )
+            
+            outputs = self.run_model_work("questions", generate)
             
             # Decode and split into separate questions
-            raw_outputs = [
-                self.question_tokenizer.decode(output, skip_special_tokens=True)
-                for output in outputs
-            ]
-
+            with STAGE_SECONDS.time(component="questions", stage="decode"):
+                raw_outputs = [
+                    self.question_tokenizer.decode(output, skip_special_tokens=True)
+                    for output in outputs
+                ]
+            
             split_questions = []
-            for text in raw_outputs:
-                # Split on question marks and line breaks
-                parts = re.split(r"[\n\r]+|(?<=\?)\s+", text)
-                for p in parts:
-                    q = p.strip()
-                    if not q:
-                        continue
-                    # Ensure ends with '?'
-                    if not q.endswith('?') and len(q.split()) > 3:
-                        q = q.rstrip('.') + '?'
-                    # Remove numbering/prefixes
-                    q = re.sub(r"^\s*\d+\s*[).:-]\s*", "", q)
-                    # Filter overly long or duplicate
-                    if 8 <= len(q) <= 180 and q not in split_questions:
-                        split_questions.append(q)
-
-            return split_questions[:5]
+            with STAGE_SECONDS.time(component="questions", stage="postprocess"):
+                for text in raw_outputs:
+                    self.extract_questions(text, split_questions)
             
+            # Every distinct question is cached so requests for more can share the entry
+            if cache_key is not None and split_questions:
+                self.question_cache.set(cache_key, tuple(split_questions))
+            return split_questions[:num_questions]
+            
+        except SchedulerOverloaded:
+            raise
         except Exception as e:
             print(f"Error in question generation: {e}")
             return []
     
+    def generate_questions_incremental(self, phq9_answers, domain, history, previous_answers=None, is_followup=False,
+                                       decoding_profile=None, session=None, num_questions=5):
+        """
+        Sample QUESTION_INCREMENTAL_BATCH candidates per round and stop once
+        `num_questions` distinct valid questions are out; _QuestionCollector
+        ends a round mid-sequence as soon as enough have finished. Beam
+        search cannot stop per candidate, so like the streaming endpoint this
+        samples with the profile's temperature/top-k, up to its
+        num_return_sequences candidates. Returns (questions, work), where
+        work reports the tokens and candidates generated next to their
+        ceiling: every candidate decoded to QUESTION_MAX_LENGTH. Full mode's
+        beam search usually ends well before that ceiling, so the difference
+        is an upper bound on the work saved, not a measurement of it.
+        """
+        decoding_profile = decoding_profile or self.decoding_profile
+        profile = QUESTION_DECODING_PROFILES[decoding_profile]
+        sampling = {key: profile[key] for key in ("temperature", "top_k") if key in profile}
+        max_sequences = profile["num_return_sequences"]
+        work = {
+            "mode": "incremental",
+            "cached": False,
+            "sequences_generated": 0,
+            "sequence_ceiling": max_sequences,
+            "tokens_generated": 0,
+            "token_ceiling": max_sequences * QUESTION_MAX_LENGTH,
+            "stopped_early": False,
+            "failed": False
+        }
+        questions = []
+        try:
+            input_text = self.question_prompt(phq9_answers, domain, history, previous_answers, is_followup, session)
+            
+            cache_key = None
+            if self.question_cache is not None:
+                cache_key = canonical_key("questions-incremental", decoding_profile, input_text)
+                cached = self.question_cache.get(cache_key)
+                if cached is not None and len(cached) >= num_questions:
+                    # Nothing was decoded, so there is nothing to compare with the ceiling
+                    work.update(cached=True, tokens_under_ceiling=None)
+                    return list(cached[:num_questions]), work
+            
+            inputs = self.question_inputs(input_text, session)
+            
+            def generate_round(batch, collector):
+                with STAGE_SECONDS.time(component="questions", stage="generate"):
+                    return self.question_model.generate(
+                        **self.generation_inputs(self.question_encoder_cache, self.question_model, inputs),
+                        max_length=QUESTION_MAX_LENGTH,
+                        num_beams=1,
+                        do_sample=True,
+                        num_return_sequences=batch,
+                        pad_token_id=self.question_tokenizer.pad_token_id,
+                        eos_token_id=self.question_tokenizer.eos_token_id,
+                        stopping_criteria=StoppingCriteriaList([collector]),
+                        **sampling
+                    )
+            
+            while len(questions) < num_questions and work["sequences_generated"] < max_sequences:
+                batch = min(self.question_incremental_batch, max_sequences - work["sequences_generated"])
+                collector = _QuestionCollector(self, num_questions, questions)
+                outputs = self.run_model_work("questions", generate_round, batch, collector)
+                
+                # Same rule as the collector: a cut-off last fragment would be
+                # padded with '?' by extract_questions and displace real questions
+                with STAGE_SECONDS.time(component="questions", stage="decode"):
+                    candidate_parts = [
+                        finished_question_parts(self.question_tokenizer, output)
+                        for output in outputs
+                    ]
+                with STAGE_SECONDS.time(component="questions", stage="postprocess"):
+                    for parts in candidate_parts:
+                        for part in parts:
+                            self.extract_questions(part, questions)
+                
+                work["sequences_generated"] += batch
+                # Decoder positions after the start token that hold real tokens (padding follows EOS)
+                work["tokens_generated"] += int((outputs[:, 1:] != self.question_tokenizer.pad_token_id).sum())
+                work["stopped_early"] = work["stopped_early"] or collector.stopped
+            
+            work["stopped_early"] = work["stopped_early"] or work["sequences_generated"] < max_sequences
+            if cache_key is not None and questions:
+                self.question_cache.set(cache_key, tuple(questions))
+            
+        except SchedulerOverloaded:
+            raise
+        except Exception as e:
+            print(f"Error in incremental question generation: {e}")
+            work["failed"] = True
+        
+        work["tokens_under_ceiling"] = work["token_ceiling"] - work["tokens_generated"]
+        QUESTION_TOKENS_TOTAL.inc(work["tokens_generated"], kind="generated")
+        QUESTION_TOKENS_TOTAL.inc(work["token_ceiling"], kind="ceiling")
+        return questions[:num_questions], work
+    
+    def stream_questions(self, phq9_answers, domain, history, previous_answers=None, is_followup=False,
+                         decoding_profile=None, max_questions=5):
+        """
+        Yield cleaned, deduplicated questions as soon as each one has been decoded.
+        Sequences are sampled one at a time with a token streamer (beam search
+        cannot stream), using the profile's temperature/top-k and up to its
+        num_return_sequences, and generation stops once max_questions are out.
+        """
+        decoding_profile = decoding_profile or self.decoding_profile
+        profile = QUESTION_DECODING_PROFILES[decoding_profile]
+        input_text = self.build_question_prompt(phq9_answers, domain, history, previous_answers, is_followup)
+        
+        if self.question_cache is not None:
+            cached = self.question_cache.get(canonical_key("questions", decoding_profile, input_text))
+            if cached is not None:
+                yield from cached[:max_questions]
+                return
+        
+        inputs = self.question_inputs(input_text)
+        sampling = {key: profile[key] for key in ("temperature", "top_k") if key in profile}
+        seen = []
+        
+        for _ in range(profile["num_return_sequences"]):
+            streamer = TextIteratorStreamer(self.question_tokenizer, skip_prompt=True, skip_special_tokens=True)
+            stop = threading.Event()
+            if self.scheduler is not None:
+                worker = self.scheduler.submit("questions", self._generate_streaming, inputs, streamer, stop, sampling)
+            else:
+                worker = threading.Thread(
+                    target=self._generate_streaming,
+                    args=(inputs, streamer, stop, sampling),
+                    daemon=True
+                )
+                worker.start()
+            
+            buffer = ""
+            try:
+                for chunk in streamer:
+                    buffer += chunk
+                    parts = QUESTION_SPLIT_PATTERN.split(buffer)
+                    # Every part except the last is complete and can be cleaned now
+                    buffer = parts[-1]
+                    for part in parts[:-1]:
+                        for question in self.extract_questions(part, seen):
+                            yield question
+                            if len(seen) >= max_questions:
+                                return
+                for question in self.extract_questions(buffer, seen):
+                    yield question
+                    if len(seen) >= max_questions:
+                        return
+            finally:
+                stop.set()
+                if isinstance(worker, threading.Thread):
+                    worker.join()
+                elif not worker.cancel():
+                    worker.result()
+    
+    def _generate_streaming(self, inputs, streamer, stop, sampling):
+        try:
+            with torch.no_grad():
+                self.question_model.generate(
+                    **self.generation_inputs(self.question_encoder_cache, self.question_model, inputs),
+                    max_length=QUESTION_MAX_LENGTH,
+                    num_beams=1,
+                    do_sample=True,
+                    pad_token_id=self.question_tokenizer.pad_token_id,
+                    eos_token_id=self.question_tokenizer.eos_token_id,
+                    streamer=streamer,
+                    stopping_criteria=StoppingCriteriaList([_StopOnEvent(stop)]),
+                    **sampling
+                )
+        except Exception as e:
+            print(f"Error in streaming question generation: {e}")
+            # Unblock the consumer if generation failed before finishing the stream
+            streamer.end()
+    
+    def cached_gemini(self, prompt, parse, latency_budget_ms=None):
+        """
+        Gemini call + parse. Concurrent identical prompts share one call and
+        successfully parsed results are cached by prompt hash; parse errors
+        propagate and are not cached. Raises CircuitOpenError when the breaker
+        is open, and LatencyBudgetExceeded when `latency_budget_ms` runs out
+        first - the call keeps running and its outcome still reaches the
+        breaker and the cache.
+        """
+        key = canonical_key("gemini", gemini_client.model_name, prompt)
+        if self.gemini_cache is not None:
+            cached = self.gemini_cache.get(key)
+            if cached is not None:
+                GEMINI_CALLS_TOTAL.inc(outcome="cache_hit")
+                return copy.deepcopy(cached)
+        
+        def start():
+            admitted = self.gemini_breaker.allow()
+            if admitted is None:
+                GEMINI_CALLS_TOTAL.inc(outcome="circuit_open")
+                raise CircuitOpenError("Gemini circuit is open")
+            started = time.perf_counter()
+            try:
+                response = gemini_client.submit(prompt)
+            except Exception:
+                GEMINI_CALLS_TOTAL.inc(outcome="api_error")
+                self.gemini_breaker.record(admitted, False, time.perf_counter() - started)
+                raise
+            parsed = Future()
+            
+            def finish(response):
+                latency = time.perf_counter() - started
+                STAGE_SECONDS.observe(latency, component="gemini", stage="round_trip")
+                outcome = "api_error"
+                try:
+                    result_text = response.result().strip()
+                    outcome = "parse_error"
+                    with STAGE_SECONDS.time(component="gemini", stage="parse"):
+                        result = parse(result_text)
+                except Exception as e:
+                    GEMINI_CALLS_TOTAL.inc(outcome=outcome)
+                    self.gemini_breaker.record(admitted, False, latency)
+                    parsed.set_exception(e)
+                    return
+                GEMINI_CALLS_TOTAL.inc(outcome="ok")
+                self.gemini_breaker.record(admitted, True, latency)
+                if self.gemini_cache is not None:
+                    self.gemini_cache.set(key, result)
+                parsed.set_result(result)
+            
+            response.add_done_callback(finish)
+            return parsed
+        
+        timeout = gemini_client.timeout
+        budget = (latency_budget_ms or 0) / 1000.0
+        if 0 < budget < timeout:
+            timeout = budget
+        try:
+            result = self.gemini_flight.submit(key, start).result(timeout=timeout)
+        except FutureTimeoutError:
+            if timeout == budget:
+                raise LatencyBudgetExceeded(f"Gemini did not respond within the {budget * 1000.0:.0f}ms budget")
+            raise GeminiTimeout(f"Gemini did not respond within {timeout:.1f}s")
+        
+        # Callers may modify the result, so each gets its own copy
+        return copy.deepcopy(result)
+    
+    def strip_code_fences(self, result_text):
+        """Remove markdown code blocks if present"""
+        if result_text.startswith('```json'):
+            result_text = result_text[7:]
+        if result_text.startswith('```'):
+            result_text = result_text[3:]
+        if result_text.endswith('```'):
+            result_text = result_text[:-3]
+        return result_text.strip()
+    
+    def parse_depression_response(self, result_text):
+        """Parse and validate Gemini's depression level JSON; raises on malformed output"""
+        print(f"Raw Gemini response for depression level: {result_text}")
+        result = json.loads(self.strip_code_fences(result_text))
+        
+        # Validate the response structure
+        if not all(key in result for key in ['depression_level', 'confidence', 'key_indicators']):
+            raise ValueError("Missing required keys in response")
+            
+        # Ensure confidence is a float between 0 and 1
+        result['confidence'] = max(0.0, min(1.0, float(result['confidence'])))
+        
+        # Ensure key_indicators is a list
+        if not isinstance(result['key_indicators'], list):
+            result['key_indicators'] = [str(result['key_indicators'])]
+            
+        return result
+    
+    def parse_suggestions_response(self, result_text):
+        """Parse Gemini's JSON array of suggestions; raises json.JSONDecodeError on malformed output"""
+        print(f"Raw Gemini response for suggestions: {result_text}")
+        suggestions = json.loads(self.strip_code_fences(result_text))
+        if not isinstance(suggestions, list):
+            suggestions = [str(suggestions)]
+        return [str(item) for item in suggestions]
+    
+    def predict_depression_level(self, phq9_answers, domain, history, follow_up_answers, latency_budget_ms=None):
+        """
+        Predict depression level (4-level scale). The local classifier answers
+        when it is confident enough and agrees with the PHQ-9 band; otherwise
+        the assessment escalates to Gemini.
+        """
+        # Timed only when the local tier exists, so its histogram holds real classifier runs
+        if self.local_predictor is not None:
+            with STAGE_SECONDS.time(component="depression", stage="tier_local"):
+                result = self.predict_depression_level_locally(phq9_answers, domain, follow_up_answers)
+            if result is not None:
+                return result
+        
+        with STAGE_SECONDS.time(component="depression", stage="tier_gemini"):
+            return self.predict_depression_level_with_gemini(
+                phq9_answers, domain, history, follow_up_answers, latency_budget_ms
+            )
+    
+    def depression_cascade_stats(self):
+        local = DEPRESSION_SOURCE_TOTAL.value(source="local")
+        escalated = DEPRESSION_ESCALATIONS_TOTAL.total()
+        return {
+            "enabled": self.local_predictor is not None,
+            "min_confidence": self.local_min_confidence,
+            "require_band_agreement": self.local_require_band_agreement,
+            "served_locally": local,
+            "escalated": escalated,
+            "escalation_rate": escalated / (local + escalated) if local + escalated else 0.0,
+            "embedding_store": (
+                self.local_predictor.store.stats()
+                if self.local_predictor is not None and self.local_predictor.store is not None else None
+            )
+        }
+    
+    def follow_up_qa_pairs(self, follow_up_answers):
+        """Normalise follow-up answers (strings, {question, answer} dicts or pairs) to (question, answer) tuples"""
+        qa_pairs = []
+        for item in follow_up_answers or []:
+            if isinstance(item, dict):
+                qa_pairs.append((str(item.get("question", "")), str(item.get("answer", ""))))
+            elif isinstance(item, (list, tuple)) and len(item) == 2:
+                qa_pairs.append((str(item[0]), str(item[1])))
+            else:
+                qa_pairs.append(("", str(item)))
+        return qa_pairs
     
-    def predict_depression_level(self, phq9_answers, domain, history, follow_up_answers):
+    def predict_depression_level_locally(self, phq9_answers, domain, follow_up_answers):
+        """Local MiniLM + XGBoost tier; returns None when the assessment should escalate to Gemini"""
+        if self.local_predictor is None:
+            return None
+        
+        phq9_score = self.calculate_phq9_score(phq9_answers)
+        band_level = self.phq9_depression_level(phq9_score)
+        try:
+            prediction = self.run_model_work(
+                "classification", self.local_predictor.predict, self.follow_up_qa_pairs(follow_up_answers)
+            )
+        except Exception as e:
+            print(f"Error in local depression prediction: {e}")
+            prediction = None
+        
+        depression_level = prediction.get("depression_level") if prediction else None
+        confidence = prediction.get("confidence") if prediction else None
+        if prediction is None:
+            reason = "local_error"
+        elif "error" in prediction:
+            reason = "no_answers"
+        elif depression_level not in DEPRESSION_LEVELS:
+            reason = "unknown_label"
+        elif confidence is None or confidence < self.local_min_confidence:
+            reason = "low_confidence"
+        elif self.local_require_band_agreement and depression_level != band_level:
+            reason = "band_disagreement"
+        else:
+            reason = None
+        if reason is not None:
+            DEPRESSION_ESCALATIONS_TOTAL.inc(reason=reason)
+            return None
+        
+        DEPRESSION_SOURCE_TOTAL.inc(source="local")
+        return {
+            "depression_level": depression_level,
+            "confidence": float(confidence),
+            "key_indicators": [
+                f"PHQ-9 score of {phq9_score} indicates {band_level.lower()} depression",
+                f"Follow-up responses classified as {depression_level.lower()} ({confidence:.0%} confidence)",
+                f"Primary domain: {domain}"
+            ]
+        }
+    
+    def predict_depression_level_with_gemini(self, phq9_answers, domain, history, follow_up_answers,
+                                             latency_budget_ms=None):
         """Use Gemini API to predict depression level (4-level scale)"""
+        if latency_budget_ms is None:
+            latency_budget_ms = self.gemini_latency_budget_ms
         try:
             phq9_score = self.calculate_phq9_score(phq9_answers)
             
@@ -227,57 +1309,24 @@ class MentalHealthAI:
             }}
             """
             
-            response = gemini_model.generate_content(prompt)
-            result_text = response.text.strip()
-            print(f"Raw Gemini response for depression level: {result_text}")
-            
-            # Clean the response text
-            # Remove markdown code blocks if present
-            if result_text.startswith('```json'):
-                result_text = result_text[7:]
-            if result_text.startswith('```'):
-                result_text = result_text[3:]
-            if result_text.endswith('```'):
-                result_text = result_text[:-3]
-            
-            result_text = result_text.strip()
-            
-            # Parse JSON response
+            # Call Gemini (coalesced + cached by prompt) and parse its JSON response
             try:
-                result = json.loads(result_text)
-                
-                # Validate the response structure
-                if not all(key in result for key in ['depression_level', 'confidence', 'key_indicators']):
-                    raise ValueError("Missing required keys in response")
-                    
-                # Ensure confidence is a float between 0 and 1
-                result['confidence'] = max(0.0, min(1.0, float(result['confidence'])))
-                
-                # Ensure key_indicators is a list
-                if not isinstance(result['key_indicators'], list):
-                    result['key_indicators'] = [str(result['key_indicators'])]
-                    
+                result = self.cached_gemini(prompt, self.parse_depression_response, latency_budget_ms)
+                DEPRESSION_SOURCE_TOTAL.inc(source="gemini")
                 return result
                 
             except (json.JSONDecodeError, ValueError, KeyError) as e:
                 print(f"Error parsing Gemini response: {e}")
-                print(f"Raw response: {result_text}")
+                DEPRESSION_SOURCE_TOTAL.inc(source="fallback_parse_error")
                 
                 # Fallback: Try to extract information manually
-                depression_level = "Moderate"  # Default based on PHQ-9 score
-                if phq9_score <= 4:
-                    depression_level = "No Depression"
-                elif phq9_score <= 9:
-                    depression_level = "Mild"
-                elif phq9_score <= 14:
-                    depression_level = "Moderate"
-                else:
-                    depression_level = "Severe"
+                depression_level = self.phq9_depression_level(phq9_score)
                     
                 return {
                     "depression_level": depression_level,
                     "confidence": 0.7,
-                    "key_indicators": [f"PHQ-9 score of {phq9_score} indicates {depression_level.lower()} depression", f"Primary domain: {domain}", "AI analysis completed with fallback scoring"]
+                    "key_indicators": [f"PHQ-9 score of {phq9_score} indicates {depression_level.lower()} depression", f"Primary domain: {domain}", "AI analysis completed with fallback scoring"],
+                    "fallback": True
                 }
             
         except Exception as e:
@@ -285,26 +1334,31 @@ class MentalHealthAI:
             phq9_score = self.calculate_phq9_score(phq9_answers)
             
             # Fallback scoring based on PHQ-9
-            depression_level = "Moderate"
-            if phq9_score <= 4:
-                depression_level = "No Depression"
-            elif phq9_score <= 9:
-                depression_level = "Mild"
-            elif phq9_score <= 14:
-                depression_level = "Moderate"
-            else:
-                depression_level = "Severe"
+            depression_level = self.phq9_depression_level(phq9_score)
+            reason, source = "API error", "fallback_api_error"
+            if isinstance(e, CircuitOpenError):
+                reason, source = "Gemini being unavailable (circuit open)", "fallback_circuit_open"
+            elif isinstance(e, LatencyBudgetExceeded):
+                reason, source = "Gemini exceeding the latency budget", "fallback_latency_budget"
+            DEPRESSION_SOURCE_TOTAL.inc(source=source)
                 
             return {
                 "depression_level": depression_level,
                 "confidence": 0.6,
-                "key_indicators": [f"PHQ-9 score: {phq9_score}", f"Domain: {domain}", "Fallback assessment due to API error"]
+                "key_indicators": [f"PHQ-9 score: {phq9_score}", f"Domain: {domain}", f"Fallback assessment due to {reason}"],
+                "fallback": True
             }
     
     
-    def generate_suggestions_with_model(self, depression_level, domain, history, phq9_answers):
-        """Generate suggestions using trained T5 model (primary method)"""
+    def generate_suggestions_with_model(self, depression_level, domain, history, phq9_answers, decoding_profile=None,
+                                        stop=None):
+        """
+        Generate suggestions using trained T5 model (primary method). Setting
+        the `stop` event abandons the generation, e.g. a discarded speculative run.
+        """
         try:
+            decoding_profile = decoding_profile or self.decoding_profile
+            
             if self.suggestion_model is None or self.suggestion_tokenizer is None:
                 print("Trained suggestion model not available, using fallback")
                 return None
@@ -314,50 +1368,61 @@ class MentalHealthAI:
             input_text = f"Generate personalized treatment suggestions based on: {context}"
             
             # Tokenize input
-            inputs = self.suggestion_tokenizer(
-                input_text,
-                return_tensors="pt",
-                max_length=512,
-                truncation=True,
-                padding=True
-            )
-            
-            # Generate suggestions
-            with torch.no_grad():
-                outputs = self.suggestion_model.generate(
-                    **inputs,
-                    max_length=200,
-                    num_beams=6,
-                    temperature=0.8,
-                    do_sample=True,
-                    pad_token_id=self.suggestion_tokenizer.pad_token_id,
-                    eos_token_id=self.suggestion_tokenizer.eos_token_id,
-                    num_return_sequences=5
+            with STAGE_SECONDS.time(component="suggestions", stage="tokenize"):
+                inputs = self.suggestion_tokenizer(
+                    input_text,
+                    return_tensors="pt",
+                    max_length=512,
+                    truncation=True,
+                    padding=True
                 )
             
+            # Generate suggestions (when the queue is full this fails over to Gemini)
+            stopping = {} if stop is None else {"stopping_criteria": StoppingCriteriaList([_StopOnEvent(stop)])}
+            
+            def generate():
+                # A run abandoned while it waited in the queue never starts
+                if stop is not None and stop.is_set():
+                    return None
+                with STAGE_SECONDS.time(component="suggestions", stage="generate"):
+                    return self.suggestion_model.generate(
+                        **self.generation_inputs(self.suggestion_encoder_cache, self.suggestion_model, inputs),
+                        max_length=200,
+                        pad_token_id=self.suggestion_tokenizer.pad_token_id,
+                        eos_token_id=self.suggestion_tokenizer.eos_token_id,
+                        **stopping,
+                        **SUGGESTION_DECODING_PROFILES[decoding_profile]
+                    )
+            
+            outputs = self.run_model_work("suggestions", generate)
+            if outputs is None or (stop is not None and stop.is_set()):
+                return None
+            
             # Decode suggestions
-            raw_suggestions = [
-                self.suggestion_tokenizer.decode(output, skip_special_tokens=True)
-                for output in outputs
-            ]
+            with STAGE_SECONDS.time(component="suggestions", stage="decode"):
+                raw_suggestions = [
+                    self.suggestion_tokenizer.decode(output, skip_special_tokens=True)
+                    for output in outputs
+                ]
             
             # Process and clean suggestions
             processed_suggestions = []
-            for suggestion in raw_suggestions:
-                # Clean and format suggestion
-                clean_suggestion = suggestion.strip()
-                # Remove input context if it appears in output
-                if "Generate" in clean_suggestion:
-                    parts = clean_suggestion.split(".", 1)
-                    if len(parts) > 1:
-                        clean_suggestion = parts[1].strip()
-                
-                # Remove numbering/prefixes
-                clean_suggestion = re.sub(r"^\s*\d+\s*[).:-]\s*", "", clean_suggestion)
-                clean_suggestion = re.sub(r"^\s*[-*]\s*", "", clean_suggestion)
-                
-                if len(clean_suggestion) > 15 and clean_suggestion not in processed_suggestions:
-                    processed_suggestions.append(clean_suggestion)
+            with STAGE_SECONDS.time(component="suggestions", stage="postprocess"):
+                for suggestion in raw_suggestions:
+                    # Clean and format suggestion
+                    clean_suggestion = suggestion.strip()
+                    # Remove input context if it appears in output
+                    if "Generate" in clean_suggestion:
+                        parts = clean_suggestion.split(".", 1)
+                        if len(parts) > 1:
+                            clean_suggestion = parts[1].strip()
+                    
+                    # Remove numbering/prefixes
+                    clean_suggestion = re.sub(r"^\s*\d+\s*[).:-]\s*", "", clean_suggestion)
+                    clean_suggestion = re.sub(r"^\s*[-*]\s*", "", clean_suggestion)
+                    
+                    if len(clean_suggestion) > 15 and clean_suggestion not in processed_suggestions:
+                        processed_suggestions.append(clean_suggestion)
             
             return processed_suggestions[:5] if processed_suggestions else None
             
@@ -385,26 +1450,8 @@ class MentalHealthAI:
             ["suggestion1", "suggestion2", "suggestion3", "suggestion4", "suggestion5"]
             """
             
-            response = gemini_model.generate_content(prompt)
-            result_text = response.text.strip()
-            print(f"Raw Gemini response for suggestions: {result_text}")
-            
-            # Clean the response text
-            if result_text.startswith('```json'):
-                result_text = result_text[7:]
-            if result_text.startswith('```'):
-                result_text = result_text[3:]
-            if result_text.endswith('```'):
-                result_text = result_text[:-3]
-            
-            result_text = result_text.strip()
-            
             try:
-                suggestions = json.loads(result_text)
-                if not isinstance(suggestions, list):
-                    suggestions = [str(suggestions)]
-                suggestions = [str(item) for item in suggestions]
-                return suggestions
+                return self.cached_gemini(prompt, self.parse_suggestions_response)
             except json.JSONDecodeError as e:
                 print(f"Error parsing Gemini suggestions response: {e}")
                 return None
@@ -413,25 +1460,102 @@ class MentalHealthAI:
             print(f"Error generating suggestions with Gemini: {e}")
             return None
     
-    def generate_suggestions(self, depression_level, domain, history, phq9_answers):
-        """Generate personalized suggestions - uses trained model first, Gemini as fallback"""
+    def analyze_and_suggest(self, phq9_answers, domain, history, follow_up_answers, decoding_profile=None,
+                            latency_budget_ms=None):
+        """
+        Depression level + suggestions. The suggestion model's output for the
+        level implied by the PHQ-9 bands is generated in parallel with the
+        assessment and kept only if the assessment agrees. On a miss the
+        speculative generation is stopped and suggestions are produced for
+        the assessed level. Only the model tier is speculated, so a wrong
+        guess never spends Gemini calls.
+        """
+        def analyze():
+            return self.predict_depression_level(phq9_answers, domain, history, follow_up_answers, latency_budget_ms)
+        
+        def suggest(depression_level, model_suggestions=None):
+            return self.generate_suggestions(
+                depression_level, domain, history, phq9_answers, decoding_profile, model_suggestions
+            )
+        
+        def speculate(depression_level, stop):
+            # [] marks a model tier that ran and produced nothing
+            return self.generate_suggestions_with_model(
+                depression_level, domain, history, phq9_answers, decoding_profile, stop
+            ) or []
+        
+        guess = self.phq9_depression_level(self.calculate_phq9_score(phq9_answers))
+        # Profiled requests run sequentially so every stage is on the profiled
+        # thread; without a model, or when the catalog answers, there is nothing to overlap
+        if (
+            self.suggestion_speculator is None
+            or request_profiler.profiling_this_thread()
+            or self.suggestion_model is None
+            or (not (history or "").strip() and self.suggestion_catalog is not None
+                and self.suggestion_catalog.lookup(guess, domain, decoding_profile=decoding_profile))
+        ):
+            depression_analysis = analyze()
+            return depression_analysis, suggest(depression_analysis['depression_level'])
+        
+        depression_analysis, suggestions, hit = self.suggestion_speculator.run(
+            guess, speculate, analyze, lambda analysis: analysis['depression_level'], suggest
+        )
+        if hit:
+            suggestions = suggest(guess, suggestions)
+        return depression_analysis, suggestions
+    
+    def generate_suggestions(self, depression_level, domain, history, phq9_answers, decoding_profile=None,
+                             model_suggestions=None):
+        """
+        Generate personalized suggestions - uses trained model first, Gemini as fallback.
+        `model_suggestions` is the model tier's output when it already ran (speculatively).
+        """
         print(f"Generating suggestions for: Level={depression_level}, Domain={domain}")
         
+        # Method 0: without history, the precomputed catalog answers from memory
+        # (not for an explicitly requested profile other than the catalog's)
+        cataloged = None
+        if self.suggestion_catalog is not None and not (history or "").strip():
+            with STAGE_SECONDS.time(component="suggestions", stage="tier_catalog"):
+                cataloged = self.suggestion_catalog.lookup(depression_level, domain, decoding_profile=decoding_profile)
+        if cataloged:
+            print(f"✓ Served {len(cataloged)} suggestions from the precomputed catalog")
+            SUGGESTION_TIER_TOTAL.inc(tier="catalog")
+            return cataloged
+        
         # Method 1: Try trained T5 model first
-        suggestions = self.generate_suggestions_with_model(depression_level, domain, history, phq9_answers)
+        if model_suggestions is not None:
+            suggestions = model_suggestions
+        else:
+            with STAGE_SECONDS.time(component="suggestions", stage="tier_model"):
+                suggestions = self.generate_suggestions_with_model(
+                    depression_level, domain, history, phq9_answers, decoding_profile
+                )
         if suggestions and len(suggestions) > 0:
             print(f"✓ Generated {len(suggestions)} suggestions using trained model")
+            SUGGESTION_TIER_TOTAL.inc(tier="model")
             return suggestions
         
         # Method 2: Fallback to Gemini API
         print("Trained model failed, trying Gemini API...")
-        suggestions = self.generate_suggestions_with_gemini(depression_level, domain, history, phq9_answers)
+        with STAGE_SECONDS.time(component="suggestions", stage="tier_gemini"):
+            suggestions = self.generate_suggestions_with_gemini(depression_level, domain, history, phq9_answers)
         if suggestions and len(suggestions) > 0:
             print(f"✓ Generated {len(suggestions)} suggestions using Gemini API")
+            SUGGESTION_TIER_TOTAL.inc(tier="gemini")
             return suggestions
         
+        # Generic catalog suggestions (of any profile) still beat the predefined lists
+        if self.suggestion_catalog is not None:
+            cataloged = self.suggestion_catalog.lookup(depression_level, domain)
+        if cataloged:
+            print(f"✓ Falling back to {len(cataloged)} precomputed catalog suggestions")
+            SUGGESTION_TIER_TOTAL.inc(tier="catalog_fallback")
+            return cataloged
+        
         # Method 3: Last resort - predefined suggestions
         print("Both AI methods failed, using predefined suggestions")
+        tier_started = time.perf_counter()
         fallback_suggestions = {
             "No Depression": [
                 "Continue with healthy lifestyle habits like regular exercise and adequate sleep",
@@ -477,6 +1601,8 @@ class MentalHealthAI:
             base_suggestions = base_suggestions + [domain_specific[domain.lower()]]
             
         print(f"✓ Generated {len(base_suggestions[:5])} predefined suggestions")
+        STAGE_SECONDS.observe(time.perf_counter() - tier_started, component="suggestions", stage="tier_predefined")
+        SUGGESTION_TIER_TOTAL.inc(tier="predefined")
         return base_suggestions[:5]
     
     
@@ -484,6 +1610,64 @@ class MentalHealthAI:
 # Initialize the AI model
 ai_model = MentalHealthAI()
 
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def observe_request_latency(response):
+    # Streaming responses are observed when their headers go out, not when the stream ends
+    started = g.pop("request_started", None)
+    if started is not None:
+        endpoint = request.url_rule.rule if request.url_rule is not None else "unmatched"
+        REQUEST_SECONDS.observe(
+            time.perf_counter() - started, endpoint=endpoint, method=request.method, status=response.status_code
+        )
+    return response
+
+# Per-request profiling: send PROFILING_TOKEN in an X-Profile-Token header or a
+# profile_token query parameter. The torch profiler trace is written to
+# PROFILING_TRACE_DIR (path in the X-Profile-Trace header); X-Profile-Output or
+# profile_output "inline" adds the top ops to the JSON body instead. Without a
+# configured token these hooks are not registered at all.
+if request_profiler.enabled:
+    @app.before_request
+    def start_request_profile():
+        presented = request.headers.get("X-Profile-Token") or request.args.get("profile_token")
+        if presented is None:
+            return None
+        if not request_profiler.authorized(presented):
+            return jsonify({"error": "Invalid profiling token"}), 403
+        g.profile_session = request_profiler.start()
+        g.profile_busy = g.profile_session is None
+        return None
+
+    @app.after_request
+    def finish_request_profile(response):
+        session = g.pop("profile_session", None)
+        if session is None:
+            if g.pop("profile_busy", False):
+                response.headers["X-Profile-Status"] = "busy"
+            return response
+        
+        inline = (request.headers.get("X-Profile-Output") or request.args.get("profile_output")) == "inline"
+        summary = request_profiler.stop(session, f"{request.method} {request.path}", inline)
+        response.headers["X-Profile-Status"] = "captured"
+        if "trace_file" in summary:
+            response.headers["X-Profile-Trace"] = summary["trace_file"]
+        body = response.get_json(silent=True) if inline and not response.is_streamed else None
+        if isinstance(body, dict):
+            body["profile"] = summary
+            response.set_data(json.dumps(body))
+        return response
+
+    @app.teardown_request
+    def release_request_profile(error=None):
+        # Only reached with a live session when the response could not be finalized
+        session = g.pop("profile_session", None)
+        if session is not None:
+            request_profiler.stop(session, f"{request.method} {request.path}", inline=True)
+
 # API Endpoints
 @app.route("/api/phq9-submit", methods=["POST"])
 def submit_phq9():
@@ -495,8 +1679,9 @@ def submit_phq9():
         occupation = data.get('occupation', '')
         age = data.get('age', 25)
         
-        if not phq9_answers or len(phq9_answers) != 9:
-            return jsonify({"error": "PHQ-9 answers must contain exactly 9 responses"}), 400
+        error = ai_model.validate_phq9_answers(phq9_answers)
+        if error:
+            return jsonify({"error": error}), 400
         
         # Calculate PHQ-9 score
         phq9_score = ai_model.calculate_phq9_score(phq9_answers)
@@ -511,9 +1696,40 @@ def submit_phq9():
             "timestamp": datetime.now().isoformat()
         })
         
+    except SchedulerOverloaded as e:
+        return jsonify({"error": f"AI engine is busy, retry shortly: {str(e)}"}), 503, {"Retry-After": "1"}
     except Exception as e:
         return jsonify({"error": f"Error processing PHQ-9 submission: {str(e)}"}), 500
 
+@app.route("/api/phq9-submit/batch", methods=["POST"])
+def submit_phq9_batch():
+    """Assign domains for many PHQ-9 records in one call (used for backfills after model updates)"""
+    try:
+        data = request.get_json()
+        records = data.get('records') if isinstance(data, dict) else data
+        
+        if not isinstance(records, list) or not records:
+            return jsonify({"error": "Request must contain a non-empty array of records"}), 400
+        
+        max_records = int(os.getenv('DOMAIN_BULK_MAX_RECORDS', '5000'))
+        if len(records) > max_records:
+            return jsonify({"error": f"At most {max_records} records are accepted per request"}), 413
+        
+        results = ai_model.assign_domains_bulk(
+            records, batch_size=int(os.getenv('DOMAIN_BULK_BATCH_SIZE', '32'))
+        )
+        failed = sum(1 for result in results if "error" in result)
+        
+        return jsonify({
+            "results": results,
+            "succeeded": len(results) - failed,
+            "failed": failed,
+            "timestamp": datetime.now().isoformat()
+        })
+        
+    except Exception as e:
+        return jsonify({"error": f"Error processing PHQ-9 batch: {str(e)}"}), 500
+
 @app.route("/api/generate-questions", methods=["POST"])
 def generate_questions():
     """Generate personalized screening questions"""
@@ -524,48 +1740,149 @@ def generate_questions():
         history = data.get('history', '')
         previous_answers = data.get('previous_answers')
         is_followup = data.get('is_followup', False)
+        decoding_profile = data.get('decoding_profile')
+        num_questions = data.get('num_questions', 5)
+        generation_mode = data.get('generation_mode')
+        
+        # A session_id replaces the context; new_answers extend its previous answers
+        # (recorded on the session only once the call succeeds)
+        session = handle_screening_session(ai_model.sessions, data)
+        if session is not None:
+            phq9_answers, domain, history = session.phq9_answers, session.domain, session.history
+            previous_answers = session.answers or None
+            is_followup = data.get('is_followup', bool(session.answers))
         
         if not phq9_answers or not domain:
             return jsonify({"error": "PHQ-9 answers and domain are required"}), 400
+        error = (
+            ai_model.validate_decoding_profile(decoding_profile)
+            or ai_model.validate_question_request(num_questions, generation_mode)
+        )
+        if error:
+            return jsonify({"error": error}), 400
         
         # Generate questions using trained model
-        questions = ai_model.generate_questions(
-            phq9_answers, domain, history, previous_answers, is_followup
-        )
+        generation_mode = generation_mode or ai_model.question_generation_mode
+        generation = None
+        if generation_mode == "incremental":
+            questions, generation = ai_model.generate_questions_incremental(
+                phq9_answers, domain, history, previous_answers, is_followup, decoding_profile, session, num_questions
+            )
+        else:
+            questions = ai_model.generate_questions(
+                phq9_answers, domain, history, previous_answers, is_followup, decoding_profile, session, num_questions
+            )
+        # Generation errors come back as no questions; keep the delta retryable then
+        ai_model.commit_session(session, bool(questions) and not (generation or {}).get("failed"))
         
         return jsonify({
             "questions": questions,
             "domain": domain,
             "is_followup": is_followup,
+            "decoding_profile": decoding_profile or ai_model.decoding_profile,
+            "generation_mode": generation_mode,
+            **({"generation": generation} if generation is not None else {}),
+            **session_fields(session),
             "timestamp": datetime.now().isoformat()
         })
         
+    except SessionNotFound:
+        return session_not_found()
+    except SessionDeltaError as e:
+        return jsonify({"error": str(e)}), e.status
+    except SchedulerOverloaded as e:
+        return jsonify({"error": f"AI engine is busy, retry shortly: {str(e)}"}), 503, {"Retry-After": "1"}
     except Exception as e:
         return jsonify({"error": f"Error generating questions: {str(e)}"}), 500
 
+@app.route("/api/generate-questions/stream", methods=["POST"])
+def generate_questions_stream():
+    """Stream personalized screening questions as Server-Sent Events, one event per question"""
+    data = request.get_json()
+    phq9_answers = data.get('phq9_answers')
+    domain = data.get('domain')
+    history = data.get('history', '')
+    previous_answers = data.get('previous_answers')
+    is_followup = data.get('is_followup', False)
+    decoding_profile = data.get('decoding_profile')
+    
+    if not phq9_answers or not domain:
+        return jsonify({"error": "PHQ-9 answers and domain are required"}), 400
+    error = ai_model.validate_decoding_profile(decoding_profile)
+    if error:
+        return jsonify({"error": error}), 400
+    
+    def sse(event, payload):
+        return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+    
+    def events():
+        start = time.perf_counter()
+        questions = []
+        try:
+            for question in ai_model.stream_questions(
+                phq9_answers, domain, history, previous_answers, is_followup, decoding_profile
+            ):
+                questions.append(question)
+                yield sse("question", {
+                    "index": len(questions) - 1,
+                    "question": question,
+                    "elapsed_ms": (time.perf_counter() - start) * 1000.0
+                })
+            yield sse("done", {
+                "questions": questions,
+                "domain": domain,
+                "is_followup": is_followup,
+                "elapsed_ms": (time.perf_counter() - start) * 1000.0,
+                "timestamp": datetime.now().isoformat()
+            })
+        except Exception as e:
+            print(f"Error in streaming question generation: {e}")
+            yield sse("error", {"error": f"Error generating questions: {str(e)}", "questions": questions})
+    
+    return Response(
+        stream_with_context(events()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.route("/api/analyze-depression", methods=["POST"])
 def analyze_depression():
-    """Analyze depression level using Gemini API"""
+    """Analyze depression level (local classifier first, Gemini API on escalation)"""
     try:
         data = request.get_json()
         phq9_answers = data.get('phq9_answers')
         domain = data.get('domain')
         history = data.get('history', '')
         follow_up_answers = data.get('follow_up_answers')
+        latency_budget_ms = data.get('latency_budget_ms')
+        
+        session = handle_screening_session(ai_model.sessions, data)
+        if session is not None:
+            phq9_answers, domain, history = session.phq9_answers, session.domain, session.history
+            follow_up_answers = session.answers
         
         if not all([phq9_answers, domain, follow_up_answers]):
             return jsonify({"error": "PHQ-9 answers, domain, and follow-up answers are required"}), 400
+        error = ai_model.validate_latency_budget(latency_budget_ms)
+        if error:
+            return jsonify({"error": error}), 400
         
-        # Predict depression level using Gemini
+        # Predict depression level (local tier, escalating to Gemini)
         depression_analysis = ai_model.predict_depression_level(
-            phq9_answers, domain, history, follow_up_answers
+            phq9_answers, domain, history, follow_up_answers, latency_budget_ms
         )
+        ai_model.commit_session(session, not depression_analysis.get("fallback"))
         
         return jsonify({
             **depression_analysis,
+            **session_fields(session),
             "timestamp": datetime.now().isoformat()
         })
         
+    except SessionNotFound:
+        return session_not_found()
+    except SessionDeltaError as e:
+        return jsonify({"error": str(e)}), e.status
     except Exception as e:
         return jsonify({"error": f"Error analyzing depression level: {str(e)}"}), 500
 
@@ -578,13 +1895,17 @@ def generate_suggestions():
         domain = data.get('domain')
         history = data.get('history', '')
         phq9_answers = data.get('phq9_answers')
+        decoding_profile = data.get('decoding_profile')
         
         if not all([depression_level, domain, phq9_answers]):
             return jsonify({"error": "Depression level, domain, and PHQ-9 answers are required"}), 400
+        error = ai_model.validate_decoding_profile(decoding_profile)
+        if error:
+            return jsonify({"error": error}), 400
         
         # Generate suggestions using Gemini
         suggestions = ai_model.generate_suggestions(
-            depression_level, domain, history, phq9_answers
+            depression_level, domain, history, phq9_answers, decoding_profile
         )
         
         return jsonify({
@@ -606,19 +1927,25 @@ def complete_screening():
         domain = data.get('domain')
         history = data.get('history', '')
         follow_up_answers = data.get('follow_up_answers')
+        decoding_profile = data.get('decoding_profile')
+        latency_budget_ms = data.get('latency_budget_ms')
+        
+        session = handle_screening_session(ai_model.sessions, data)
+        if session is not None:
+            phq9_answers, domain, history = session.phq9_answers, session.domain, session.history
+            follow_up_answers = session.answers
         
         if not all([phq9_answers, domain, follow_up_answers]):
             return jsonify({"error": "PHQ-9 answers, domain, and follow-up answers are required"}), 400
+        error = ai_model.validate_decoding_profile(decoding_profile) or ai_model.validate_latency_budget(latency_budget_ms)
+        if error:
+            return jsonify({"error": error}), 400
         
-        # Analyze depression level
-        depression_analysis = ai_model.predict_depression_level(
-            phq9_answers, domain, history, follow_up_answers
-        )
-        
-        # Generate suggestions
-        suggestions = ai_model.generate_suggestions(
-            depression_analysis['depression_level'], domain, history, phq9_answers
+        # Analyze depression level and generate suggestions (speculatively in parallel)
+        depression_analysis, suggestions = ai_model.analyze_and_suggest(
+            phq9_answers, domain, history, follow_up_answers, decoding_profile, latency_budget_ms
         )
+        ai_model.commit_session(session, bool(suggestions) and not depression_analysis.get("fallback"))
         
         return jsonify({
             "depression_level": depression_analysis['depression_level'],
@@ -627,25 +1954,131 @@ def complete_screening():
             "suggestions": suggestions,
             "domain": domain,
             "phq9_score": ai_model.calculate_phq9_score(phq9_answers),
+            **session_fields(session),
             "timestamp": datetime.now().isoformat()
         })
         
+    except SessionNotFound:
+        return session_not_found()
+    except SessionDeltaError as e:
+        return jsonify({"error": str(e)}), e.status
     except Exception as e:
         return jsonify({"error": f"Error completing screening: {str(e)}"}), 500
 
+def session_not_found():
+    return jsonify({"error": "Unknown or expired session_id; resend the full screening context"}), 404
+
+def session_fields(session):
+    """
+    Session id and recorded answer count for a response; the count is the
+    next call's answers_offset, so an unrecorded delta is sent again
+    """
+    if session is None:
+        return {}
+    recorded = len(session.answers) if session.delta is None else session.recorded_answers
+    return {"session_id": session.session_id, "session_answers": recorded}
+
+@app.route("/api/sessions", methods=["POST"])
+def create_session():
+    """Start a screening session holding its context server-side; later calls send session_id + new_answers"""
+    try:
+        data = request.get_json()
+        phq9_answers = data.get('phq9_answers')
+        domain = data.get('domain')
+        
+        error = ai_model.validate_phq9_answers(phq9_answers)
+        if error:
+            return jsonify({"error": error}), 400
+        if not domain:
+            return jsonify({"error": "Domain is required"}), 400
+        answers = validate_answers(data.get('answers'), 'answers')
+        
+        session = ai_model.sessions.create(phq9_answers, domain, data.get('history', ''), answers)
+        return jsonify({
+            **session.to_dict(),
+            "expires_in_seconds": ai_model.sessions.ttl_seconds,
+            "timestamp": datetime.now().isoformat()
+        }), 201
+        
+    except SessionDeltaError as e:
+        return jsonify({"error": str(e)}), e.status
+    except Exception as e:
+        return jsonify({"error": f"Error creating session: {str(e)}"}), 500
+
+@app.route("/api/sessions/<session_id>", methods=["DELETE"])
+def delete_session(session_id):
+    """End a screening session early"""
+    if not ai_model.sessions.delete(session_id):
+        return session_not_found()
+    return jsonify({"deleted": session_id, "timestamp": datetime.now().isoformat()})
+
+@app.route("/api/cache/stats", methods=["GET"])
+def cache_stats():
+    """Hit/miss/eviction counters for the result caches"""
+    return jsonify({
+        "caches": {name: cache.stats() for name, cache in ai_model.caches().items()},
+        "gemini_single_flight": ai_model.gemini_flight.stats(),
+        "timestamp": datetime.now().isoformat()
+    })
+
+@app.route("/api/cache/invalidate", methods=["POST"])
+def invalidate_cache():
+    """Drop all cached results (call after replacing or reloading models)"""
+    generation = ai_model.invalidate_caches()
+    return jsonify({
+        "invalidated": list(ai_model.caches().keys()),
+        "generation": generation,
+        "scope": "all workers",
+        "timestamp": datetime.now().isoformat()
+    })
+
+@app.route("/api/scheduler/stats", methods=["GET"])
+def scheduler_stats():
+    """Queue depth, wait and run time per inference work class"""
+    return jsonify({
+        "enabled": ai_model.scheduler is not None,
+        "classes": ai_model.scheduler.stats() if ai_model.scheduler is not None else None,
+        "timestamp": datetime.now().isoformat()
+    })
+
+@app.route("/metrics", methods=["GET"])
+def prometheus_metrics():
+    """Per-stage latency histograms and fallback counters in the Prometheus text format"""
+    return Response(metrics.render(), content_type=MetricsRegistry.CONTENT_TYPE)
+
+@app.route("/api/speculation/stats", methods=["GET"])
+def speculation_stats():
+    """Hit rate and latency saved by speculative suggestion generation"""
+    speculator = ai_model.suggestion_speculator
+    return jsonify({
+        "enabled": speculator is not None,
+        "suggestions": speculator.stats() if speculator is not None else None,
+        "timestamp": datetime.now().isoformat()
+    })
+
 @app.route("/api/health", methods=["GET"])
 def health_check():
     """Health check endpoint"""
     return jsonify({
         "status": "healthy",
         "models_loaded": {
-            "domain_assignment": ai_model.domain_model is not None,
+            "domain_assignment": ai_model.domain_model is not None or ai_model.domain_onnx is not None,
             "question_generation": ai_model.question_model is not None,
             "suggestion_generation": ai_model.suggestion_model is not None
         },
         "fallback_methods": {
             "suggestion_method": "trained_model" if ai_model.suggestion_model is not None else "gemini_api"
         },
+        "domain_backend": ai_model.domain_backend,
+        "quantized": ai_model.quantize,
+        "load_times_seconds": ai_model.load_times,
+        "gemini": {**gemini_client.stats(), "circuit": ai_model.gemini_breaker.stats()},
+        "domain_table": ai_model.domain_table.stats() if ai_model.domain_table is not None else None,
+        "suggestion_catalog": ai_model.suggestion_catalog.stats() if ai_model.suggestion_catalog is not None else None,
+        "domain_batching": ai_model.domain_batcher.stats() if ai_model.domain_batcher is not None else None,
+        "scheduler": ai_model.scheduler.stats() if ai_model.scheduler is not None else None,
+        "depression_cascade": ai_model.depression_cascade_stats(),
+        "sessions": ai_model.sessions.stats(),
         "timestamp": datetime.now().isoformat()
     })
 
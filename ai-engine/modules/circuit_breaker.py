@@ -0,0 +1,142 @@
+# modules/circuit_breaker.py - Error-rate / latency circuit breaker for a remote dependency
+import threading
+import time
+from collections import deque
+
+
+class CircuitOpenError(RuntimeError):
+    """The circuit is open, so the call was not attempted"""
+
+
+class LatencyBudgetExceeded(TimeoutError):
+    """The caller's latency budget ran out before the call finished"""
+
+
+def _percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+class CircuitBreaker:
+    """
+    Tracks outcomes and latencies of the last `window_size` calls. Once at
+    least `min_calls` are in the window, the circuit opens when the error
+    rate reaches `error_rate_threshold` or the `latency_percentile` latency
+    reaches `latency_threshold_ms` (0 disables the latency trip). While open,
+    allow() rejects calls for `open_seconds`; then the circuit is half-open
+    and admits one probe at a time, closing after `probe_successes`
+    consecutive fast successes and reopening on any failed or slow probe.
+
+    Usage: `admitted = breaker.allow()`; if not None, make the call and
+    report it with `breaker.record(admitted, success, latency_seconds)`.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name="circuit", window_size=50, min_calls=10, error_rate_threshold=0.5,
+                 latency_threshold_ms=0, latency_percentile=95, open_seconds=30, probe_successes=3):
+        self.name = name
+        self.min_calls = max(1, int(min_calls))
+        self.error_rate_threshold = float(error_rate_threshold)
+        self.latency_threshold = max(0.0, float(latency_threshold_ms)) / 1000.0
+        self.latency_percentile = float(latency_percentile)
+        self.open_seconds = max(0.0, float(open_seconds))
+        self.probe_successes = max(1, int(probe_successes))
+
+        self._lock = threading.Lock()
+        self._window = deque(maxlen=max(self.min_calls, int(window_size)))  # (success, latency_seconds)
+        self.state = self.CLOSED
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._probe_streak = 0
+
+        self.calls = 0
+        self.failures = 0
+        self.short_circuited = 0
+        self.opens = 0
+
+    def allow(self):
+        """Return the state the call is admitted in, or None if it must not be attempted"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return self.CLOSED
+            if self.state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.open_seconds:
+                    self.short_circuited += 1
+                    return None
+                self.state = self.HALF_OPEN
+                self._probe_in_flight = False
+                self._probe_streak = 0
+            if self._probe_in_flight:
+                self.short_circuited += 1
+                return None
+            self._probe_in_flight = True
+            return self.HALF_OPEN
+
+    def record(self, admitted, success, latency_seconds):
+        """Report the outcome of a call admitted by allow(), however late it finished"""
+        with self._lock:
+            self.calls += 1
+            if not success:
+                self.failures += 1
+            self._window.append((success, latency_seconds))
+
+            if admitted == self.HALF_OPEN:
+                self._probe_in_flight = False
+                if self.state != self.HALF_OPEN:
+                    return
+                if success and not self._too_slow(latency_seconds):
+                    self._probe_streak += 1
+                    if self._probe_streak >= self.probe_successes:
+                        self.state = self.CLOSED
+                        self._window.clear()
+                else:
+                    self._open()
+            elif self.state == self.CLOSED and self._tripped():
+                self._open()
+
+    def stats(self):
+        with self._lock:
+            outcomes = list(self._window)
+            latencies = [latency for _, latency in outcomes]
+            window_failures = sum(1 for success, _ in outcomes if not success)
+            return {
+                "state": self.state,
+                "calls": self.calls,
+                "failures": self.failures,
+                "short_circuited": self.short_circuited,
+                "opens": self.opens,
+                "window_calls": len(outcomes),
+                "window_error_rate": (window_failures / len(outcomes)) if outcomes else 0.0,
+                "p50_ms": _percentile(latencies, 50) * 1000.0,
+                "p95_ms": _percentile(latencies, 95) * 1000.0,
+                "p99_ms": _percentile(latencies, 99) * 1000.0,
+                "error_rate_threshold": self.error_rate_threshold,
+                "latency_threshold_ms": self.latency_threshold * 1000.0,
+                "open_seconds": self.open_seconds,
+            }
+
+    def _too_slow(self, latency_seconds):
+        return self.latency_threshold > 0 and latency_seconds >= self.latency_threshold
+
+    def _tripped(self):
+        if len(self._window) < self.min_calls:
+            return False
+        failures = sum(1 for success, _ in self._window if not success)
+        if failures / len(self._window) >= self.error_rate_threshold:
+            return True
+        if self.latency_threshold > 0:
+            latencies = [latency for _, latency in self._window]
+            return _percentile(latencies, self.latency_percentile) >= self.latency_threshold
+        return False
+
+    def _open(self):
+        self.state = self.OPEN
+        self._opened_at = time.monotonic()
+        self._probe_in_flight = False
+        self.opens += 1
@@ -0,0 +1,115 @@
+# modules/domain_table.py - Precomputed, memory-mapped domain lookups for the no-history PHQ-9 space
+import json
+import os
+
+import numpy as np
+
+PHQ9_ITEMS = 9
+PHQ9_LEVELS = 4
+PHQ9_GRID_SIZE = PHQ9_LEVELS ** PHQ9_ITEMS  # 262,144 answer combinations
+
+TABLE_FILENAME = "domain_table.npy"
+META_FILENAME = "domain_table.json"
+
+# 3 bytes per cell: index into the label list + half-precision confidence
+CELL_DTYPE = np.dtype([("label", "u1"), ("confidence", "<f2")])
+
+
+def phq9_index(phq9_answers):
+    """Base-4 index of a PHQ-9 answer vector, or None if it is outside the 0-3 grid"""
+    if len(phq9_answers) != PHQ9_ITEMS:
+        return None
+    index = 0
+    for answer in phq9_answers:
+        if not isinstance(answer, int) or not 0 <= answer < PHQ9_LEVELS:
+            return None
+        index = index * PHQ9_LEVELS + answer
+    return index
+
+
+def phq9_answers_for_index(index):
+    """Inverse of phq9_index"""
+    answers = []
+    for _ in range(PHQ9_ITEMS):
+        index, answer = divmod(index, PHQ9_LEVELS)
+        answers.append(answer)
+    return answers[::-1]
+
+
+class DomainTable:
+    """
+    Read-only view over a precomputed table of shape
+    (occupations, ages, 4^9) holding the argmax domain and confidence the
+    classifier gives for an empty history. Lookups are O(1) and the file is
+    memory-mapped, so forked workers share its pages.
+    """
+
+    def __init__(self, cells, metadata):
+        self.cells = cells
+        self.metadata = metadata
+        self.labels = metadata["labels"]
+        self.fingerprint = metadata.get("fingerprint")
+        self._occupations = {occupation: i for i, occupation in enumerate(metadata["occupations"])}
+        self._ages = {age: i for i, age in enumerate(metadata["ages"])}
+
+    @classmethod
+    def load(cls, directory):
+        """Open the table in `directory`, or return None when it has not been built"""
+        table_path = os.path.join(directory, TABLE_FILENAME)
+        meta_path = os.path.join(directory, META_FILENAME)
+        if not (os.path.exists(table_path) and os.path.exists(meta_path)):
+            return None
+        with open(meta_path) as f:
+            metadata = json.load(f)
+        return cls(np.load(table_path, mmap_mode="r"), metadata)
+
+    def mismatch(self, fingerprint, backend, quantized):
+        """Why the table does not match the serving model and backend, or None when it does"""
+        if self.fingerprint != fingerprint:
+            return "it was built for different model weights"
+        built = (self.metadata.get("backend", "torch"), bool(self.metadata.get("quantized", False)))
+        if built != (backend, bool(quantized)):
+            return (f"it was built with the {built[0]} backend{' (int8)' if built[1] else ''}, "
+                    f"serving uses {backend}{' (int8)' if quantized else ''}")
+        return None
+
+    def lookup(self, phq9_answers, occupation, age):
+        """Return (domain, confidence) for canonical inputs covered by the table, else None"""
+        occupation_index = self._occupations.get(occupation)
+        age_index = self._ages.get(age)
+        grid_index = phq9_index(phq9_answers)
+        if occupation_index is None or age_index is None or grid_index is None:
+            return None
+        cell = self.cells[occupation_index, age_index, grid_index]
+        return self.labels[int(cell["label"])], float(cell["confidence"])
+
+    def stats(self):
+        return {
+            "occupations": len(self._occupations),
+            "ages": len(self._ages),
+            "cells": int(self.cells.shape[0] * self.cells.shape[1] * self.cells.shape[2]),
+            "bytes": int(self.cells.nbytes),
+            "fingerprint": self.fingerprint,
+            "backend": self.metadata.get("backend", "torch"),
+            "quantized": bool(self.metadata.get("quantized", False)),
+        }
+
+
+def create_table_file(directory, occupations, ages):
+    """Allocate a writable memory-mapped table file (written under a temporary name)"""
+    path = os.path.join(directory, TABLE_FILENAME + ".tmp")
+    cells = np.lib.format.open_memmap(
+        path, mode="w+", dtype=CELL_DTYPE, shape=(len(occupations), len(ages), PHQ9_GRID_SIZE)
+    )
+    return path, cells
+
+
+def finalize_table(directory, temp_path, cells, metadata):
+    """Flush the table, then atomically publish it together with its metadata"""
+    cells.flush()
+    del cells
+    os.replace(temp_path, os.path.join(directory, TABLE_FILENAME))
+    meta_tmp = os.path.join(directory, META_FILENAME + ".tmp")
+    with open(meta_tmp, "w") as f:
+        json.dump(metadata, f, indent=2)
+    os.replace(meta_tmp, os.path.join(directory, META_FILENAME))
@@ -0,0 +1,154 @@
+# modules/embedding_store.py - Append-only, memory-mapped sentence embeddings addressed by content hash
+import hashlib
+import json
+import os
+import threading
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process locking, use one process per store
+    fcntl = None
+
+DIGEST_SIZE = 16
+
+
+class EmbeddingStore:
+    """
+    Persists float32 vectors under `directory`. vectors.f32 holds the rows
+    back to back and index.bin holds the 16-byte BLAKE2b digest of each
+    row's text, in the same order. Rows are only appended. A row counts once
+    its digest is in the index, so a crash between the two writes leaves an
+    orphan row that the next append overwrites.
+
+    Reads return read-only views into a memory map (no copy). Appends hold
+    an flock on the index, so pre-forked workers can share one store. A
+    lookup miss first picks up rows that other processes appended.
+
+    `namespace` (e.g. the encoder name) and `dim` are recorded in meta.json,
+    so a store is never read with vectors from another model. Pass dim=None
+    to open an existing store with its recorded dimension.
+    """
+
+    def __init__(self, directory, dim=None, namespace=""):
+        self.directory = directory
+        self.namespace = namespace
+        self._vectors_path = os.path.join(directory, "vectors.f32")
+        self._index_path = os.path.join(directory, "index.bin")
+        self.dim = self._check_meta(dim)
+        self.row_bytes = self.dim * 4
+
+        self._lock = threading.Lock()
+        self._rows = {}
+        self._row_count = 0
+        self._map = None
+        self.hits = 0
+        self.misses = 0
+        self.appended = 0
+
+        for path in (self._vectors_path, self._index_path):
+            open(path, "ab").close()
+        with self._lock:
+            self._refresh_index()
+
+    @staticmethod
+    def exists(directory):
+        return os.path.exists(os.path.join(directory, "meta.json"))
+
+    def _check_meta(self, dim):
+        meta_path = os.path.join(self.directory, "meta.json")
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                meta = json.load(f)
+            if meta.get("namespace") != self.namespace or (dim is not None and meta.get("dim") != dim):
+                raise ValueError(
+                    f"Embedding store {self.directory} holds {meta}, not namespace={self.namespace!r} dim={dim}"
+                )
+            return int(meta["dim"])
+        if dim is None:
+            raise ValueError(f"No embedding store at {self.directory}; a dimension is needed to create one")
+
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = f"{meta_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"namespace": self.namespace, "dim": int(dim), "dtype": "float32"}, f)
+        os.replace(tmp_path, meta_path)
+        return int(dim)
+
+    def digest(self, text):
+        return hashlib.blake2b(text.encode("utf-8"), digest_size=DIGEST_SIZE).digest()
+
+    def get(self, text):
+        return self.get_many([text])[0]
+
+    def get_many(self, texts):
+        """One read-only vector view per text, or None for texts not in the store"""
+        digests = [self.digest(text) for text in texts]
+        with self._lock:
+            if any(digest not in self._rows for digest in digests):
+                self._refresh_index()
+            vectors = [self._view(self._rows[digest]) if digest in self._rows else None for digest in digests]
+            found = sum(vector is not None for vector in vectors)
+            self.hits += found
+            self.misses += len(vectors) - found
+        return vectors
+
+    def put_many(self, texts, vectors):
+        """Append vectors for texts not stored yet; returns how many rows were written"""
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32).reshape(len(texts), self.dim)
+        with self._lock, open(self._index_path, "r+b") as index, open(self._vectors_path, "r+b") as data:
+            if fcntl is not None:
+                # Released when the index file is closed
+                fcntl.flock(index.fileno(), fcntl.LOCK_EX)
+            self._refresh_index()
+            # Drop a digest torn by a crash mid-write; its row is rewritten below
+            index.truncate(self._row_count * DIGEST_SIZE)
+
+            new_digests, new_rows = [], []
+            for text, vector in zip(texts, vectors):
+                digest = self.digest(text)
+                if digest in self._rows or digest in new_digests:
+                    continue
+                new_digests.append(digest)
+                new_rows.append(vector)
+            if not new_digests:
+                return 0
+
+            data.seek(self._row_count * self.row_bytes)
+            data.write(np.stack(new_rows).tobytes())
+            data.flush()
+            index.seek(self._row_count * DIGEST_SIZE)
+            index.write(b"".join(new_digests))
+            index.flush()
+            self._refresh_index()
+            self.appended += len(new_digests)
+        return len(new_digests)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "rows": self._row_count,
+                "dim": self.dim,
+                "bytes": self._row_count * self.row_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "appended": self.appended,
+            }
+
+    def _refresh_index(self):
+        # Caller holds self._lock; only whole digests are read, never one being written
+        with open(self._index_path, "rb") as f:
+            f.seek(self._row_count * DIGEST_SIZE)
+            data = f.read()
+        for offset in range(0, len(data) - len(data) % DIGEST_SIZE, DIGEST_SIZE):
+            self._rows.setdefault(data[offset:offset + DIGEST_SIZE], self._row_count)
+            self._row_count += 1
+
+    def _view(self, row):
+        # Remap when other appends outgrew the current map; earlier views keep the old map alive
+        if self._map is None or row >= self._map.shape[0]:
+            self._map = np.memmap(self._vectors_path, dtype=np.float32, mode="r", shape=(self._row_count, self.dim))
+        return self._map[row]
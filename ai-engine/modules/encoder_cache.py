@@ -0,0 +1,72 @@
+# modules/encoder_cache.py - Reuse T5 encoder outputs across repeated prompts
+import hashlib
+import threading
+import time
+
+import torch
+from transformers.modeling_outputs import BaseModelOutput
+
+from .result_cache import ResultCache
+
+
+def _hidden_state_bytes(value):
+    hidden_state, _ = value
+    return hidden_state.element_size() * hidden_state.nelement()
+
+
+class EncoderCache(ResultCache):
+    """
+    Caches the encoder's last hidden state per tokenized prompt so repeated
+    prompts (same PHQ-9, domain, history and previous answers) go straight to
+    decoding. The T5 encoder is bidirectional, so a prompt that differs in
+    any token needs a fresh pass; only exact repeats are served.
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, ttl_seconds=1800, name="encoder", generation=None):
+        super().__init__(max_bytes, ttl_seconds, sizeof=_hidden_state_bytes, name=name, generation=generation)
+        self._timing_lock = threading.Lock()
+        self.encoder_runs = 0
+        self.encoder_seconds = 0.0
+        self.encoder_seconds_saved = 0.0
+
+    def generate_kwargs(self, model, inputs):
+        """Return generate() kwargs that carry precomputed encoder outputs instead of input_ids"""
+        digest = hashlib.sha256()
+        digest.update(inputs["input_ids"].numpy().tobytes())
+        digest.update(inputs["attention_mask"].numpy().tobytes())
+        key = digest.hexdigest()
+
+        cached = self.get(key)
+        if cached is not None:
+            hidden_state, seconds = cached
+            with self._timing_lock:
+                self.encoder_seconds_saved += seconds
+        else:
+            start = time.perf_counter()
+            with torch.no_grad():
+                hidden_state = model.get_encoder()(
+                    input_ids=inputs["input_ids"],
+                    attention_mask=inputs["attention_mask"],
+                    return_dict=True
+                ).last_hidden_state
+            seconds = time.perf_counter() - start
+            with self._timing_lock:
+                self.encoder_runs += 1
+                self.encoder_seconds += seconds
+            self.set(key, (hidden_state, seconds))
+
+        # generate() expands encoder outputs for beams in place, so hand it a fresh wrapper
+        return {
+            "attention_mask": inputs["attention_mask"],
+            "encoder_outputs": BaseModelOutput(last_hidden_state=hidden_state)
+        }
+
+    def stats(self):
+        stats = super().stats()
+        with self._timing_lock:
+            stats.update({
+                "encoder_runs": self.encoder_runs,
+                "encoder_seconds": self.encoder_seconds,
+                "encoder_seconds_saved": self.encoder_seconds_saved,
+            })
+        return stats
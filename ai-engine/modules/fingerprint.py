@@ -0,0 +1,24 @@
+# modules/fingerprint.py - Identify a model directory's weights for precomputed artifacts
+import hashlib
+import os
+
+WEIGHT_FILES = ("config.json", "model.safetensors", "pytorch_model.bin", "model.onnx", "label_encoder.joblib")
+
+
+def model_fingerprint(model_dir):
+    """
+    Short hash of a model directory's config and weight files (name, size and
+    mtime; config contents). Precomputed tables store it so they can be
+    detected as stale once the model is replaced.
+    """
+    digest = hashlib.sha256()
+    for name in WEIGHT_FILES:
+        path = os.path.join(model_dir, name)
+        if not os.path.exists(path):
+            continue
+        stat = os.stat(path)
+        digest.update(f"{name}:{stat.st_size}:{int(stat.st_mtime)}".encode("utf-8"))
+        if name == "config.json":
+            with open(path, "rb") as f:
+                digest.update(f.read())
+    return digest.hexdigest()[:16]
@@ -0,0 +1,138 @@
+# modules/gemini_client.py - Pooled Gemini REST client with timeouts and bounded concurrency
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_ENDPOINT = "https://generativelanguage.googleapis.com"
+
+
+class GeminiError(RuntimeError):
+    """Gemini returned an error or an unusable response"""
+
+
+class GeminiTimeout(GeminiError, TimeoutError):
+    """Gemini did not answer within the per-call timeout"""
+
+
+class GeminiOverloaded(GeminiError):
+    """Too many Gemini calls are already in flight or queued"""
+
+
+class GeminiClient:
+    """
+    Calls the Gemini generateContent REST endpoint from a small worker pool so
+    request threads are never blocked past their timeout. HTTP connections are
+    kept alive and reused through one pooled requests.Session per process, and
+    a semaphore caps in-flight plus queued calls (excess calls fail fast with
+    GeminiOverloaded so callers can fall back immediately).
+    """
+
+    def __init__(self, api_key, model_name="gemini-1.5-flash", endpoint=None,
+                 timeout=15.0, max_concurrency=8, max_queue=32):
+        self.api_key = api_key
+        self.model_name = model_name
+        self.endpoint = (endpoint or DEFAULT_ENDPOINT).rstrip("/")
+        self.timeout = float(timeout)
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.max_queue = max(0, int(max_queue))
+
+        self._slots = None
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._pid = None
+        self._executor = None
+        self._session = None
+
+        self.calls = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.rejected = 0
+
+    @property
+    def url(self):
+        return f"{self.endpoint}/v1beta/models/{self.model_name}:generateContent"
+
+    def submit(self, prompt, timeout=None):
+        """Start a call in the pool and return a Future resolving to the response text"""
+        executor = self._ensure_pool()
+        slots = self._slots
+        if not slots.acquire(blocking=False):
+            self._count("rejected")
+            raise GeminiOverloaded("Too many concurrent Gemini calls")
+        try:
+            future = executor.submit(self._call, prompt, timeout or self.timeout)
+        except Exception:
+            slots.release()
+            raise
+        future.add_done_callback(lambda _: slots.release())
+        return future
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                "endpoint": self.endpoint,
+                "model": self.model_name,
+                "calls": self.calls,
+                "errors": self.errors,
+                "timeouts": self.timeouts,
+                "rejected": self.rejected,
+                "max_concurrency": self.max_concurrency,
+                "max_queue": self.max_queue,
+            }
+
+    def _count(self, *counters):
+        # Pool threads and request threads update these concurrently
+        with self._stats_lock:
+            for counter in counters:
+                setattr(self, counter, getattr(self, counter) + 1)
+
+    def _ensure_pool(self):
+        # Threads and sockets do not survive fork(), so build the pool per process
+        pid = os.getpid()
+        if self._pid == pid:
+            return self._executor
+        with self._lock:
+            if self._pid != pid:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_concurrency)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                self._session = session
+                self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="gemini")
+                self._slots = threading.BoundedSemaphore(self.max_concurrency + self.max_queue)
+                self._pid = pid
+        return self._executor
+
+    def _call(self, prompt, timeout):
+        self._count("calls")
+        try:
+            response = self._session.post(
+                self.url,
+                params={"key": self.api_key},
+                json={"contents": [{"parts": [{"text": prompt}]}]},
+                timeout=(min(5.0, timeout), timeout)
+            )
+        except requests.Timeout:
+            self._count("errors", "timeouts")
+            raise GeminiTimeout(f"Gemini did not respond within {timeout:.1f}s")
+        except requests.RequestException as e:
+            self._count("errors")
+            raise GeminiError(f"Gemini request failed: {e}")
+
+        if response.status_code != 200:
+            self._count("errors")
+            raise GeminiError(f"Gemini returned HTTP {response.status_code}: {response.text[:200]}")
+
+        try:
+            candidate = response.json()["candidates"][0]
+            text = "".join(part.get("text", "") for part in candidate["content"]["parts"])
+        except (ValueError, KeyError, IndexError, TypeError):
+            self._count("errors")
+            raise GeminiError(f"Unexpected Gemini response: {response.text[:200]}")
+        if not text:
+            self._count("errors")
+            raise GeminiError("Gemini returned an empty response")
+        return text
@@ -0,0 +1,77 @@
+# modules/onnx_backend.py - ONNX Runtime inference backend for the RoBERTa domain classifier
+import os
+
+import numpy as np
+import torch
+
+try:
+    import onnxruntime as ort
+except ImportError:  # optional dependency, only needed for DOMAIN_BACKEND=onnx
+    ort = None
+
+ONNX_FILENAME = "model.onnx"
+
+
+class _LogitsOnly(torch.nn.Module):
+    """Wraps a sequence classifier so the exported graph has a single `logits` output"""
+
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, input_ids, attention_mask):
+        return self.model(input_ids=input_ids, attention_mask=attention_mask).logits
+
+
+def export_domain_model(model, tokenizer, output_path, opset_version=17):
+    """Export the classifier to ONNX with dynamic batch and sequence axes"""
+    model.eval()
+    sample = tokenizer(
+        ["PHQ-9 responses: [0, 0, 0, 0, 0, 0, 0, 0, 0]. No mental health history. Occupation: . Age: 25"] * 2,
+        return_tensors="pt",
+        padding=True
+    )
+    with torch.no_grad():
+        torch.onnx.export(
+            _LogitsOnly(model),
+            (sample["input_ids"], sample["attention_mask"]),
+            output_path,
+            input_names=["input_ids", "attention_mask"],
+            output_names=["logits"],
+            dynamic_axes={
+                "input_ids": {0: "batch", 1: "sequence"},
+                "attention_mask": {0: "batch", 1: "sequence"},
+                "logits": {0: "batch"}
+            },
+            opset_version=opset_version
+        )
+    return output_path
+
+
+class OnnxDomainClassifier:
+    """Serves the exported domain classifier with ONNX Runtime on CPU"""
+
+    def __init__(self, model_path, num_threads=None):
+        if ort is None:
+            raise ImportError("onnxruntime is not installed (pip install onnxruntime)")
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(f"ONNX model not found at {model_path} (run scripts/export_domain_onnx.py)")
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            options.intra_op_num_threads = int(num_threads)
+
+        self.model_path = model_path
+        self.session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = [model_input.name for model_input in self.session.get_inputs()]
+
+    def logits(self, inputs):
+        """Run the classifier on tokenizer output (numpy or torch tensors) and return numpy logits"""
+        feeds = {}
+        for name in self.input_names:
+            value = inputs[name]
+            if isinstance(value, torch.Tensor):
+                value = value.numpy()
+            feeds[name] = np.asarray(value, dtype=np.int64)
+        return self.session.run(["logits"], feeds)[0]
@@ -1,31 +1,179 @@
+# modules/predictor.py - Local depression level classifier (MiniLM embeddings + XGBoost)
+import os
+import threading
+
 import joblib
 import numpy as np
-from sentence_transformers import SentenceTransformer
 
-# Load model and encoders
-model = joblib.load("models/xgboost_depression_model.pkl")
-label_encoder = joblib.load("models/label_encoder.pkl")
-vectorizer = SentenceTransformer('all-MiniLM-L6-v2')
+from .embedding_store import EmbeddingStore
+
+MODELS_PATH = os.getenv("AI_ENGINE_MODELS_PATH", "models")
+ENCODER_NAME = "all-MiniLM-L6-v2"
+
+
+def session_text(qa_pairs):
+    """Join a session's answers (tuples or dicts) into the text the classifier was trained on"""
+    if not qa_pairs:
+        return ""
+    if isinstance(qa_pairs[0], dict):
+        return " ".join([pair.get("answer", "") for pair in qa_pairs]).strip()
+    return " ".join([a for (_, a) in qa_pairs]).strip()
+
+
+class DepressionPredictor:
+    """
+    Scores Q&A sessions with the sentence-transformer encoder and the XGBoost
+    classifier. Both models load on first use, not at import. `predict_batch`
+    encodes all sessions in one batched `encode` call and classifies them
+    with a single `predict_proba` call. With `store_dir`, embeddings are kept
+    in a persistent EmbeddingStore keyed by the session text, so re-scoring
+    a session only runs the classifier; the encoder is not even loaded when
+    every text is already stored.
+    """
+
+    def __init__(self, model_path=None, label_encoder_path=None, encoder_name=ENCODER_NAME, batch_size=32,
+                 store_dir=None):
+        self.model_path = model_path or os.path.join(MODELS_PATH, "xgboost_depression_model.pkl")
+        self.label_encoder_path = label_encoder_path or os.path.join(MODELS_PATH, "label_encoder.pkl")
+        self.encoder_name = encoder_name
+        self.batch_size = batch_size
+        self.store_dir = store_dir
+
+        self.model = None
+        self.label_encoder = None
+        self.vectorizer = None
+        self.store = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        self.load_classifier()
+        self.load_encoder()
+
+    def load_classifier(self):
+        if self.label_encoder is not None:
+            return
+        with self._lock:
+            if self.label_encoder is not None:
+                return
+            self.model = joblib.load(self.model_path)
+            self.label_encoder = joblib.load(self.label_encoder_path)
+
+    def load_encoder(self):
+        if self.vectorizer is not None:
+            return
+        with self._lock:
+            if self.vectorizer is not None:
+                return
+            from sentence_transformers import SentenceTransformer
+
+            self.vectorizer = SentenceTransformer(self.encoder_name)
+
+    def open_store(self):
+        """The embedding store, opened on first use; creating a new one needs the encoder's dimension"""
+        if self.store is not None or not self.store_dir:
+            return self.store
+        if not EmbeddingStore.exists(self.store_dir):
+            self.load_encoder()
+        with self._lock:
+            if self.store is None:
+                dim = None if self.vectorizer is None else self.vectorizer.get_sentence_embedding_dimension()
+                self.store = EmbeddingStore(self.store_dir, dim, namespace=self.encoder_name)
+        return self.store
+
+    def encode(self, texts, batch_size=None):
+        """Embed texts in batches of `batch_size`; returns a float32 array with one row per text"""
+        texts = list(texts)
+        store = self.open_store()
+        if store is None:
+            return self.run_encoder(texts, batch_size)
+
+        stored = store.get_many(texts)
+        missing = [i for i, vector in enumerate(stored) if vector is None]
+        embeddings = np.empty((len(texts), store.dim), dtype=np.float32)
+        for i, vector in enumerate(stored):
+            if vector is not None:
+                embeddings[i] = vector
+        if missing:
+            # Encode each distinct text once, e.g. when a bulk re-score repeats sessions
+            unique = list(dict.fromkeys(texts[i] for i in missing))
+            computed = self.run_encoder(unique, batch_size)
+            rows = {text: row for text, row in zip(unique, computed)}
+            for i in missing:
+                embeddings[i] = rows[texts[i]]
+            store.put_many(unique, computed)
+        return embeddings
+
+    def run_encoder(self, texts, batch_size=None):
+        self.load_encoder()
+        embeddings = self.vectorizer.encode(
+            texts,
+            batch_size=batch_size or self.batch_size,
+            convert_to_numpy=True,
+            show_progress_bar=False
+        )
+        return np.asarray(embeddings, dtype=np.float32)
+
+    def classify(self, embeddings):
+        """Labels and per-label probabilities for a matrix of embeddings, in one vectorized call"""
+        self.load_classifier()
+        if hasattr(self.model, "predict_proba"):
+            probabilities = np.asarray(self.model.predict_proba(embeddings))
+            class_ids = getattr(self.model, "classes_", np.arange(probabilities.shape[1]))
+            labels = [str(label) for label in self.label_encoder.inverse_transform(class_ids)]
+            best = probabilities.argmax(axis=1)
+            return [labels[i] for i in best], [dict(zip(labels, row.tolist())) for row in probabilities]
+
+        predictions = self.model.predict(embeddings)
+        return [str(label) for label in self.label_encoder.inverse_transform(predictions)], [None] * len(predictions)
+
+    def predict_batch(self, sessions, batch_size=None):
+        """
+        Predict the depression level of many Q&A sessions at once. Returns one
+        dict per session, in order: `depression_level`, `confidence` and
+        `probabilities`, or `error` for a session without usable answers.
+        """
+        results = [None] * len(sessions)
+        texts, indices = [], []
+        for i, qa_pairs in enumerate(sessions):
+            if not qa_pairs:
+                results[i] = {"error": "No user response data provided."}
+                continue
+            text = session_text(qa_pairs)
+            if not text:
+                results[i] = {"error": "No valid text for prediction."}
+                continue
+            texts.append(text)
+            indices.append(i)
+
+        if texts:
+            labels, probabilities = self.classify(self.encode(texts, batch_size))
+            for i, label, label_probabilities in zip(indices, labels, probabilities):
+                result = {"depression_level": label}
+                if label_probabilities is not None:
+                    result["confidence"] = label_probabilities[label]
+                    result["probabilities"] = label_probabilities
+                results[i] = result
+        return results
+
+    def predict(self, qa_pairs):
+        return self.predict_batch([qa_pairs])[0]
+
+
+# PREDICTOR_EMBEDDING_STORE set to an empty value disables the persistent embedding store
+default_predictor = DepressionPredictor(
+    batch_size=int(os.getenv("PREDICTOR_BATCH_SIZE", "32")),
+    store_dir=os.getenv("PREDICTOR_EMBEDDING_STORE", "./cache/embeddings/all-MiniLM-L6-v2")
+)
+
 
 def predict_depression_level(qa_pairs: list) -> dict:
     """
     Accepts a list of Q&A pairs (tuples or dicts), combines answers, encodes using a sentence transformer,
     and predicts depression level.
     """
-    if not qa_pairs:
-        return {"error": "No user response data provided."}
-
-    # Extract and combine all user answers into a single string
-    if isinstance(qa_pairs[0], dict):
-        all_text = " ".join([pair.get("answer", "") for pair in qa_pairs])
-    else:
-        all_text = " ".join([a for (_, a) in qa_pairs])
-
-    if not all_text.strip():
-        return {"error": "No valid text for prediction."}
+    return default_predictor.predict(qa_pairs)
 
-    embedding = vectorizer.encode([all_text.strip()])
-    prediction = model.predict(embedding)
-    predicted_label = label_encoder.inverse_transform(prediction)[0]
 
-    return {"depression_level": predicted_label}
+def predict_depression_levels(sessions: list, batch_size: int = None) -> list:
+    """Batch form of predict_depression_level: one result dict per session, scored in one pass"""
+    return default_predictor.predict_batch(sessions, batch_size)
@@ -0,0 +1,91 @@
+# modules/request_profiler.py - Opt-in torch profiler traces for single requests
+import hmac
+import os
+import re
+import threading
+import time
+import uuid
+from datetime import datetime
+
+from torch.profiler import ProfilerActivity, profile
+
+
+class RequestProfiler:
+    """
+    Captures a torch profiler trace (op timings and input shapes, plus the
+    Python call stacks that issued them with `with_stack`) for one request
+    that presents the profiling token. Disabled unless a token is configured. The profiler is
+    process-wide, so one request is profiled at a time and others run
+    unprofiled. It only sees threads that existed when it started. While a
+    request is profiled, `profiling_this_thread()` is true so callers can
+    keep model work on the request thread instead of handing it to
+    long-lived worker threads.
+    """
+
+    def __init__(self, token, trace_dir, with_stack=False, row_limit=25):
+        self.token = token or ""
+        self.trace_dir = trace_dir
+        self.with_stack = with_stack
+        self.row_limit = row_limit
+        self._busy = threading.Lock()
+        self._local = threading.local()
+
+    @property
+    def enabled(self):
+        return bool(self.token)
+
+    def authorized(self, presented):
+        return bool(self.token) and bool(presented) and hmac.compare_digest(
+            presented.encode("utf-8"), self.token.encode("utf-8")
+        )
+
+    def profiling_this_thread(self):
+        return getattr(self._local, "active", False)
+
+    def start(self):
+        """Start profiling the calling thread's request; returns None when another request holds the profiler"""
+        if not self._busy.acquire(blocking=False):
+            return None
+        try:
+            profiler = profile(activities=[ProfilerActivity.CPU], record_shapes=True, with_stack=self.with_stack)
+            profiler.start()
+        except Exception:
+            self._busy.release()
+            raise
+        self._local.active = True
+        return profiler, time.perf_counter()
+
+    def stop(self, session, label, inline=False):
+        """
+        Stop the profiler started by `start()`. Returns a summary with the
+        wall time and either the top ops by self CPU time (`inline`) or the
+        path of the Chrome trace written to `trace_dir`.
+        """
+        profiler, started = session
+        try:
+            profiler.stop()
+            summary = {"label": label, "wall_ms": (time.perf_counter() - started) * 1000.0}
+            if inline:
+                summary["top_ops"] = self.top_ops(profiler)
+            else:
+                os.makedirs(self.trace_dir, exist_ok=True)
+                slug = re.sub(r"[^A-Za-z0-9]+", "-", label).strip("-") or "request"
+                filename = f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{slug}-{uuid.uuid4().hex[:8]}.json"
+                summary["trace_file"] = os.path.join(self.trace_dir, filename)
+                profiler.export_chrome_trace(summary["trace_file"])
+            return summary
+        finally:
+            self._local.active = False
+            self._busy.release()
+
+    def top_ops(self, profiler):
+        events = sorted(profiler.key_averages(), key=lambda event: event.self_cpu_time_total, reverse=True)
+        return [
+            {
+                "name": event.key,
+                "calls": event.count,
+                "self_cpu_ms": event.self_cpu_time_total / 1000.0,
+                "cpu_total_ms": event.cpu_time_total / 1000.0,
+            }
+            for event in events[:self.row_limit]
+        ]
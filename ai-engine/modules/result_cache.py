@@ -0,0 +1,168 @@
+# modules/result_cache.py - Bounded LRU + TTL cache for model and API results
+import hashlib
+import json
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+try:
+    import fcntl
+except ImportError:  # Windows: bumps are not serialised across processes
+    fcntl = None
+
+
+def canonical_key(*parts):
+    """Stable hash of JSON-serialisable inputs, used as a cache key"""
+    payload = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def pickled_size(value):
+    try:
+        return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return 1024
+
+
+class CacheGeneration:
+    """
+    Invalidation counter in a small file shared by every process serving the
+    app, so invalidating the caches in one pre-forked worker reaches all of
+    them. bump() increments it; value() costs one stat() while it is
+    unchanged.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._stamp = None
+        self._value = 0
+
+    def value(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return 0
+        stamp = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if stamp != self._stamp:
+            try:
+                with open(self.path) as f:
+                    self._value = int(f.read().strip() or 0)
+            except (FileNotFoundError, ValueError):
+                return self._value
+            self._stamp = stamp
+        return self._value
+
+    def bump(self):
+        """Start a new generation; returns it"""
+        with open(f"{self.path}.lock", "a") as lock_file:
+            if fcntl is not None:
+                # Released when the lock file is closed
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            self._stamp = None
+            value = self.value() + 1
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                f.write(str(value))
+            os.replace(tmp_path, self.path)
+            return value
+
+
+class ResultCache:
+    """
+    Thread-safe LRU cache with a per-entry time-to-live and a total size limit
+    in bytes. `sizeof` estimates the size of a stored value (pickled size by
+    default). get() returns None on a miss, so None itself is never stored.
+    With a shared `generation`, get() first drops every entry when another
+    process has bumped it since this cache last looked.
+    """
+
+    def __init__(self, max_bytes=16 * 1024 * 1024, ttl_seconds=3600, sizeof=None, name="cache", generation=None):
+        self.max_bytes = int(max_bytes)
+        self.ttl_seconds = float(ttl_seconds)
+        self.sizeof = sizeof or pickled_size
+        self.name = name
+        self.generation = generation
+        self._seen_generation = generation.value() if generation is not None else 0
+
+        self._entries = OrderedDict()  # key -> (value, size, expires_at)
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        if self.generation is not None:
+            current = self.generation.value()
+            if current != self._seen_generation:
+                self._seen_generation = current
+                self.invalidate()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, size, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        if value is None:
+            return
+        size = len(key) + self.sizeof(value)
+        if size > self.max_bytes:
+            return
+        expires_at = time.monotonic() + self.ttl_seconds if self.ttl_seconds > 0 else None
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, size, expires_at)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes and self._entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate(self, generation=None):
+        """Drop every entry, e.g. after the underlying model has been reloaded"""
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+            self.invalidations += 1
+            if generation is not None:
+                self._seen_generation = generation
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "generation": self._seen_generation,
+            }
+
+    def _remove(self, key):
+        _, size, _ = self._entries.pop(key)
+        self.current_bytes -= size
@@ -0,0 +1,162 @@
+# modules/scheduler.py - Per-class worker pools so cheap model work never queues behind generation
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+import torch
+
+
+class SchedulerOverloaded(RuntimeError):
+    """A work class already has its maximum number of queued tasks"""
+
+
+def _percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+class _WorkClass:
+    def __init__(self, name, workers=1, threads=0, max_queue=32, window=512):
+        self.name = name
+        self.workers = max(1, int(workers))
+        self.threads = max(0, int(threads))
+        self.max_queue = max(1, int(max_queue))
+
+        self.queue = queue.Queue()
+        self.pending = 0
+        self.running = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.wait_times = deque(maxlen=window)
+        self.run_times = deque(maxlen=window)
+
+
+class InferenceScheduler:
+    """
+    Queues model work by class (e.g. classification, question generation,
+    suggestion generation). Every class has its own worker threads, its own
+    torch intra-op thread allotment and a queue-depth limit, so a burst of
+    multi-second beam searches cannot delay a millisecond forward pass of
+    another class. `classes` maps a class name to a dict with `workers`,
+    `threads` (0 keeps the process default) and `max_queue`.
+    """
+
+    def __init__(self, classes, name="scheduler"):
+        self.name = name
+        self.classes = {
+            class_name: _WorkClass(class_name, **config) for class_name, config in classes.items()
+        }
+        self._lock = threading.Lock()
+        self._pid = None
+
+    def submit(self, work_class, fn, *args, **kwargs):
+        """Queue fn(*args, **kwargs) for the class's workers and return a Future of its result"""
+        self._ensure_workers()
+        work = self.classes[work_class]
+        future = Future()
+        with self._lock:
+            if work.pending >= work.max_queue:
+                work.rejected += 1
+                raise SchedulerOverloaded(f"Too many queued {work_class} tasks ({work.pending})")
+            work.pending += 1
+            work.submitted += 1
+        work.queue.put((future, fn, args, kwargs, time.perf_counter()))
+        return future
+
+    def run(self, work_class, fn, *args, **kwargs):
+        """Blocking helper: queue the work and wait for its result"""
+        return self.submit(work_class, fn, *args, **kwargs).result()
+
+    def stats(self):
+        with self._lock:
+            return {
+                work.name: {
+                    "workers": work.workers,
+                    "threads": work.threads or torch.get_num_threads(),
+                    "max_queue": work.max_queue,
+                    "queue_depth": work.pending,
+                    "running": work.running,
+                    "submitted": work.submitted,
+                    "completed": work.completed,
+                    "failed": work.failed,
+                    "rejected": work.rejected,
+                    "wait_p50_ms": _percentile(work.wait_times, 50) * 1000.0,
+                    "wait_p95_ms": _percentile(work.wait_times, 95) * 1000.0,
+                    "wait_p99_ms": _percentile(work.wait_times, 99) * 1000.0,
+                    "run_p50_ms": _percentile(work.run_times, 50) * 1000.0,
+                    "run_p95_ms": _percentile(work.run_times, 95) * 1000.0,
+                }
+                for work in self.classes.values()
+            }
+
+    def _ensure_workers(self):
+        # Threads do not survive fork(), so start the workers lazily per process
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        with self._lock:
+            if self._pid == pid:
+                return
+            default_threads = torch.get_num_threads()
+            ready = []
+            for work in self.classes.values():
+                if self._pid is not None:
+                    work.queue = queue.Queue()
+                    work.pending = work.running = 0
+                for index in range(work.workers):
+                    started = threading.Event()
+                    threading.Thread(
+                        target=self._run,
+                        args=(work, work.threads or default_threads, started),
+                        name=f"{self.name}-{work.name}-{index}",
+                        daemon=True
+                    ).start()
+                    ready.append(started)
+            for started in ready:
+                started.wait()
+            # torch.set_num_threads also updates the process-wide default that
+            # new threads start from, so put that back once every worker has its own
+            torch.set_num_threads(default_threads)
+            self._pid = pid
+
+    def _run(self, work, threads, started):
+        # The intra-op thread count is per thread once initialised; query it
+        # first so torch's lazy initialisation cannot overwrite the allotment
+        torch.get_num_threads()
+        torch.set_num_threads(threads)
+        torch.set_grad_enabled(False)
+        started.set()
+
+        while True:
+            future, fn, args, kwargs, enqueued_at = work.queue.get()
+            started_at = time.perf_counter()
+            with self._lock:
+                work.pending -= 1
+                work.running += 1
+                work.wait_times.append(started_at - enqueued_at)
+            if not future.set_running_or_notify_cancel():
+                with self._lock:
+                    work.running -= 1
+                continue
+            try:
+                result = fn(*args, **kwargs)
+            except BaseException as e:
+                with self._lock:
+                    work.running -= 1
+                    work.failed += 1
+                    work.run_times.append(time.perf_counter() - started_at)
+                future.set_exception(e)
+            else:
+                with self._lock:
+                    work.running -= 1
+                    work.completed += 1
+                    work.run_times.append(time.perf_counter() - started_at)
+                future.set_result(result)
@@ -1,31 +1,373 @@
-# modules/screening_engine.py
-from .question_generator import generate_questions
-from .predictor import predict_depression_level
-from .suggestion_engine import generate_suggestions
-
-def handle_screening_session(user_data, model, label_encoder):
-    domain = user_data.get("domain", "")
-    phq_answers = user_data.get("phq_answers", [])
-    history = user_data.get("history", "")
-    follow_up_questions = user_data.get("follow_up_questions", [])
-
-    # 1. Generate personalized therapist-style questions
-    generated_questions = generate_questions({
-        "domain": domain,
-        "history": history,
-        "follow_up_questions": follow_up_questions
-    })
-
-    # 2. Predict depression level based on PHQ + follow-up answers
-    answers = user_data.get("answers", [])  # Should be numeric or vectorized
-    prediction = predict_depression_level(answers, model, label_encoder)
-
-    # 3. Generate coping suggestions based on predicted level
-    suggestions = generate_suggestions(prediction["level"], history)
-
-    return {
-        "questions": generated_questions,
-        "depression_level": prediction["level"],
-        "confidence": prediction["confidence"],
-        "suggestions": suggestions
-    }
+# modules/screening_engine.py - Server-side screening sessions so follow-up calls only send deltas
+import copy
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process locking, use one process per store
+    fcntl = None
+
+# Memoised values are kept for this many answer states per session
+MEMO_STATES = 4
+SESSION_ID_PATTERN = re.compile(r"[0-9a-f]{32}")
+
+
+class SessionNotFound(KeyError):
+    """The session id is unknown, expired or was evicted"""
+
+
+class SessionDeltaError(ValueError):
+    """A malformed answers delta; `status` is the HTTP status to answer with"""
+    status = 400
+
+
+class SessionConflict(SessionDeltaError):
+    """The delta does not line up with the answers the session already holds"""
+    status = 409
+
+
+def validate_answers(answers, field="new_answers"):
+    """The answers as a list (None is empty); raises SessionDeltaError for anything but a JSON list"""
+    if answers is None:
+        return []
+    if not isinstance(answers, list):
+        raise SessionDeltaError(f"{field} must be a list of answers")
+    return answers
+
+
+def answers_digest(answers):
+    return hashlib.blake2b(
+        json.dumps(answers, sort_keys=True, default=str).encode("utf-8"), digest_size=16
+    ).digest()
+
+
+class ScreeningSession:
+    """
+    Canonical context of one screening (PHQ-9 answers, domain, history) plus
+    the follow-up answers collected so far. Prompt strings and tokenized
+    inputs derived from that state are memoised with `memo()`, keyed by the
+    answers they were built from.
+
+    Answers only grow through deltas placed at an `answers_offset`, so a
+    retried delta is a no-op. `pending()` gives a view of the session with a
+    delta applied, sharing the memos; the store records the delta with
+    `commit()` only once the request using it has succeeded.
+    """
+
+    def __init__(self, session_id, phq9_answers, domain, history="", answers=None, created_at=None, revision=0):
+        self.session_id = session_id
+        self.phq9_answers = [int(answer) for answer in phq9_answers]
+        self.domain = str(domain).strip()
+        self.history = (history or "").strip()
+        self.created_at = created_at or time.time()
+        self.revision = revision
+        self.lock = threading.Lock()
+        self.delta = None
+        self._memos = OrderedDict()  # answers digest -> {key: value}
+        self._set_answers(list(answers or []))
+
+    def _set_answers(self, answers):
+        self.answers = answers
+        self._state = answers_digest(answers)
+
+    def merge_answers(self, new_answers, offset):
+        """
+        The full answer list after placing `new_answers` at `offset`. Answers
+        already recorded there must match (a retry); a gap or a mismatch
+        raises SessionConflict.
+        """
+        if not new_answers:
+            return list(self.answers)
+        if offset is None:
+            raise SessionDeltaError("answers_offset (the number of answers the session held before new_answers) is required")
+        if isinstance(offset, bool) or not isinstance(offset, int) or offset < 0:
+            raise SessionDeltaError("answers_offset must be a non-negative integer")
+        if offset > len(self.answers):
+            raise SessionConflict(f"answers_offset {offset} is past the {len(self.answers)} answers the session holds")
+        overlap = self.answers[offset:offset + len(new_answers)]
+        if overlap != new_answers[:len(overlap)]:
+            raise SessionConflict(f"new_answers differ from the answers already recorded from answers_offset {offset}")
+        return self.answers + new_answers[len(overlap):]
+
+    def pending(self, new_answers, offset):
+        """A view of the session with the delta applied, to be recorded with SessionStore.commit()"""
+        view = copy.copy(self)
+        view._set_answers(self.merge_answers(new_answers, offset))
+        view.delta = (new_answers, offset)
+        view.recorded_answers = len(self.answers)
+        return view
+
+    def memo(self, key, build):
+        """Value derived from the current answers, built once per answer state"""
+        state = self._state
+        with self.lock:
+            derived = self._memos.get(state)
+            if derived is not None and key in derived:
+                return derived[key]
+        value = build()
+        with self.lock:
+            derived = self._memos.setdefault(state, {})
+            self._memos.move_to_end(state)
+            while len(self._memos) > MEMO_STATES:
+                self._memos.popitem(last=False)
+            return derived.setdefault(key, value)
+
+    @classmethod
+    def from_record(cls, record):
+        return cls(
+            record["session_id"], record["phq9_answers"], record["domain"], record["history"],
+            record["answers"], record["created_at"], record["revision"]
+        )
+
+    def to_record(self):
+        return {
+            "session_id": self.session_id,
+            "phq9_answers": self.phq9_answers,
+            "domain": self.domain,
+            "history": self.history,
+            "answers": self.answers,
+            "created_at": self.created_at,
+            "revision": self.revision,
+        }
+
+    def to_dict(self):
+        return {
+            "session_id": self.session_id,
+            "phq9_answers": self.phq9_answers,
+            "domain": self.domain,
+            "history": self.history,
+            "answers": len(self.answers),
+            "created_at": self.created_at,
+        }
+
+
+class SessionStore:
+    """
+    Screening sessions kept as one small JSON file each under `directory`,
+    so every pre-forked worker serves every session. A file's mtime is its
+    last use: a session expires `ttl_seconds` after it, and beyond
+    `max_sessions` the least recently used files are removed by a sweep
+    that a background thread in each process using the store runs every
+    `sweep_seconds`. The directory is private to the server's user (0700)
+    and each file is written 0600, since sessions hold PHQ-9 answers and
+    history.
+
+    Each process keeps the ScreeningSession objects it has seen (for their
+    memoised prompts and inputs) and reuses one while its revision matches
+    the file. Commits re-apply the delta to the file's current answers
+    under an flock on the directory, so concurrent workers never lose or
+    duplicate answers.
+    """
+
+    def __init__(self, directory, max_sessions=10000, ttl_seconds=1800, name="sessions", sweep_seconds=60.0):
+        self.directory = directory
+        self.max_sessions = max(1, int(max_sessions))
+        self.ttl_seconds = float(ttl_seconds)
+        self.name = name
+        self.sweep_seconds = max(1.0, float(sweep_seconds))
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        # makedirs applies the umask and leaves an existing directory alone
+        os.chmod(directory, 0o700)
+
+        self._local = OrderedDict()  # session_id -> ScreeningSession seen by this process
+        self._lock = threading.Lock()
+        self._lock_path = os.path.join(directory, ".lock")
+        self._sweeper = None
+        self._sweeper_pid = None
+
+        self.created = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def create(self, phq9_answers, domain, history="", answers=None):
+        self._ensure_sweeper()
+        session = ScreeningSession(uuid.uuid4().hex, phq9_answers, domain, history, answers)
+        self._write(session)
+        with self._lock:
+            self._remember(session)
+            self.created += 1
+        return session
+
+    def get(self, session_id):
+        """The session, refreshing its expiry; raises SessionNotFound"""
+        self._ensure_sweeper()
+        path = self._path(session_id)
+        try:
+            if self.ttl_seconds > 0 and os.stat(path).st_mtime + self.ttl_seconds <= time.time():
+                self._remove(path)
+                with self._lock:
+                    self._local.pop(session_id, None)
+                    self.expirations += 1
+                    self.misses += 1
+                raise SessionNotFound(session_id)
+            os.utime(path)
+            record = self._read(path)
+        except (FileNotFoundError, ValueError):
+            with self._lock:
+                self._local.pop(session_id, None)
+                self.misses += 1
+            raise SessionNotFound(session_id)
+        with self._lock:
+            self.hits += 1
+            return self._resolve(record)
+
+    def commit(self, session):
+        """
+        Record the delta of a `pending()` view on the stored session; returns
+        the updated session, or None when it expired meanwhile
+        """
+        if session.delta is None:
+            return session
+        self._ensure_sweeper()
+        path = self._path(session.session_id)
+        with self._lock, self._open_lock_file() as lock_file:
+            if fcntl is not None:
+                # Released when the lock file is closed
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                live = self._resolve(self._read(path))
+            except (FileNotFoundError, ValueError):
+                return None
+            answers = live.merge_answers(*session.delta)
+            if answers != live.answers:
+                with live.lock:
+                    live._set_answers(answers)
+                    live.revision += 1
+                self._write(live)
+            return live
+
+    def delete(self, session_id):
+        path = self._path(session_id)
+        with self._lock:
+            self._local.pop(session_id, None)
+        return self._remove(path)
+
+    def sweep(self):
+        """Remove expired session files, then the least recently used beyond max_sessions"""
+        entries = []
+        now = time.time()
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith(".json"):
+                continue
+            try:
+                mtime = entry.stat().st_mtime
+            except FileNotFoundError:
+                continue
+            if self.ttl_seconds > 0 and mtime + self.ttl_seconds <= now:
+                if self._remove(entry.path):
+                    with self._lock:
+                        self._local.pop(entry.name[:-len(".json")], None)
+                        self.expirations += 1
+            else:
+                entries.append((mtime, entry.path))
+        entries.sort()
+        for _, path in entries[:max(0, len(entries) - self.max_sessions)]:
+            if self._remove(path):
+                with self._lock:
+                    self._local.pop(os.path.basename(path)[:-len(".json")], None)
+                    self.evictions += 1
+
+    def stats(self):
+        stored = sum(1 for entry in os.scandir(self.directory) if entry.name.endswith(".json"))
+        with self._lock:
+            return {
+                "sessions": stored,
+                "cached_in_process": len(self._local),
+                "directory": self.directory,
+                "max_sessions": self.max_sessions,
+                "ttl_seconds": self.ttl_seconds,
+                "created": self.created,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+    def _path(self, session_id):
+        # Ids are uuid4 hex; anything else (e.g. a path) is simply unknown
+        if not isinstance(session_id, str) or not SESSION_ID_PATTERN.fullmatch(session_id):
+            raise SessionNotFound(session_id)
+        return os.path.join(self.directory, f"{session_id}.json")
+
+    def _ensure_sweeper(self):
+        # Threads do not survive fork(), so (re)start the sweeper lazily per process
+        pid = os.getpid()
+        if self._sweeper_pid == pid and self._sweeper.is_alive():
+            return
+        with self._lock:
+            if self._sweeper_pid == pid and self._sweeper.is_alive():
+                return
+            self._sweeper_pid = pid
+            self._sweeper = threading.Thread(target=self._sweep_loop, name=f"{self.name}-sweeper", daemon=True)
+            self._sweeper.start()
+
+    def _sweep_loop(self):
+        while True:
+            try:
+                self.sweep()
+            except OSError as e:
+                print(f"Session sweep failed: {e}")
+            time.sleep(self.sweep_seconds)
+
+    def _open_lock_file(self):
+        return os.fdopen(os.open(self._lock_path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o600), "a")
+
+    def _read(self, path):
+        with open(path) as f:
+            return json.load(f)
+
+    def _write(self, session):
+        path = self._path(session.session_id)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with os.fdopen(os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600), "w") as f:
+            json.dump(session.to_record(), f)
+        os.replace(tmp_path, path)
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def _resolve(self, record):
+        # Caller holds self._lock; keep this process's object (and its memos) while it is current
+        session = self._local.get(record["session_id"])
+        if session is None or session.revision != record["revision"]:
+            previous, session = session, ScreeningSession.from_record(record)
+            if previous is not None:
+                # Memos are keyed by the answers they were built from, so they carry over
+                session._memos = previous._memos
+        self._remember(session)
+        return session
+
+    def _remember(self, session):
+        self._local[session.session_id] = session
+        self._local.move_to_end(session.session_id)
+        while len(self._local) > self.max_sessions:
+            self._local.popitem(last=False)
+
+
+def handle_screening_session(store, data):
+    """
+    Resolve a request payload against the session store. Without a
+    `session_id` this returns None and the caller uses the full payload.
+    With one it returns a pending view of the session with the payload's
+    `new_answers` placed at `answers_offset`, which the caller commits to
+    the store once the request succeeded. Raises SessionNotFound for an
+    unknown or expired id and SessionDeltaError for a malformed delta.
+    """
+    session_id = data.get("session_id")
+    if not session_id:
+        return None
+    new_answers = validate_answers(data.get("new_answers"))
+    return store.get(session_id).pending(new_answers, data.get("answers_offset"))
@@ -0,0 +1,78 @@
+# modules/single_flight.py - Coalesce concurrent identical calls into one in-flight call
+import threading
+from concurrent.futures import Future
+
+
+class SingleFlight:
+    """
+    Concurrent calls with the same key share a single execution: the first
+    caller starts it and the others wait for its result (or its exception).
+    The key is forgotten once the call finishes, so later calls run again;
+    pair with a ResultCache to reuse finished results.
+    """
+
+    def __init__(self, name="single-flight"):
+        self.name = name
+        self._calls = {}  # key -> Future
+        self._lock = threading.Lock()
+
+        self.executions = 0
+        self.coalesced = 0
+
+    def submit(self, key, start):
+        """
+        Return a Future for the call identified by `key`. Only the first
+        caller runs `start()`, which must begin the call and return a Future
+        of its result; concurrent callers get the same shared Future.
+        """
+        with self._lock:
+            shared = self._calls.get(key)
+            if shared is not None:
+                self.coalesced += 1
+                return shared
+            shared = Future()
+            self._calls[key] = shared
+            self.executions += 1
+
+        def finish(result=None, exception=None):
+            with self._lock:
+                self._calls.pop(key, None)
+            if exception is not None:
+                shared.set_exception(exception)
+            else:
+                shared.set_result(result)
+
+        def relay(inner):
+            try:
+                result = inner.result()
+            except BaseException as e:
+                finish(exception=e)
+            else:
+                finish(result)
+
+        try:
+            start().add_done_callback(relay)
+        except BaseException as e:
+            finish(exception=e)
+        return shared
+
+    def do(self, key, fn, timeout=None):
+        """Blocking helper: run `fn()` once for all concurrent callers with this key"""
+        def start():
+            future = Future()
+            try:
+                future.set_result(fn())
+            except BaseException as e:
+                future.set_exception(e)
+            return future
+        return self.submit(key, start).result(timeout=timeout)
+
+    def stats(self):
+        with self._lock:
+            calls = self.executions + self.coalesced
+            return {
+                "in_flight": len(self._calls),
+                "executions": self.executions,
+                "coalesced": self.coalesced,
+                "coalesced_rate": (self.coalesced / calls) if calls else 0.0,
+            }
@@ -0,0 +1,139 @@
+# modules/speculation.py - Run a likely follow-up stage in parallel with the stage it depends on
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class Speculator:
+    """
+    Starts `speculate(guess, stop)` in a background pool while the caller
+    runs the stage that decides the real key. If the decided key equals the
+    guess the speculative result is used. Otherwise `stop` (a
+    threading.Event the speculative work should poll, e.g. through a
+    StoppingCriteria) is set, a still-queued run is cancelled, and
+    `fallback(actual)` produces the result. Hit rate, latency saved on hits,
+    the fallback latency of misses, work wasted on misses and how long a
+    stopped run kept going are tracked for monitoring. When `runs` and
+    `seconds` counters are given (labelled by outcome and by kind) the same
+    events are also exported through the metrics registry.
+    """
+
+    def __init__(self, max_workers=4, name="speculation", runs=None, seconds=None):
+        self.max_workers = max(1, int(max_workers))
+        self.name = name
+        self.runs = runs
+        self.seconds = seconds
+
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+
+        self.attempts = 0
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self.seconds_saved = 0.0
+        self.seconds_wasted = 0.0
+        self.miss_seconds = 0.0
+        self.stopped_runs = 0
+        self.seconds_to_stop = 0.0
+
+    def run(self, guess, speculate, decide, key_of, fallback):
+        """
+        Returns (decision, result, hit): `decision` comes from `decide()`;
+        `result` is the speculative `speculate(guess, stop)` when
+        `key_of(decision) == guess` and it succeeded, else `fallback(actual)`.
+        """
+        started = {}
+        stop = threading.Event()
+
+        def timed():
+            started["at"] = time.perf_counter()
+            try:
+                return speculate(guess, stop)
+            finally:
+                started["done"] = time.perf_counter()
+
+        future = self._ensure_executor().submit(timed)
+        decision = decide()
+        actual = key_of(decision)
+
+        if actual == guess:
+            decided_at = time.perf_counter()
+            try:
+                result = future.result()
+            except Exception as e:
+                print(f"Speculative {self.name} run failed, recomputing: {e}")
+                with self._lock:
+                    self.attempts += 1
+                    self.errors += 1
+                self._export("error")
+                return decision, fallback(actual), False
+            # Run sequentially, the stage would have started at decided_at;
+            # the part of the speculative run that finished before then is saved
+            saved = max(0.0, min(decided_at, started["done"]) - started["at"])
+            with self._lock:
+                self.attempts += 1
+                self.hits += 1
+                self.seconds_saved += saved
+            self._export("hit", saved=saved)
+            return decision, result, True
+
+        # Wrong guess: stop the speculative run so it frees its worker for the
+        # real one (a queued run is cancelled outright)
+        stop.set()
+        missed_at = time.perf_counter()
+        if not future.cancel():
+            future.add_done_callback(self._record_waste(started, missed_at))
+        result = fallback(actual)
+        with self._lock:
+            self.attempts += 1
+            self.misses += 1
+            self.miss_seconds += time.perf_counter() - missed_at
+        self._export("miss")
+        return decision, result, False
+
+    def stats(self):
+        with self._lock:
+            return {
+                "attempts": self.attempts,
+                "hits": self.hits,
+                "misses": self.misses,
+                "errors": self.errors,
+                "hit_rate": (self.hits / self.attempts) if self.attempts else 0.0,
+                "seconds_saved": self.seconds_saved,
+                "avg_ms_saved_per_hit": (self.seconds_saved / self.hits * 1000.0) if self.hits else 0.0,
+                "avg_ms_per_miss": (self.miss_seconds / self.misses * 1000.0) if self.misses else 0.0,
+                "seconds_wasted": self.seconds_wasted,
+                "avg_ms_to_stop": (self.seconds_to_stop / self.stopped_runs * 1000.0) if self.stopped_runs else 0.0,
+                "max_workers": self.max_workers,
+            }
+
+    def _record_waste(self, started, missed_at):
+        def callback(_):
+            if "at" in started:
+                with self._lock:
+                    self.seconds_wasted += started["done"] - started["at"]
+                    self.stopped_runs += 1
+                    self.seconds_to_stop += max(0.0, started["done"] - missed_at)
+                self._export("discarded", wasted=started["done"] - started["at"])
+        return callback
+
+    def _export(self, outcome, **seconds):
+        if self.runs is not None:
+            self.runs.inc(outcome=outcome)
+        if self.seconds is not None:
+            for kind, value in seconds.items():
+                self.seconds.inc(value, kind=kind)
+
+    def _ensure_executor(self):
+        # Pool threads do not survive fork(), so build the pool per process
+        pid = os.getpid()
+        if self._pid == pid:
+            return self._executor
+        with self._lock:
+            if self._pid != pid:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=self.name)
+                self._pid = pid
+        return self._executor
@@ -0,0 +1,199 @@
+# modules/suggestion_catalog.py - Precomputed suggestions indexed by (depression level, domain)
+import json
+import os
+import threading
+import time
+from collections import Counter
+
+try:
+    import fcntl
+except ImportError:  # Windows: every process may rebuild a stale catalog
+    fcntl = None
+
+CATALOG_FILENAME = "suggestion_catalog.json"
+LOCK_FILENAME = "suggestion_catalog.lock"
+
+# Typical PHQ-9 answers for each level (total scores 2, 7, 12 and 20), used in the
+# generation prompt where a live request has the patient's own answers
+CATALOG_PHQ9_PROFILES = {
+    "No Depression": [0, 0, 1, 0, 0, 1, 0, 0, 0],
+    "Mild": [1, 1, 1, 1, 0, 1, 1, 1, 0],
+    "Moderate": [2, 1, 2, 1, 1, 2, 1, 2, 0],
+    "Severe": [3, 2, 3, 2, 2, 3, 2, 2, 1],
+}
+
+
+def catalog_key(depression_level, domain):
+    return f"{depression_level}|{str(domain).strip().lower()}"
+
+
+def build_catalog_entries(generate, levels, domains, samples=4, progress=None):
+    """
+    Call generate(level, domain, phq9_answers) `samples` times for every
+    (level, domain) pair and keep each pair's distinct suggestions, most
+    frequently generated first
+    """
+    entries = {}
+    for level in levels:
+        for domain in domains:
+            counts = Counter()
+            for _ in range(samples):
+                for suggestion in generate(level, domain, CATALOG_PHQ9_PROFILES.get(level, [])) or []:
+                    counts[suggestion] += 1
+            # Counter keeps first-seen order among equal counts
+            entries[catalog_key(level, domain)] = [suggestion for suggestion, _ in counts.most_common()]
+            if progress is not None:
+                progress(level, domain, len(entries[catalog_key(level, domain)]))
+    return entries
+
+
+def save_catalog(directory, entries, metadata):
+    """Atomically publish the catalog file"""
+    path = os.path.join(directory, CATALOG_FILENAME)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"metadata": metadata, "entries": entries}, f, indent=2)
+    os.replace(tmp_path, path)
+    return path
+
+
+class SuggestionCatalog:
+    """Read-only (level, domain) -> suggestions index loaded from the catalog file"""
+
+    def __init__(self, entries, metadata):
+        self.entries = entries
+        self.metadata = metadata
+        self.fingerprint = metadata.get("fingerprint")
+        self.decoding_profile = metadata.get("decoding_profile")
+
+    @classmethod
+    def load(cls, directory):
+        """Load the catalog in `directory`, or return None when it has not been built"""
+        path = os.path.join(directory, CATALOG_FILENAME)
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            data = json.load(f)
+        return cls(data["entries"], data["metadata"])
+
+    def lookup(self, depression_level, domain, limit=5, decoding_profile=None):
+        """The pair's suggestions; None when missing or when `decoding_profile` is not the one sampled"""
+        if decoding_profile is not None and self.decoding_profile not in (None, decoding_profile):
+            return None
+        suggestions = self.entries.get(catalog_key(depression_level, domain))
+        return list(suggestions[:limit]) if suggestions else None
+
+    def stats(self):
+        return {
+            "pairs": len(self.entries),
+            "suggestions": sum(len(suggestions) for suggestions in self.entries.values()),
+            "fingerprint": self.fingerprint,
+            "decoding_profile": self.decoding_profile,
+            "created_at": self.metadata.get("created_at"),
+        }
+
+
+class CatalogManager:
+    """
+    Serves the catalog in `directory` only while its fingerprint matches the
+    current suggestion model. A stale catalog is rebuilt in a background
+    thread with `build()`, which returns (entries, metadata). One process
+    rebuilds at a time, holding an flock on a lock file; every process
+    picks up the new file within `check_seconds`; a failed rebuild is
+    retried at a later check. No catalog file at all
+    means no automatic build; use scripts/build_suggestion_catalog.py.
+    """
+
+    def __init__(self, directory, fingerprint, build, auto_refresh=True, check_seconds=30.0):
+        self.directory = directory
+        self.fingerprint = fingerprint
+        self.build = build
+        self.auto_refresh = auto_refresh
+        self.check_seconds = check_seconds
+
+        self.catalog = None
+        self.stale = False
+        self.refreshing = False
+        self.refreshes = 0
+        self.last_error = None
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._next_check = 0.0
+        self._refresh_pid = None
+        self.reload()
+
+    def lookup(self, depression_level, domain, limit=5, decoding_profile=None):
+        if time.monotonic() >= self._next_check:
+            self._check()
+        catalog = self.catalog
+        return catalog.lookup(depression_level, domain, limit, decoding_profile) if catalog is not None else None
+
+    def reload(self):
+        """Re-read the catalog file; returns True when a catalog for the current model is being served"""
+        path = os.path.join(self.directory, CATALOG_FILENAME)
+        try:
+            mtime = os.stat(path).st_mtime
+        except OSError:
+            self.catalog, self.stale, self._mtime = None, False, None
+            return False
+        if mtime == self._mtime:
+            return self.catalog is not None
+        catalog = SuggestionCatalog.load(self.directory)
+        self._mtime = mtime
+        self.stale = catalog.fingerprint != self.fingerprint
+        self.catalog = None if self.stale else catalog
+        return self.catalog is not None
+
+    def stats(self):
+        catalog = self.catalog
+        return {
+            **(catalog.stats() if catalog is not None else {"pairs": 0}),
+            "serving": catalog is not None,
+            "stale_on_disk": self.stale,
+            "refreshing": self.refreshing,
+            "refreshes": self.refreshes,
+            "last_error": self.last_error,
+        }
+
+    def _check(self):
+        with self._lock:
+            if time.monotonic() < self._next_check:
+                return
+            self._next_check = time.monotonic() + self.check_seconds
+            self.reload()
+            # Threads do not survive fork(), so each process decides for itself
+            if self.stale and self.auto_refresh and self._refresh_pid != os.getpid():
+                self._refresh_pid = os.getpid()
+                threading.Thread(target=self._refresh, name="suggestion-catalog-refresh", daemon=True).start()
+
+    def _refresh(self):
+        lock_file = open(os.path.join(self.directory, LOCK_FILENAME), "a")
+        try:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    # Another worker is rebuilding; its file is picked up by _check
+                    return
+            with self._lock:
+                self._mtime = None
+                if self.reload():
+                    return
+            self.refreshing = True
+            entries, metadata = self.build()
+            save_catalog(self.directory, entries, metadata)
+            self.refreshes += 1
+            self.last_error = None
+            with self._lock:
+                self._mtime = None
+                self.reload()
+        except Exception as e:
+            self.last_error = str(e)
+            print(f"Error refreshing suggestion catalog: {e}")
+        finally:
+            self.refreshing = False
+            lock_file.close()
+            if self.catalog is None:
+                # Not swapped in (build failed, or another worker held the lock):
+                # let a later check start another refresh in this process
+                self._refresh_pid = None
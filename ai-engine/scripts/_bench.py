@@ -0,0 +1,66 @@
+# scripts/_bench.py - Shared helpers for the AI engine benchmark scripts
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ENGINE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SAMPLE_PROFILES = [
+    ([2, 1, 3, 2, 1, 2, 3, 1, 2], "Felt burned out after a promotion last year", "Software Engineer", 29),
+    ([0, 1, 0, 1, 0, 0, 1, 0, 0], "", "Student", 19),
+    ([3, 3, 2, 3, 2, 3, 2, 2, 1], "Lost a parent two years ago, had therapy since", "Teacher", 45),
+    ([1, 2, 1, 1, 2, 1, 0, 1, 0], "Arguments at home are getting worse", "Nurse", 34),
+    ([2, 2, 2, 1, 1, 2, 2, 1, 0], "", "Unemployed", 52),
+    ([1, 0, 1, 2, 1, 1, 1, 0, 0], "Moved to a new city and know nobody here", "Designer", 26),
+]
+
+
+def load_engine():
+    """Import app.py from the ai-engine directory so relative model paths resolve"""
+    os.chdir(ENGINE_DIR)
+    if ENGINE_DIR not in sys.path:
+        sys.path.insert(0, ENGINE_DIR)
+    import app
+    return app
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def summarize(latencies, wall_time):
+    return {
+        "requests": len(latencies),
+        "throughput_rps": (len(latencies) / wall_time) if wall_time > 0 else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000.0,
+        "p95_ms": percentile(latencies, 95) * 1000.0,
+        "p99_ms": percentile(latencies, 99) * 1000.0,
+        "mean_ms": (sum(latencies) / len(latencies) * 1000.0) if latencies else 0.0,
+    }
+
+
+def run_concurrent(fn, payloads, concurrency):
+    """Call fn(payload) for every payload with `concurrency` threads; return summary stats"""
+    latencies = []
+
+    def timed(payload):
+        start = time.perf_counter()
+        fn(payload)
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(timed, payloads))
+    return summarize(latencies, time.perf_counter() - start)
+
+
+def format_row(label, stats):
+    return (
+        f"{label:<28} {stats['throughput_rps']:>9.1f} req/s   "
+        f"p50 {stats['p50_ms']:>8.1f} ms   p95 {stats['p95_ms']:>8.1f} ms   p99 {stats['p99_ms']:>8.1f} ms"
+    )
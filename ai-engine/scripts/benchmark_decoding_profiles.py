@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Run every T5 decoding profile on a fixed set of prompts and report latency and
+output diversity for question and suggestion generation.
+
+Diversity metrics:
+  - items:      distinct questions/suggestions returned per call (after cleaning)
+  - distinct_1: unique unigrams / total unigrams over all outputs of a call
+  - distinct_2: unique bigrams / total bigrams over all outputs of a call
+
+Usage (from ai-engine/):
+    python scripts/benchmark_decoding_profiles.py --repeats 3 --json
+"""
+import argparse
+import json
+import time
+
+import torch
+
+from _bench import SAMPLE_PROFILES, load_engine, percentile
+
+DOMAINS = ["work", "academic", "trauma", "family", "social", "relationship"]
+LEVELS = ["No Depression", "Mild", "Moderate", "Severe"]
+
+
+def distinct_n(texts, n):
+    ngrams = []
+    for text in texts:
+        words = text.lower().split()
+        ngrams.extend(tuple(words[i:i + n]) for i in range(len(words) - n + 1))
+    return (len(set(ngrams)) / len(ngrams)) if ngrams else 0.0
+
+
+def measure(fn, calls):
+    latencies, items, d1, d2 = [], [], [], []
+    for args in calls:
+        start = time.perf_counter()
+        outputs = fn(*args) or []
+        latencies.append(time.perf_counter() - start)
+        items.append(len(outputs))
+        d1.append(distinct_n(outputs, 1))
+        d2.append(distinct_n(outputs, 2))
+    return {
+        "calls": len(calls),
+        "p50_ms": percentile(latencies, 50) * 1000.0,
+        "p95_ms": percentile(latencies, 95) * 1000.0,
+        "mean_items": sum(items) / len(items),
+        "distinct_1": sum(d1) / len(d1),
+        "distinct_2": sum(d2) / len(d2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeats", type=int, default=3, help="Passes over the fixed prompt set")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+    args = parser.parse_args()
+
+    app = load_engine()
+    ai_model = app.ai_model
+    # Measure the models, not the caches
+    ai_model.question_cache = None
+
+    question_calls = [
+        (phq9_answers, DOMAINS[i % len(DOMAINS)], history)
+        for i, (phq9_answers, history, _, _) in enumerate(SAMPLE_PROFILES)
+    ] * args.repeats
+    suggestion_calls = [
+        (LEVELS[i % len(LEVELS)], DOMAINS[i % len(DOMAINS)], history, phq9_answers)
+        for i, (phq9_answers, history, _, _) in enumerate(SAMPLE_PROFILES)
+    ] * args.repeats
+
+    results = {}
+    for profile in app.DECODING_PROFILES:
+        torch.manual_seed(args.seed)
+        results[profile] = {
+            "questions": measure(
+                lambda *call: ai_model.generate_questions(*call, decoding_profile=profile), question_calls
+            )
+        }
+        if ai_model.suggestion_model is not None:
+            results[profile]["suggestions"] = measure(
+                lambda *call: ai_model.generate_suggestions_with_model(*call, decoding_profile=profile),
+                suggestion_calls
+            )
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"\n{'profile':<10} {'task':<12} {'p50 ms':>9} {'p95 ms':>9} {'items':>6} {'dist-1':>7} {'dist-2':>7}")
+    for profile, tasks in results.items():
+        for task, stats in tasks.items():
+            print(f"{profile:<10} {task:<12} {stats['p50_ms']:>9.1f} {stats['p95_ms']:>9.1f} "
+                  f"{stats['mean_items']:>6.1f} {stats['distinct_1']:>7.2f} {stats['distinct_2']:>7.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Compare one-at-a-time RoBERTa domain assignment against the micro-batched path.
+
+Usage (from ai-engine/):
+    python scripts/benchmark_domain_batching.py --requests 256 --concurrency 1 8 32
+"""
+import argparse
+import json
+
+from _bench import SAMPLE_PROFILES, format_row, load_engine, run_concurrent
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=256, help="Requests per run")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32], help="Concurrent callers")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+    args = parser.parse_args()
+
+    app = load_engine()
+    ai_model = app.ai_model
+    if ai_model.domain_batcher is None:
+        raise SystemExit("Micro-batching is disabled (DOMAIN_BATCH_MAX_SIZE <= 1)")
+
+    texts = [
+        ai_model.build_domain_input(*SAMPLE_PROFILES[i % len(SAMPLE_PROFILES)])
+        for i in range(args.requests)
+    ]
+
+    # Warm up both paths so lazy initialisation does not skew the first run
+    ai_model.assign_domains_batch(texts[:1])
+    ai_model.domain_batcher(texts[0])
+
+    results = []
+    for concurrency in args.concurrency:
+        direct = run_concurrent(lambda text: ai_model.assign_domains_batch([text])[0], texts, concurrency)
+        batched = run_concurrent(ai_model.domain_batcher, texts, concurrency)
+        results.append({"concurrency": concurrency, "one_at_a_time": direct, "micro_batched": batched})
+
+        if not args.json:
+            print(f"\nconcurrency={concurrency}")
+            print(format_row("one-at-a-time", direct))
+            print(format_row("micro-batched", batched))
+
+    if args.json:
+        print(json.dumps({"results": results, "batcher": ai_model.domain_batcher.stats()}, indent=2))
+    else:
+        print(f"\nBatcher stats: {ai_model.domain_batcher.stats()}")
+
+
+if __name__ == "__main__":
+    main()
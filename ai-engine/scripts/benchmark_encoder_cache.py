@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Measure the encoder time saved by the T5 encoder-output cache over simulated
+screening sessions: an initial round followed by follow-up rounds, each
+round's prompt requested --repeats times (re-asks, the streaming and JSON
+endpoints for the same context, suggestion regeneration).
+
+Usage (from ai-engine/):
+    python scripts/benchmark_encoder_cache.py --followups 2 --repeats 3
+"""
+import argparse
+import json
+import time
+
+from _bench import SAMPLE_PROFILES, load_engine
+
+
+def run_sessions(ai_model, followups, repeats):
+    rounds, wall = 0, 0.0
+    for phq9_answers, history, _, _ in SAMPLE_PROFILES:
+        previous_answers = None
+        for round_index in range(followups + 1):
+            is_followup = round_index > 0
+            for _ in range(repeats):
+                start = time.perf_counter()
+                ai_model.generate_questions(phq9_answers, "work", history, previous_answers, is_followup)
+                wall += time.perf_counter() - start
+            rounds += 1
+            previous_answers = (previous_answers or []) + [f"Answer from round {round_index + 1}"]
+    return rounds, wall
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--followups", type=int, default=2, help="Follow-up rounds per session")
+    parser.add_argument("--repeats", type=int, default=3, help="Requests per round with an identical prompt")
+    args = parser.parse_args()
+
+    app = load_engine()
+    ai_model = app.ai_model
+    ai_model.question_cache = None
+    encoder_cache = ai_model.question_encoder_cache
+    if encoder_cache is None:
+        raise SystemExit("Encoder cache is disabled (ENCODER_CACHE_MAX_BYTES=0)")
+
+    # Baseline: every request runs the encoder
+    ai_model.question_encoder_cache = None
+    _, baseline_wall = run_sessions(ai_model, args.followups, args.repeats)
+
+    ai_model.question_encoder_cache = encoder_cache
+    encoder_cache.invalidate()
+    rounds, cached_wall = run_sessions(ai_model, args.followups, args.repeats)
+    stats = encoder_cache.stats()
+
+    print(json.dumps({
+        "sessions": len(SAMPLE_PROFILES),
+        "rounds": rounds,
+        "requests_per_round": args.repeats,
+        "encoder_runs": stats["encoder_runs"],
+        "encoder_hits": stats["hits"],
+        "mean_encoder_ms": stats["encoder_seconds"] / max(1, stats["encoder_runs"]) * 1000.0,
+        "encoder_ms_saved_per_round": stats["encoder_seconds_saved"] / rounds * 1000.0,
+        "total_ms_without_cache": baseline_wall * 1000.0,
+        "total_ms_with_cache": cached_wall * 1000.0,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
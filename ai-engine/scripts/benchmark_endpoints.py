@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+End-to-end HTTP benchmark of the AI engine endpoints that needs neither the
+trained checkpoints nor a Gemini key: tiny random models with the production
+configs and tokenizers are built (scripts/build_tiny_models.py), Gemini is
+replaced by the local fake (scripts/fake_gemini_server.py), and the engine is
+served in-process by werkzeug. Alternatively point --url at a running engine.
+
+Each endpoint is driven with --requests calls at every --concurrency level.
+Payloads are unique per call by default so result caches stay cold
+(--repeat-payloads cycles a small fixed set instead). Results are written as
+JSON (throughput and p50/p95/p99 per endpoint and concurrency) so runs can be
+diffed across commits; --baseline prints the change against an earlier run.
+
+Usage (from ai-engine/):
+    python scripts/benchmark_endpoints.py --concurrency 1 8 --requests 64 --output bench.json
+    python scripts/benchmark_endpoints.py --baseline bench.json --output bench-new.json
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+from datetime import datetime
+
+import requests
+
+from _bench import ENGINE_DIR, SAMPLE_PROFILES, format_row, load_engine, run_concurrent
+
+ENDPOINTS = ["phq9-submit", "generate-questions", "analyze-depression", "generate-suggestions", "complete-screening"]
+LEVELS = ["No Depression", "Mild", "Moderate", "Severe"]
+DOMAINS = ["work", "academic", "trauma", "family", "social", "relationship"]
+
+
+def build_payload(endpoint, index, decoding_profile, run_tag=None):
+    """Payload for one call; a run_tag makes it unique so no cache can answer it"""
+    phq9_answers, history, occupation, age = SAMPLE_PROFILES[index % len(SAMPLE_PROFILES)]
+    if run_tag is not None:
+        history = f"{history} (benchmark {run_tag} request {index})".strip()
+    domain = DOMAINS[index % len(DOMAINS)]
+    follow_up_answers = [f"Sleep has been poor for {index % 5 + 1} weeks", "Work feels overwhelming"]
+    if endpoint == "phq9-submit":
+        return {"phq9_answers": phq9_answers, "history": history, "occupation": occupation, "age": age}
+    if endpoint == "generate-questions":
+        return {"phq9_answers": phq9_answers, "domain": domain, "history": history,
+                "decoding_profile": decoding_profile}
+    if endpoint == "analyze-depression":
+        return {"phq9_answers": phq9_answers, "domain": domain, "history": history,
+                "follow_up_answers": follow_up_answers}
+    if endpoint == "generate-suggestions":
+        return {"depression_level": LEVELS[index % len(LEVELS)], "domain": domain, "history": history,
+                "phq9_answers": phq9_answers, "decoding_profile": decoding_profile}
+    return {"phq9_answers": phq9_answers, "domain": domain, "history": history,
+            "follow_up_answers": follow_up_answers, "decoding_profile": decoding_profile}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_local_engine(args):
+    """Build tiny models, start the fake Gemini server and serve app.py in-process; returns the base URL"""
+    from build_tiny_models import build_tiny_models
+    from fake_gemini_server import start_fake_gemini
+    from werkzeug.serving import make_server
+
+    models_dir = args.models_dir or os.path.join(tempfile.mkdtemp(prefix="ai-engine-bench-"), "models")
+    if not os.path.exists(os.path.join(models_dir, "domain_assignment", "config.json")):
+        build_tiny_models(models_dir, seed=args.seed)
+
+    _, gemini_url, _ = start_fake_gemini(
+        latency_ms=args.gemini_latency_ms, jitter_ms=args.gemini_jitter_ms,
+        error_rate=args.gemini_error_rate, seed=args.seed
+    )
+    os.environ["AI_ENGINE_MODELS_PATH"] = os.path.abspath(models_dir)
+    os.environ["GEMINI_API_ENDPOINT"] = gemini_url
+    os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+
+    import torch
+    torch.manual_seed(args.seed)
+    app = load_engine()
+
+    port = free_port()
+    server = make_server("127.0.0.1", port, app.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{port}"
+
+
+def run_endpoint(url, endpoint, concurrency, args):
+    local = threading.local()
+    errors = [0]
+    run_tag = None if args.repeat_payloads else f"c{concurrency}"
+    payloads = [build_payload(endpoint, i, args.decoding_profile, run_tag) for i in range(args.requests)]
+
+    def call(payload):
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        response = session.post(f"{url}/api/{endpoint}", json=payload, timeout=args.timeout)
+        if response.status_code != 200:
+            errors[0] += 1
+
+    # Warm up connections and lazily started worker pools
+    for i in range(2):
+        call(build_payload(endpoint, i, args.decoding_profile, f"warmup-c{concurrency}"))
+    errors[0] = 0
+
+    stats = run_concurrent(call, payloads, concurrency)
+    stats["errors"] = errors[0]
+    return stats
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ENGINE_DIR, stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_baseline_diff(results, baseline_path):
+    with open(baseline_path) as f:
+        baseline = {(row["endpoint"], row["concurrency"]): row for row in json.load(f)["results"]}
+    print(f"\nChange vs {baseline_path}:", file=sys.stderr)
+    for row in results:
+        old = baseline.get((row["endpoint"], row["concurrency"]))
+        if old is None:
+            continue
+        changes = []
+        for key in ("throughput_rps", "p50_ms", "p95_ms", "p99_ms"):
+            delta = ((row[key] - old[key]) / old[key] * 100.0) if old[key] else 0.0
+            changes.append(f"{key} {delta:+.1f}%")
+        print(f"  {row['endpoint']:<22} c={row['concurrency']:<4} " + "  ".join(changes), file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--endpoints", nargs="+", choices=ENDPOINTS, default=ENDPOINTS)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8])
+    parser.add_argument("--requests", type=int, default=64, help="Requests per endpoint and concurrency level")
+    parser.add_argument("--decoding-profile", default="fast")
+    parser.add_argument("--repeat-payloads", action="store_true", help="Cycle a fixed payload set (warm caches)")
+    parser.add_argument("--url", help="Benchmark a running engine instead of starting one in-process")
+    parser.add_argument("--models-dir", help="Reuse (or create) tiny models here instead of a temp dir")
+    parser.add_argument("--gemini-latency-ms", type=float, default=300.0)
+    parser.add_argument("--gemini-jitter-ms", type=float, default=50.0)
+    parser.add_argument("--gemini-error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=120.0, help="Per-request timeout in seconds")
+    parser.add_argument("--output", help="Write JSON results to this file (default: stdout)")
+    parser.add_argument("--baseline", help="Earlier JSON results to compare against")
+    args = parser.parse_args()
+
+    url = args.url or start_local_engine(args)
+
+    results = []
+    for endpoint in args.endpoints:
+        for concurrency in args.concurrency:
+            stats = run_endpoint(url, endpoint, concurrency, args)
+            results.append({"endpoint": endpoint, "concurrency": concurrency, **stats})
+            print(format_row(f"{endpoint} c={concurrency}", stats) + f"   errors {stats['errors']}", file=sys.stderr)
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now().isoformat(),
+            "url": args.url or "in-process",
+            "requests": args.requests,
+            "decoding_profile": args.decoding_profile,
+            "repeat_payloads": args.repeat_payloads,
+            "gemini_latency_ms": None if args.url else args.gemini_latency_ms,
+            "gemini_jitter_ms": None if args.url else args.gemini_jitter_ms,
+            "cpu_count": os.cpu_count(),
+        },
+        "results": results,
+    }
+    output = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+    if args.baseline:
+        print_baseline_diff(results, args.baseline)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Start serve.py with a growing number of workers and report total memory and
+throughput for each worker count, against a no-fork baseline: the app served
+by one plain process (no master, nothing shared) under the same per-process
+load.
+
+Memory is read from /proc/<pid>/smaps_rollup (Linux) for the master and all
+workers after the load phase:
+  - rss_mb: sum of RSS; counts shared copy-on-write pages once per process
+  - pss_mb: sum of PSS; shared pages split between the processes sharing
+    them, i.e. the real footprint of the whole server
+  - separate_processes_mb: workers x the baseline process's RSS, what N
+    independently started single-process servers would use
+
+Usage (from ai-engine/):
+    python scripts/benchmark_prefork.py --workers 1 2 4 --duration 20 --concurrency-per-worker 4
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from _bench import ENGINE_DIR, SAMPLE_PROFILES, format_row, summarize
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def child_pids(pid):
+    children = []
+    for task in os.listdir(f"/proc/{pid}/task"):
+        with open(f"/proc/{pid}/task/{task}/children") as f:
+            children.extend(int(child) for child in f.read().split())
+    return children
+
+
+def memory_kb(pid):
+    usage = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if parts[0] in ("Rss:", "Pss:"):
+                usage[parts[0][:-1].lower()] = int(parts[1])
+    return usage
+
+
+def wait_until_healthy(url, server, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise SystemExit(f"serve.py exited with status {server.returncode}")
+        try:
+            if requests.get(f"{url}/api/health", timeout=2).status_code == 200:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    raise SystemExit("serve.py did not become healthy in time")
+
+
+def run_load(url, endpoint, concurrency, duration):
+    latencies, errors = [], 0
+    deadline = time.monotonic() + duration
+
+    def client(index):
+        nonlocal errors
+        session = requests.Session()
+        i = index
+        while time.monotonic() < deadline:
+            phq9_answers, history, occupation, age = SAMPLE_PROFILES[i % len(SAMPLE_PROFILES)]
+            payload = {"phq9_answers": phq9_answers, "history": history, "occupation": occupation, "age": age}
+            if endpoint == "generate-questions":
+                payload = {"phq9_answers": phq9_answers, "domain": "work", "history": history,
+                           "decoding_profile": "fast"}
+            start = time.perf_counter()
+            response = session.post(f"{url}/api/{endpoint}", json=payload, timeout=120)
+            if response.status_code == 200:
+                latencies.append(time.perf_counter() - start)
+            else:
+                errors += 1
+            i += concurrency
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(client, range(concurrency)))
+    stats = summarize(latencies, time.perf_counter() - start)
+    stats["errors"] = errors
+    return stats
+
+
+def measure(workers, args, baseline_rss_mb=None):
+    """serve.py with `workers` workers, or with workers=0 the no-fork baseline process"""
+    port = free_port()
+    url = f"http://127.0.0.1:{port}"
+    if workers:
+        command = (
+            [sys.executable, "serve.py", "--host", "127.0.0.1", "--port", str(port), "--workers", str(workers)]
+            + (["--threads-per-worker", str(args.threads_per_worker)] if args.threads_per_worker else [])
+        )
+    else:
+        command = [sys.executable, "-c", (
+            "import app; from werkzeug.serving import run_simple; "
+            f"run_simple('127.0.0.1', {port}, app.app, threaded=True)"
+        )]
+    server = subprocess.Popen(command, cwd=ENGINE_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_until_healthy(url, server, args.startup_timeout)
+        load = run_load(url, args.endpoint, max(1, workers) * args.concurrency_per_worker, args.duration)
+
+        usages = [memory_kb(server.pid)] + [memory_kb(pid) for pid in child_pids(server.pid)]
+        result = {
+            "workers": workers,
+            "rss_mb": sum(usage["rss"] for usage in usages) / 1024.0,
+            "pss_mb": sum(usage["pss"] for usage in usages) / 1024.0,
+            "load": load,
+        }
+        if baseline_rss_mb is not None:
+            result["separate_processes_mb"] = workers * baseline_rss_mb
+        return result
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--threads-per-worker", type=int, default=0, help="Default: CPU count / workers")
+    parser.add_argument("--endpoint", choices=["phq9-submit", "generate-questions"], default="phq9-submit")
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds of load per worker count")
+    parser.add_argument("--concurrency-per-worker", type=int, default=4)
+    parser.add_argument("--startup-timeout", type=float, default=300.0)
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+    args = parser.parse_args()
+
+    baseline = measure(0, args)
+    if not args.json:
+        print(f"\nno-fork baseline (one process)  RSS {baseline['rss_mb']:.0f} MB  PSS {baseline['pss_mb']:.0f} MB")
+        print(format_row(args.endpoint, baseline["load"]) + f"   errors {baseline['load']['errors']}")
+
+    results = []
+    for workers in args.workers:
+        result = measure(workers, args, baseline["rss_mb"])
+        results.append(result)
+        if not args.json:
+            print(f"\nworkers={workers}  RSS {result['rss_mb']:.0f} MB  PSS {result['pss_mb']:.0f} MB  "
+                  f"({workers} separate processes {result['separate_processes_mb']:.0f} MB)")
+            print(format_row(args.endpoint, result["load"]) + f"   errors {result['load']['errors']}")
+
+    if args.json:
+        print(json.dumps({"baseline": baseline, "prefork": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
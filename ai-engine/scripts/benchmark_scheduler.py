@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Measure domain-assignment latency while question/suggestion generation
+saturates the engine, with the inference scheduler and without it (all
+model work inline in the request threads).
+
+Usage (from ai-engine/):
+    python scripts/benchmark_scheduler.py --duration 20 --generators 4 --classifiers 4
+"""
+import argparse
+import json
+import threading
+import time
+
+from _bench import SAMPLE_PROFILES, format_row, load_engine, summarize
+
+
+def run_mixed_load(ai_model, duration, generators, classifiers, decoding_profile):
+    stop = threading.Event()
+    latencies, generated = [], [0]
+
+    def generate(index):
+        phq9_answers, history, _, _ = SAMPLE_PROFILES[index % len(SAMPLE_PROFILES)]
+        while not stop.is_set():
+            if index % 2:
+                ai_model.generate_suggestions_with_model("Moderate", "work", history, phq9_answers, decoding_profile)
+            else:
+                ai_model.generate_questions(phq9_answers, "work", history, decoding_profile=decoding_profile)
+            generated[0] += 1
+
+    def classify(index):
+        i = 0
+        while not stop.is_set():
+            phq9_answers, history, occupation, age = SAMPLE_PROFILES[(index + i) % len(SAMPLE_PROFILES)]
+            # A unique history per call keeps the table and the result cache out of the measurement
+            start = time.perf_counter()
+            ai_model.assign_domain(phq9_answers, f"{history} (call {index}-{i})", occupation, age)
+            latencies.append(time.perf_counter() - start)
+            i += 1
+
+    threads = [threading.Thread(target=generate, args=(i,), daemon=True) for i in range(generators)]
+    threads += [threading.Thread(target=classify, args=(i,), daemon=True) for i in range(classifiers)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - start
+
+    stats = summarize(latencies, wall)
+    stats["generation_calls"] = generated[0]
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds per run")
+    parser.add_argument("--generators", type=int, default=4, help="Concurrent generation callers")
+    parser.add_argument("--classifiers", type=int, default=4, help="Concurrent domain-assignment callers")
+    parser.add_argument("--decoding-profile", default="quality")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+    args = parser.parse_args()
+
+    app = load_engine()
+    ai_model = app.ai_model
+    scheduler = ai_model.scheduler
+    if scheduler is None:
+        raise SystemExit("The inference scheduler is disabled (SCHEDULER_ENABLED=false)")
+
+    results = {}
+    for label, active in (("inline", None), ("scheduled", scheduler)):
+        ai_model.scheduler = active
+        results[label] = run_mixed_load(
+            ai_model, args.duration, args.generators, args.classifiers, args.decoding_profile
+        )
+    results["scheduler_stats"] = scheduler.stats()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    for label in ("inline", "scheduled"):
+        print(format_row(f"assign_domain ({label})", results[label])
+              + f"   generation calls {results[label]['generation_calls']}")
+    print(f"\nScheduler stats: {json.dumps(results['scheduler_stats'], indent=2)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Sample the suggestion model --samples times for every (depression level,
+domain) pair with an empty history and store each pair's distinct
+suggestions, most frequent first, in models/suggestion/suggestion_catalog.json.
+The domains are those assign_domain can return: the domain label encoder's
+classes (4 levels x 7 domains with the trained model) plus "General
+Depression", its answer on errors.
+generate_suggestions then answers requests without history with a dict
+lookup; only requests with a history run the model live.
+
+The catalog records the suggestion model's fingerprint. A server that finds
+a catalog for other weights ignores it and (with SUGGESTION_CATALOG_REFRESH)
+rebuilds it in the background with SUGGESTION_CATALOG_SAMPLES samples.
+
+Usage (from ai-engine/):
+    python scripts/build_suggestion_catalog.py --samples 8 --decoding-profile quality
+"""
+import argparse
+import os
+import time
+
+from _bench import load_engine
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--samples", type=int, default=8, help="Generation runs per (level, domain) pair")
+    parser.add_argument("--decoding-profile", default="quality", choices=("fast", "balanced", "quality"))
+    args = parser.parse_args()
+
+    # Build from the model alone, not from a catalog already on disk
+    os.environ["SUGGESTION_CATALOG_ENABLED"] = "false"
+    app = load_engine()
+    ai_model = app.ai_model
+    if ai_model.suggestion_model is None:
+        raise SystemExit("No suggestion model under models/suggestion; nothing to precompute")
+
+    from modules.suggestion_catalog import save_catalog
+
+    pairs = len(app.DEPRESSION_LEVELS) * len(ai_model.catalog_domains())
+    print(f"Sampling {pairs} level/domain pairs x {args.samples} runs ({args.decoding_profile} decoding)")
+    start = time.perf_counter()
+
+    def progress(level, domain, count):
+        print(f"  {level} / {domain}: {count} distinct suggestions ({time.perf_counter() - start:.1f}s)")
+
+    entries, metadata = ai_model.build_suggestion_catalog(args.samples, args.decoding_profile, progress)
+    path = save_catalog(os.path.join(ai_model.models_path, "suggestion"), entries, metadata)
+
+    empty = [key for key, suggestions in entries.items() if not suggestions]
+    print(f"Wrote {path} in {time.perf_counter() - start:.1f}s "
+          f"({sum(len(suggestions) for suggestions in entries.values())} suggestions)")
+    if empty:
+        print(f"⚠ No usable suggestions for {len(empty)} pairs (served live): {', '.join(empty)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Build tiny, randomly-initialised stand-ins for the models in models/ so the
+AI engine can be started and benchmarked without the trained checkpoints.
+
+The configs are copied from models/ with the layer sizes shrunk; tokenizer
+files are copied as-is, so prompts tokenize exactly like in production.
+Without a bundled RoBERTa tokenizer (scripts/bundle_domain_tokenizer.py), a
+byte-level vocabulary with the same special tokens is generated instead.
+The output tree has the same layout as models/, including suggestion/.
+
+Usage (from ai-engine/):
+    python scripts/build_tiny_models.py --output /tmp/tiny-models
+    AI_ENGINE_MODELS_PATH=/tmp/tiny-models python app.py
+"""
+import argparse
+import json
+import os
+import shutil
+
+import torch
+from transformers import (
+    RobertaConfig, RobertaForSequenceClassification, RobertaTokenizer,
+    T5Config, T5ForConditionalGeneration, T5Tokenizer
+)
+from transformers.models.gpt2.tokenization_gpt2 import bytes_to_unicode
+
+ENGINE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TOKENIZER_FILES = (
+    "vocab.json", "merges.txt", "spiece.model", "added_tokens.json",
+    "special_tokens_map.json", "tokenizer_config.json", "tokenizer.json"
+)
+TINY_ROBERTA = {"hidden_size": 32, "num_hidden_layers": 2, "num_attention_heads": 2, "intermediate_size": 64}
+TINY_T5 = {"d_model": 32, "d_ff": 64, "d_kv": 8, "num_heads": 2, "num_layers": 2, "num_decoder_layers": 2}
+
+
+def copy_tokenizer_files(source_dir, target_dir):
+    copied = []
+    for filename in TOKENIZER_FILES:
+        path = os.path.join(source_dir, filename)
+        if os.path.exists(path):
+            shutil.copy(path, target_dir)
+            copied.append(filename)
+    return copied
+
+
+def build_byte_level_tokenizer(target_dir):
+    """Offline RoBERTa-style tokenizer: special tokens plus one token per byte, no merges"""
+    vocab = {"<s>": 0, "<pad>": 1, "</s>": 2, "<unk>": 3}
+    for symbol in bytes_to_unicode().values():
+        vocab.setdefault(symbol, len(vocab))
+    vocab["<mask>"] = len(vocab)
+    with open(os.path.join(target_dir, "vocab.json"), "w") as f:
+        json.dump(vocab, f)
+    with open(os.path.join(target_dir, "merges.txt"), "w") as f:
+        f.write("#version: 0.2\n")
+    tokenizer = RobertaTokenizer(os.path.join(target_dir, "vocab.json"), os.path.join(target_dir, "merges.txt"))
+    tokenizer.save_pretrained(target_dir)
+
+
+def build_domain_model(source_dir, target_dir):
+    os.makedirs(target_dir, exist_ok=True)
+    if "vocab.json" in copy_tokenizer_files(source_dir, target_dir):
+        tokenizer = RobertaTokenizer.from_pretrained(target_dir)
+    else:
+        build_byte_level_tokenizer(target_dir)
+        tokenizer = RobertaTokenizer.from_pretrained(target_dir)
+
+    with open(os.path.join(source_dir, "config.json")) as f:
+        config = json.load(f)
+    config.update(TINY_ROBERTA, vocab_size=len(tokenizer))
+    RobertaForSequenceClassification(RobertaConfig(**config)).save_pretrained(target_dir)
+
+    label_encoder = os.path.join(source_dir, "label_encoder.joblib")
+    if os.path.exists(label_encoder):
+        shutil.copy(label_encoder, target_dir)
+
+
+def build_t5_model(source_dir, target_dir):
+    os.makedirs(target_dir, exist_ok=True)
+    copy_tokenizer_files(source_dir, target_dir)
+    for filename in ("config.json", "generation_config.json"):
+        shutil.copy(os.path.join(source_dir, filename), target_dir)
+    tokenizer = T5Tokenizer.from_pretrained(target_dir)
+
+    with open(os.path.join(source_dir, "config.json")) as f:
+        config = json.load(f)
+    config.update(TINY_T5, vocab_size=len(tokenizer))
+    T5ForConditionalGeneration(T5Config(**config)).save_pretrained(target_dir)
+
+
+def build_tiny_models(output_dir, source_dir=None, seed=0):
+    """Write tiny random domain, question and suggestion models to output_dir and return it"""
+    source_dir = source_dir or os.path.join(ENGINE_DIR, "models")
+    torch.manual_seed(seed)
+    build_domain_model(os.path.join(source_dir, "domain_assignment"), os.path.join(output_dir, "domain_assignment"))
+    question_source = os.path.join(source_dir, "question_generation")
+    build_t5_model(question_source, os.path.join(output_dir, "question_generation"))
+    # The suggestion model shares the T5 layout; reuse its own files when present
+    suggestion_source = os.path.join(source_dir, "suggestion")
+    if not os.path.exists(os.path.join(suggestion_source, "config.json")):
+        suggestion_source = question_source
+    build_t5_model(suggestion_source, os.path.join(output_dir, "suggestion"))
+    return output_dir
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", required=True, help="Directory to write the tiny model tree into")
+    parser.add_argument("--source", default=os.path.join(ENGINE_DIR, "models"), help="Model tree to copy configs from")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    build_tiny_models(args.output, args.source, args.seed)
+    print(f"✓ Tiny models written to {args.output}")
+    print(f"  Start the engine on them with AI_ENGINE_MODELS_PATH={args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+Save the 'roberta-base' tokenizer next to models/domain_assignment so the AI
+engine can start without network access. Run once, with network, after
+installing or updating the domain model.
+
+Usage (from ai-engine/):
+    python scripts/bundle_domain_tokenizer.py
+"""
+import argparse
+import os
+
+from transformers import RobertaTokenizer
+
+ENGINE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--source", default="roberta-base", help="Hub id or local path of the tokenizer")
+    parser.add_argument(
+        "--target",
+        default=os.path.join(ENGINE_DIR, "models", "domain_assignment"),
+        help="Model directory to write the tokenizer files into"
+    )
+    args = parser.parse_args()
+
+    tokenizer = RobertaTokenizer.from_pretrained(args.source)
+    saved = tokenizer.save_pretrained(args.target)
+    print(f"✓ Saved tokenizer files to {args.target}:")
+    for path in saved:
+        print(f"  - {os.path.basename(path)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Parity check and benchmark of the ONNX Runtime domain classifier against eager
+PyTorch. Exits with status 1 when the max absolute logit difference exceeds
+--tolerance or the predicted classes disagree.
+
+Usage (from ai-engine/):
+    python scripts/check_domain_onnx.py --tolerance 1e-3 --batch-sizes 1 8 32
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import torch
+
+from _bench import SAMPLE_PROFILES, percentile
+from export_domain_onnx import ENGINE_DIR, load_domain_tokenizer
+
+from transformers import RobertaForSequenceClassification
+
+from modules.onnx_backend import ONNX_FILENAME, OnnxDomainClassifier
+
+
+def sample_texts(count):
+    texts = []
+    for i in range(count):
+        phq9_answers, history, occupation, age = SAMPLE_PROFILES[i % len(SAMPLE_PROFILES)]
+        history_text = f"Mental health history: {history}" if history else "No mental health history"
+        texts.append(f"PHQ-9 responses: {phq9_answers}. {history_text}. Occupation: {occupation}. Age: {age + i}")
+    return texts
+
+
+def time_ms(fn, repeats):
+    latencies = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - start)
+    return {"p50_ms": percentile(latencies, 50) * 1000.0, "p95_ms": percentile(latencies, 95) * 1000.0}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model-dir", default=os.path.join(ENGINE_DIR, "models", "domain_assignment"))
+    parser.add_argument("--tolerance", type=float, default=1e-3, help="Max allowed absolute logit difference")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    tokenizer = load_domain_tokenizer(args.model_dir)
+    torch_model = RobertaForSequenceClassification.from_pretrained(args.model_dir)
+    onnx_model = OnnxDomainClassifier(os.path.join(args.model_dir, ONNX_FILENAME))
+
+    report = {"tolerance": args.tolerance, "batches": []}
+    passed = True
+    for batch_size in args.batch_sizes:
+        inputs = tokenizer(sample_texts(batch_size), return_tensors="pt", max_length=512, truncation=True, padding=True)
+
+        def run_torch():
+            with torch.no_grad():
+                return torch_model(**inputs).logits
+
+        def run_onnx():
+            return torch.from_numpy(onnx_model.logits(inputs))
+
+        torch_logits, onnx_logits = run_torch(), run_onnx()
+        max_diff = float((torch_logits - onnx_logits).abs().max())
+        same_classes = bool(torch.equal(torch_logits.argmax(dim=-1), onnx_logits.argmax(dim=-1)))
+        passed = passed and max_diff <= args.tolerance and same_classes
+
+        report["batches"].append({
+            "batch_size": batch_size,
+            "max_logit_diff": max_diff,
+            "argmax_match": same_classes,
+            "torch": time_ms(run_torch, args.repeats),
+            "onnx": time_ms(run_onnx, args.repeats),
+        })
+
+    report["passed"] = passed
+    print(json.dumps(report, indent=2))
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Regression check for incremental question generation. The question model's
+generate() is replaced by a scripted one that reveals fixed candidates one
+token per step and honours the stopping criteria, so the result is known in
+advance. Exits with status 1 when an early stop lets the unfinished last
+fragment of a candidate (which extract_questions would end with '?') into
+the output or the question cache in place of a finished question.
+
+Usage (from ai-engine/, any model tree, e.g. the tiny models):
+    AI_ENGINE_MODELS_PATH=models-tiny python scripts/check_incremental_questions.py
+"""
+import os
+import sys
+
+import torch
+
+from _bench import load_engine
+
+# Candidate 0 finishes two questions, then is still writing a third when
+# candidate 1 finishes its first; that is the third distinct question, so
+# generation stops with "How are you coping with ..." cut off mid-sentence.
+CANDIDATES = [
+    "Are you tired often? Do you sleep well? How are you coping with all of the changes at work lately?",
+    "Do you find it hard to enjoy your meals and snacks these days? Do you see friends often?",
+]
+EXPECTED = ["Are you tired often?", "Do you sleep well?", "Do you find it hard to enjoy your meals and snacks these days?"]
+
+
+def scripted_generate(tokenizer):
+    rows = [tokenizer(text).input_ids for text in CANDIDATES]
+    length = max(len(row) for row in rows)
+    start = [tokenizer.pad_token_id]
+    full = torch.tensor([start + row + [tokenizer.pad_token_id] * (length - len(row)) for row in rows])
+
+    def generate(*args, stopping_criteria=None, **kwargs):
+        for step in range(2, full.shape[1] + 1):
+            partial = full[:, :step]
+            if stopping_criteria is not None and bool(stopping_criteria(partial, None).all()):
+                return partial
+        return full
+
+    return generate
+
+
+def main():
+    os.environ["QUESTION_INCREMENTAL_BATCH"] = str(len(CANDIDATES))
+    os.environ["QUESTION_CACHE_ENABLED"] = "true"
+    app = load_engine()
+    ai_model = app.ai_model
+    ai_model.question_model.generate = scripted_generate(ai_model.question_tokenizer)
+
+    questions, work = ai_model.generate_questions_incremental(
+        [1] * 9, "Work Burnout", "", decoding_profile="fast", num_questions=len(EXPECTED)
+    )
+    cached = ai_model.question_cache.get(app.canonical_key(
+        "questions-incremental", "fast", ai_model.build_question_prompt([1] * 9, "Work Burnout", "")
+    ))
+    print(f"questions: {questions}")
+    print(f"cached:    {list(cached or [])}")
+    print(f"stopped early: {work['stopped_early']}, tokens generated: {work['tokens_generated']}")
+
+    failures = []
+    if questions != EXPECTED:
+        failures.append(f"expected {EXPECTED}")
+    if list(cached or []) != EXPECTED:
+        failures.append("cache holds a cut-off fragment")
+    if not work["stopped_early"]:
+        failures.append("generation did not stop early")
+    if failures:
+        print("FAIL: " + "; ".join(failures))
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Compare the int8 dynamic-quantized models against fp32.
+
+Each precision is loaded in its own subprocess (through app.py, exactly as it is
+served) so that resident memory can be measured cleanly. The report covers:
+  - domain prediction agreement and max softmax difference
+  - question generation agreement (deterministic beam search on both sides)
+  - latency of assign_domain / generate_questions / generate_suggestions_with_model
+  - resident set size after the models are loaded
+
+Usage (from ai-engine/):
+    python scripts/evaluate_quantization.py --repeats 5
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+from _bench import SAMPLE_PROFILES, load_engine, percentile
+
+
+def current_rss_mb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024.0
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def timed_ms(fn, repeats):
+    latencies = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - start)
+    return {"p50_ms": percentile(latencies, 50) * 1000.0, "p95_ms": percentile(latencies, 95) * 1000.0}
+
+
+def run_child(repeats):
+    """Load the engine with the precision chosen via AI_ENGINE_QUANTIZE and emit JSON results"""
+    import torch
+
+    load_start = time.perf_counter()
+    app = load_engine()
+    load_seconds = time.perf_counter() - load_start
+    ai_model = app.ai_model
+    rss_mb = current_rss_mb()
+
+    torch.manual_seed(0)
+    texts = [ai_model.build_domain_input(*profile) for profile in SAMPLE_PROFILES]
+    inputs = ai_model.domain_tokenizer(texts, return_tensors="pt", max_length=512, truncation=True, padding=True)
+    with torch.no_grad():
+        probabilities = torch.nn.functional.softmax(ai_model.domain_model(**inputs).logits, dim=-1)
+
+    # Deterministic decoding so fp32 and int8 outputs are directly comparable
+    questions = []
+    for phq9_answers, history, _, _ in SAMPLE_PROFILES:
+        prompt = f"Generate therapeutic questions based on: Initial screening. PHQ-9: {phq9_answers}. Domain: work. History: {history}"
+        encoded = ai_model.question_tokenizer(prompt, return_tensors="pt", max_length=512, truncation=True)
+        with torch.no_grad():
+            output = ai_model.question_model.generate(**encoded, max_length=128, num_beams=4, do_sample=False)
+        questions.append(ai_model.question_tokenizer.decode(output[0], skip_special_tokens=True))
+
+    phq9_answers, history, occupation, age = SAMPLE_PROFILES[0]
+    latency = {
+        "assign_domain": timed_ms(lambda: ai_model.assign_domains_batch([texts[0]]), repeats),
+        "generate_questions": timed_ms(
+            lambda: ai_model.generate_questions(phq9_answers, "work", history), repeats
+        ),
+    }
+    if ai_model.suggestion_model is not None:
+        latency["generate_suggestions_with_model"] = timed_ms(
+            lambda: ai_model.generate_suggestions_with_model("Moderate", "work", history, phq9_answers), repeats
+        )
+
+    print(json.dumps({
+        "quantized": ai_model.quantize,
+        "load_seconds": load_seconds,
+        "rss_mb": rss_mb,
+        "domain_probabilities": probabilities.tolist(),
+        "questions": questions,
+        "latency": latency,
+    }))
+
+
+def spawn(quantize, repeats):
+    env = dict(os.environ, AI_ENGINE_QUANTIZE="true" if quantize else "false")
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child", "--repeats", str(repeats)],
+        env=env, check=True, capture_output=True, text=True
+    ).stdout
+    # app.py prints progress while loading; the JSON result is the last line
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeats", type=int, default=5, help="Timed calls per method")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.repeats)
+        return
+
+    fp32 = spawn(False, args.repeats)
+    int8 = spawn(True, args.repeats)
+
+    fp32_probs, int8_probs = fp32["domain_probabilities"], int8["domain_probabilities"]
+    agreement = sum(
+        max(range(len(a)), key=a.__getitem__) == max(range(len(b)), key=b.__getitem__)
+        for a, b in zip(fp32_probs, int8_probs)
+    ) / len(fp32_probs)
+    max_prob_diff = max(abs(x - y) for a, b in zip(fp32_probs, int8_probs) for x, y in zip(a, b))
+    question_matches = sum(a == b for a, b in zip(fp32["questions"], int8["questions"])) / len(fp32["questions"])
+
+    report = {
+        "domain_agreement": agreement,
+        "domain_max_probability_diff": max_prob_diff,
+        "question_exact_match": question_matches,
+        "question_pairs": [{"fp32": a, "int8": b} for a, b in zip(fp32["questions"], int8["questions"])],
+        "rss_mb": {"fp32": fp32["rss_mb"], "int8": int8["rss_mb"]},
+        "load_seconds": {"fp32": fp32["load_seconds"], "int8": int8["load_seconds"]},
+        "latency": {"fp32": fp32["latency"], "int8": int8["latency"]},
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Export models/domain_assignment to ONNX (dynamic batch and sequence axes) so it
+can be served with DOMAIN_BACKEND=onnx.
+
+Usage (from ai-engine/):
+    python scripts/export_domain_onnx.py
+    python scripts/check_domain_onnx.py   # parity + benchmark against eager torch
+"""
+import argparse
+import os
+import sys
+
+ENGINE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ENGINE_DIR)
+
+from transformers import RobertaForSequenceClassification, RobertaTokenizer
+
+from modules.onnx_backend import ONNX_FILENAME, export_domain_model
+
+
+def load_domain_tokenizer(domain_path):
+    if os.path.exists(os.path.join(domain_path, "vocab.json")):
+        return RobertaTokenizer.from_pretrained(domain_path)
+    return RobertaTokenizer.from_pretrained("roberta-base")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model-dir", default=os.path.join(ENGINE_DIR, "models", "domain_assignment"))
+    parser.add_argument("--opset", type=int, default=17)
+    args = parser.parse_args()
+
+    tokenizer = load_domain_tokenizer(args.model_dir)
+    model = RobertaForSequenceClassification.from_pretrained(args.model_dir)
+    output_path = os.path.join(args.model_dir, ONNX_FILENAME)
+
+    export_domain_model(model, tokenizer, output_path, opset_version=args.opset)
+    print(f"✓ Exported domain classifier to {output_path} ({os.path.getsize(output_path) / 1e6:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Gemini generateContent REST API, for testing and
+benchmarking the AI engine without a key or network access.
+
+Point the engine at it with GEMINI_API_ENDPOINT=http://127.0.0.1:8765.
+Depression-level prompts get a JSON assessment derived from the PHQ-9 score in
+the prompt; suggestion prompts get a JSON array. Latency, jitter and error rate
+are configurable to exercise timeouts and fallbacks.
+
+Usage (from ai-engine/):
+    python scripts/fake_gemini_server.py --port 8765 --latency-ms 800 --jitter-ms 200 --error-rate 0.05
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def fake_reply(prompt):
+    if "depression level assessment" in prompt:
+        match = re.search(r"PHQ-9 Score: (\d+)", prompt)
+        score = int(match.group(1)) if match else 10
+        if score <= 4:
+            level = "No Depression"
+        elif score <= 9:
+            level = "Mild"
+        elif score <= 14:
+            level = "Moderate"
+        else:
+            level = "Severe"
+        return "```json\n" + json.dumps({
+            "depression_level": level,
+            "confidence": 0.82,
+            "key_indicators": [f"PHQ-9 score of {score}", "Fake Gemini assessment"]
+        }) + "\n```"
+    return json.dumps([
+        "Keep a consistent sleep and wake schedule",
+        "Take a short walk outdoors every day",
+        "Write down three things that went well each evening",
+        "Schedule one social activity this week",
+    ])
+
+
+class FakeGemini:
+    def __init__(self, latency_ms=0.0, jitter_ms=0.0, error_rate=0.0, seed=None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.requests = 0
+
+    def make_handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                fake.requests += 1
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length) or b"{}")
+                prompt = "".join(
+                    part.get("text", "")
+                    for content in body.get("contents", [])
+                    for part in content.get("parts", [])
+                )
+
+                delay = fake.latency_ms + fake.random.uniform(-fake.jitter_ms, fake.jitter_ms)
+                time.sleep(max(0.0, delay) / 1000.0)
+
+                if not self.path.split("?", 1)[0].endswith(":generateContent"):
+                    return self._send(404, {"error": {"message": "Not found"}})
+                if fake.random.random() < fake.error_rate:
+                    return self._send(503, {"error": {"message": "Fake Gemini error"}})
+                self._send(200, {"candidates": [{"content": {"parts": [{"text": fake_reply(prompt)}]}}]})
+
+            def _send(self, status, payload):
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def start_fake_gemini(port=0, **options):
+    """Start the fake server in a background thread; returns (server, base_url, fake)"""
+    fake = FakeGemini(**options)
+    server = ThreadingHTTPServer(("127.0.0.1", port), fake.make_handler())
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}", fake
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=500.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server, url, _ = start_fake_gemini(
+        args.port, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate
+    )
+    print(f"Fake Gemini listening on {url} (set GEMINI_API_ENDPOINT={url})")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
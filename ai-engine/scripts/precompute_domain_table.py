@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Run the domain classifier over the full PHQ-9 grid (4^9 answer vectors) with an
+empty history, for every configured occupation and age bucket, and store the
+argmax domain and confidence in models/domain_assignment/domain_table.npy.
+assign_domain then serves those requests with an O(1) memory-mapped lookup.
+
+Ages are snapped with DOMAIN_AGE_BUCKET exactly as at serving time, so use a
+bucket wider than 1 year to keep the table (and the run time) manageable:
+each (occupation, age bucket) pair costs 262,144 classifier inputs.
+
+The table records the model fingerprint (weights, including model.onnx), the
+DOMAIN_BACKEND and AI_ENGINE_QUANTIZE it was computed with. A server that
+differs in any of them ignores it, so run this with the serving configuration.
+
+Usage (from ai-engine/):
+    DOMAIN_AGE_BUCKET=10 python scripts/precompute_domain_table.py \
+        --occupations Student "Software Engineer" Teacher --age-min 10 --age-max 79
+"""
+import argparse
+import os
+import time
+
+from _bench import load_engine
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--occupations", nargs="+", required=True, help="Occupations to cover")
+    parser.add_argument("--age-min", type=int, default=18)
+    parser.add_argument("--age-max", type=int, default=65)
+    parser.add_argument("--batch-size", type=int, default=128, help="Classifier inputs per forward pass")
+    args = parser.parse_args()
+
+    # Import the serving engine so canonicalisation and the classifier backend match production
+    os.environ["DOMAIN_TABLE_ENABLED"] = "false"
+    app = load_engine()
+    ai_model = app.ai_model
+
+    from modules.domain_table import (
+        PHQ9_GRID_SIZE, create_table_file, finalize_table, phq9_answers_for_index
+    )
+    from modules.fingerprint import model_fingerprint
+
+    domain_path = os.path.join(ai_model.models_path, "domain_assignment")
+    occupations = []
+    for occupation in args.occupations:
+        canonical = ai_model.canonical_domain_inputs([0] * 9, "", occupation, 0)[2]
+        if canonical not in occupations:
+            occupations.append(canonical)
+    ages = sorted({
+        ai_model.canonical_domain_inputs([0] * 9, "", "", age)[3]
+        for age in range(args.age_min, args.age_max + 1)
+    })
+
+    total = len(occupations) * len(ages) * PHQ9_GRID_SIZE
+    print(f"Precomputing {len(occupations)} occupations x {len(ages)} age buckets x {PHQ9_GRID_SIZE} "
+          f"PHQ-9 vectors = {total:,} classifier inputs")
+
+    temp_path, cells = create_table_file(domain_path, occupations, ages)
+    labels, label_ids = [], {}
+    done = 0
+    start = time.perf_counter()
+
+    for o, occupation in enumerate(occupations):
+        for a, age in enumerate(ages):
+            for offset in range(0, PHQ9_GRID_SIZE, args.batch_size):
+                indices = range(offset, min(offset + args.batch_size, PHQ9_GRID_SIZE))
+                texts = [
+                    ai_model.build_domain_input(phq9_answers_for_index(index), "", occupation, age)
+                    for index in indices
+                ]
+                predictions = ai_model.assign_domains_batch(texts)
+                for domain, _ in predictions:
+                    if domain not in label_ids:
+                        label_ids[domain] = len(labels)
+                        labels.append(domain)
+                cells["label"][o, a, indices.start:indices.stop] = [label_ids[domain] for domain, _ in predictions]
+                cells["confidence"][o, a, indices.start:indices.stop] = [confidence for _, confidence in predictions]
+
+                done += len(indices)
+                if (offset // args.batch_size) % 200 == 0:
+                    rate = done / (time.perf_counter() - start)
+                    print(f"  {occupation!r} age {age}: {done:,}/{total:,} "
+                          f"({rate:,.0f}/s, ~{(total - done) / rate / 60:.0f} min left)")
+
+    finalize_table(domain_path, temp_path, cells, {
+        "occupations": occupations,
+        "ages": ages,
+        "age_bucket": ai_model.domain_age_bucket,
+        "labels": labels,
+        "fingerprint": model_fingerprint(domain_path),
+        "backend": ai_model.domain_backend,
+        "quantized": ai_model.quantize,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    })
+    print(f"✓ Wrote domain table to {domain_path} in {(time.perf_counter() - start) / 60:.1f} min")
+
+
+if __name__ == "__main__":
+    main()
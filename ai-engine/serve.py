@@ -0,0 +1,144 @@
+# ai-engine/serve.py - Pre-fork production server for the AI engine
+"""
+Loads MentalHealthAI once in a master process, then forks worker processes
+that accept connections on one shared listening socket. Model weights are
+loaded before the fork and never written afterwards, so all workers share
+the same physical pages (copy-on-write) instead of holding N copies of
+RoBERTa and both T5 models.
+
+Usage (from ai-engine/):
+    python serve.py --workers 4 --threads-per-worker 2 --port 5001
+
+For development keep using `python app.py` (single process, reloader on).
+Measure memory and throughput per worker count with scripts/benchmark_prefork.py.
+"""
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+
+
+def parse_args():
+    cpus = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=os.getenv('AI_ENGINE_HOST', '0.0.0.0'))
+    parser.add_argument("--port", type=int, default=int(os.getenv('AI_ENGINE_PORT', '5001')))
+    parser.add_argument("--workers", type=int, default=int(os.getenv('AI_ENGINE_WORKERS', '2')))
+    parser.add_argument(
+        "--threads-per-worker", type=int, default=int(os.getenv('AI_ENGINE_THREADS_PER_WORKER', '0')),
+        help="torch intra-op threads per worker (default: CPU count / workers)"
+    )
+    parser.add_argument("--backlog", type=int, default=128)
+    args = parser.parse_args()
+    args.workers = max(1, args.workers)
+    if args.threads_per_worker <= 0:
+        args.threads_per_worker = max(1, cpus // args.workers)
+    return args
+
+
+def freeze_shared_state(ai_model):
+    """Put the loaded models in their final read-only state before forking"""
+    for model in (ai_model.domain_model, ai_model.question_model, ai_model.suggestion_model):
+        if model is not None:
+            model.eval()
+            for parameter in model.parameters():
+                parameter.requires_grad_(False)
+    # Move everything allocated so far into the permanent generation so the
+    # workers' garbage collector never writes to (and un-shares) those pages
+    gc.collect()
+    gc.freeze()
+
+
+def run_worker(engine, listener, args):
+    import torch
+    from werkzeug.serving import make_server
+    from modules.onnx_backend import OnnxDomainClassifier
+
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+
+    # Each worker gets its own slice of the CPU instead of every worker
+    # starting one thread per core
+    torch.set_num_threads(args.threads_per_worker)
+    ai_model = engine.ai_model
+    if ai_model.domain_onnx is not None:
+        # ONNX Runtime sessions own thread pools that do not survive fork()
+        ai_model.domain_onnx = OnnxDomainClassifier(
+            ai_model.domain_onnx.model_path, num_threads=args.threads_per_worker
+        )
+
+    server = make_server(args.host, args.port, engine.app, threaded=True, fd=listener.fileno())
+    print(f"Worker {os.getpid()} serving with {args.threads_per_worker} torch thread(s)")
+    server.serve_forever()
+
+
+def main():
+    args = parse_args()
+
+    # Size the master's thread pools like a worker's before anything runs
+    import torch
+    torch.set_num_threads(args.threads_per_worker)
+
+    print("Loading models in the master process...")
+    import app as engine
+    freeze_shared_state(engine.ai_model)
+
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    listener.bind((args.host, args.port))
+    listener.listen(args.backlog)
+    listener.set_inheritable(True)
+
+    workers = {}
+    stopping = False
+
+    def spawn(index):
+        sys.stdout.flush()
+        sys.stderr.flush()
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                run_worker(engine, listener, args)
+            except BaseException as e:
+                print(f"Worker {os.getpid()} exited: {e}", file=sys.stderr)
+                code = 1
+            finally:
+                os._exit(code)
+        workers[pid] = index
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    print(f"Starting Mental Health AI Engine on {args.host}:{args.port} with {args.workers} worker(s)...")
+    for index in range(args.workers):
+        spawn(index)
+
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        index = workers.pop(pid, None)
+        if index is not None and not stopping:
+            print(f"Worker {pid} died (status {status}), restarting", file=sys.stderr)
+            time.sleep(1.0)
+            spawn(index)
+
+    listener.close()
+
+
+if __name__ == "__main__":
+    main()
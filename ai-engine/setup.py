@@ -78,7 +78,7 @@ def main():
     test_script = '''
 import torch
 from transformers import RobertaTokenizer, RobertaForSequenceClassification, T5Tokenizer, T5ForConditionalGeneration
-import google.generativeai as genai
+import requests
 
 print("✓ All imports successful")
 print(f"✓ PyTorch version: {torch.__version__}")
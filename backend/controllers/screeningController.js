@@ -1,13 +1,19 @@
 // backend/controllers/screeningController.js
 const ScreeningSession = require("../models/ScreeningSession");
 const User = require("../models/User");
-const { generateQuestions, completeScreening, generateSuggestions } = require("../utils/mlPredictor");
+const {
+  createScreeningSession,
+  endScreeningSession,
+  generateQuestions,
+  completeScreening,
+  generateSuggestions
+} = require("../utils/mlPredictor");
 
 // Start screening session - generate personalized questions
 exports.runScreening = async (req, res) => {
   try {
     const userId = req.user.id;
-    const { latestPHQAnswers, domain, previousAnswers, isFollowup } = req.body;
+    const { latestPHQAnswers, domain, previousAnswers, isFollowup, aiSessionId, sessionAnswers } = req.body;
 
     if (!latestPHQAnswers || !domain) {
       return res.status(400).json({ error: "PHQ-9 answers and domain are required" });
@@ -15,20 +21,30 @@ exports.runScreening = async (req, res) => {
 
     // Get user context
     const user = await User.findById(userId).select('past_mental_health_history');
+    const history = user?.past_mental_health_history || '';
+
+    // The AI engine keeps the screening context in a session, so later rounds
+    // (and /save) only send the answers it has not recorded yet
+    const aiSession = aiSessionId
+      ? { sessionId: aiSessionId, sessionAnswers: sessionAnswers || 0 }
+      : await createScreeningSession(latestPHQAnswers, domain, history);
 
     // Generate personalized questions using trained T5 model
     const questions = await generateQuestions(
       latestPHQAnswers,
       domain,
-      user?.past_mental_health_history || '',
+      history,
       previousAnswers,
-      isFollowup || false
+      isFollowup || false,
+      aiSession
     );
 
     res.status(200).json({ 
       questions,
       domain,
-      isFollowup: isFollowup || false
+      isFollowup: isFollowup || false,
+      aiSessionId: aiSession.sessionId,
+      sessionAnswers: aiSession.sessionAnswers
     });
   } catch (err) {
     console.error("Error in runScreening:", err);
@@ -75,7 +91,7 @@ const getSeverityInterpretation = (score) => {
 exports.saveScreeningResult = async (req, res) => {
   try {
     const userId = req.user.id;
-    const { domain, latestPHQAnswers, questions, answers } = req.body;
+    const { domain, latestPHQAnswers, questions, answers, aiSessionId, sessionAnswers } = req.body;
 
     if (!domain || !latestPHQAnswers || !answers || !questions) {
       return res.status(400).json({ error: "Domain, PHQ-9 answers, screening questions, and screening answers are required" });
@@ -89,12 +105,15 @@ exports.saveScreeningResult = async (req, res) => {
     // Get user context
     const user = await User.findById(userId).select('username age gender past_mental_health_history occupation');
 
-    // Get complete screening analysis from AI engine
+    // Get complete screening analysis from AI engine (only the new answers when
+    // /start opened an AI engine session)
+    const aiSession = aiSessionId ? { sessionId: aiSessionId, sessionAnswers: sessionAnswers || 0 } : null;
     const analysis = await completeScreening(
       latestPHQAnswers,
       domain,
       user?.past_mental_health_history || '',
-      answers
+      answers,
+      aiSession
     );
 
     // Calculate PHQ-9 score from AI response
@@ -228,6 +247,9 @@ exports.saveScreeningResult = async (req, res) => {
     });
     
     await session.save();
+    if (aiSession) {
+      await endScreeningSession(aiSession.sessionId);
+    }
 
     res.status(201).json({ 
       msg: "Screening completed and saved successfully", 
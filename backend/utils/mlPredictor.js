@@ -20,9 +20,71 @@ async function predictDomain(phqAnswers, userHistory, occupation, age) {
   }
 }
 
-// Generate personalized questions using trained T5 model
-async function generateQuestions(phqAnswers, domain, history, previousAnswers = null, isFollowup = false) {
+// Start a screening session on the AI engine, which then holds the PHQ-9 answers,
+// domain, history and answers so far; returns { sessionId, sessionAnswers }
+async function createScreeningSession(phqAnswers, domain, history, answers = []) {
   try {
+    const response = await axios.post(`${AI_ENGINE_BASE}/sessions`, {
+      phq9_answers: phqAnswers,
+      domain: domain,
+      history: history || '',
+      answers: answers || []
+    });
+
+    return { sessionId: response.data.session_id, sessionAnswers: response.data.answers };
+  } catch (error) {
+    console.error('AI Engine Session Error:', error.message);
+    throw error;
+  }
+}
+
+// End a screening session once its result is saved (it would expire on its own)
+async function endScreeningSession(sessionId) {
+  try {
+    await axios.delete(`${AI_ENGINE_BASE}/sessions/${sessionId}`);
+  } catch (error) {
+    console.error('AI Engine Session Delete Error:', error.message);
+  }
+}
+
+// POST for a screening session, sending only the answers it has not recorded yet.
+// session.sessionAnswers is updated to the count the engine recorded; an expired (404)
+// or out-of-step (409) session is recreated from the full context and the call retried.
+async function postForSession(path, session, context, answers, fields) {
+  const payload = () => ({
+    ...fields,
+    session_id: session.sessionId,
+    new_answers: (answers || []).slice(session.sessionAnswers),
+    answers_offset: session.sessionAnswers
+  });
+
+  let response;
+  try {
+    response = await axios.post(`${AI_ENGINE_BASE}${path}`, payload());
+  } catch (error) {
+    const status = error.response && error.response.status;
+    if (status !== 404 && status !== 409) {
+      throw error;
+    }
+    Object.assign(session, await createScreeningSession(context.phqAnswers, context.domain, context.history));
+    response = await axios.post(`${AI_ENGINE_BASE}${path}`, payload());
+  }
+
+  session.sessionAnswers = response.data.session_answers;
+  return response.data;
+}
+
+// Generate personalized questions using trained T5 model. With a session
+// ({ sessionId, sessionAnswers }) only the new previous answers are sent.
+async function generateQuestions(phqAnswers, domain, history, previousAnswers = null, isFollowup = false, session = null) {
+  try {
+    if (session) {
+      const data = await postForSession(
+        '/generate-questions', session, { phqAnswers, domain, history }, previousAnswers, { is_followup: isFollowup }
+      );
+      return data.questions;
+    }
+
     const response = await axios.post(`${AI_ENGINE_BASE}/generate-questions`, {
       phq9_answers: phqAnswers,
       domain: domain,
@@ -72,9 +134,14 @@ async function generateSuggestions(depressionLevel, domain, history, phqAnswers)
   }
 }
 
-// Complete screening analysis (depression level + suggestions)
-async function completeScreening(phqAnswers, domain, history, followUpAnswers) {
+// Complete screening analysis (depression level + suggestions). With a session
+// only the follow-up answers it has not recorded yet are sent.
+async function completeScreening(phqAnswers, domain, history, followUpAnswers, session = null) {
   try {
+    if (session) {
+      return await postForSession('/complete-screening', session, { phqAnswers, domain, history }, followUpAnswers, {});
+    }
+
     const response = await axios.post(`${AI_ENGINE_BASE}/complete-screening`, {
       phq9_answers: phqAnswers,
       domain: domain,
@@ -91,6 +158,8 @@ async function completeScreening(phqAnswers, domain, history, followUpAnswers) {
 
 module.exports = {
   predictDomain,
+  createScreeningSession,
+  endScreeningSession,
   generateQuestions,
   analyzeDepression,
   generateSuggestions,
@@ -10,6 +10,7 @@ const Screening = () => {
   const [currentInput, setCurrentInput] = useState('');
   const [showResults, setShowResults] = useState(false);
   const [analysis, setAnalysis] = useState(null);
+  const [aiSession, setAiSession] = useState({});
   const navigate = useNavigate();
 
   useEffect(() => {
@@ -32,6 +33,7 @@ const Screening = () => {
         });
         const q = Array.isArray(response.data.questions) ? response.data.questions.slice(0, 5) : [];
         setQuestions(q);
+        setAiSession({ aiSessionId: response.data.aiSessionId, sessionAnswers: response.data.sessionAnswers });
         setCurrentInput('');
       } catch (error) {
         console.error('Error fetching questions:', error);
@@ -58,7 +60,8 @@ const Screening = () => {
         domain: localStorage.getItem('assignedDomain'),
         latestPHQAnswers: JSON.parse(localStorage.getItem('latestPHQAnswers') || '[]'),
         questions: questions,
-        answers: Object.values(updated)
+        answers: Object.values(updated),
+        ...aiSession
       }, {
         headers: { 'Authorization': `Bearer ${token}` }
       });